@@ -0,0 +1,89 @@
+"""Adaptive range size for ranged downloads, driven by the measured latency and bandwidth."""
+
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveChunkSize:
+    """Chooses the size of the next ranged request from the measured request latency and bandwidth.
+
+    A ranged GET costs roughly ``latency + size / bandwidth``. The size is chosen so that the transfer takes
+    ``latency_factor`` times as long as the latency (i.e. the latency costs at most ``1 / (1 + latency_factor)``
+    of every request): ``size = bandwidth * latency * latency_factor``. Latency and bandwidth are smoothed with an
+    exponential moving average and the size changes at most by ``max_step`` per measurement, within
+    ``[min_size, max_size]``. One instance can be shared by downloads to carry the learned size over.
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> sizer = AdaptiveChunkSize(chunk_size=1024 * 1024)
+        >>> sizer.record(1024 * 1024, latency=0.05, transfer_time=0.01)
+        >>> sizer.chunk_size > 1024 * 1024
+        True
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1024 * 1024,
+        min_size: int = 64 * 1024,
+        max_size: int = 64 * 1024 * 1024,
+        latency_factor: float = 4.0,
+        smoothing: float = 0.3,
+        max_step: float = 2.0,
+    ):
+        """Initialize the adaptive chunk size.
+
+        :param chunk_size: The initial chunk size.
+        :param min_size: The lower bound of the chunk size.
+        :param max_size: The upper bound of the chunk size.
+        :param latency_factor: Target ratio of transfer time to latency per request.
+        :param smoothing: Weight of a new measurement in the moving averages.
+        :param max_step: Maximum factor by which the size grows or shrinks per measurement.
+        """
+        if not 0 < min_size <= max_size:
+            raise ValueError(f"Invalid chunk size bounds: {min_size} - {max_size}.")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.latency_factor = latency_factor
+        self.smoothing = smoothing
+        self.max_step = max_step
+        self.latency: Optional[float] = None
+        self.bandwidth: Optional[float] = None
+        self.__chunk_size = min(max(chunk_size, min_size), max_size)
+        self.__lock = threading.Lock()
+
+    @property
+    def chunk_size(self) -> int:
+        """The size of the next ranged request."""
+        return self.__chunk_size
+
+    def __average(self, previous: Optional[float], value: float) -> float:
+        """Internal method to update an exponential moving average."""
+        return value if previous is None else previous + self.smoothing * (value - previous)
+
+    def record(self, size: int, latency: float, transfer_time: float) -> None:
+        """Record a finished ranged request and adapt the chunk size (thread-safe).
+
+        :param size: Number of bytes received.
+        :param latency: Seconds until the response headers were received.
+        :param transfer_time: Seconds to read the body.
+        """
+        with self.__lock:
+            self.latency = self.__average(self.latency, max(latency, 1e-6))
+            if size:
+                self.bandwidth = self.__average(self.bandwidth, size / max(transfer_time, 1e-6))
+            if self.bandwidth is None:
+                return
+            target = self.bandwidth * self.latency * self.latency_factor
+            previous = self.__chunk_size
+            target = min(max(target, previous / self.max_step), previous * self.max_step)
+            self.__chunk_size = int(min(max(target, self.min_size), self.max_size))
+            if self.__chunk_size != previous:
+                logger.debug(
+                    f"Chunk size {previous} -> {self.__chunk_size} (latency: {self.latency:.3f}s, "
+                    f"bandwidth: {self.bandwidth / 1e6:.1f} MB/s)"
+                )
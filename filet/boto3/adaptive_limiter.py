@@ -0,0 +1,247 @@
+"""Adaptive (AIMD) limit of concurrent S3 requests."""
+
+from contextlib import contextmanager, nullcontext
+import logging
+import threading
+import time
+from typing import Any, ContextManager, Dict, Iterator, Optional
+
+from botocore.exceptions import ClientError, ConnectTimeoutError, ReadTimeoutError
+
+logger = logging.getLogger(__name__)
+
+THROTTLING_ERROR_CODES = {
+    "SlowDown",
+    "ServiceUnavailable",
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "Throttling",
+    "ThrottlingException",
+    "TooManyRequestsException",
+}
+
+
+def is_throttling(error: BaseException) -> bool:
+    """Whether an error of a request signals an overloaded endpoint (throttling, 503, timeouts).
+
+    >>> is_throttling(TimeoutError())
+    True
+    >>> is_throttling(ValueError())
+    False
+    """
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code", "")
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return code in THROTTLING_ERROR_CODES or status in (429, 503)
+    return isinstance(error, (TimeoutError, ConnectTimeoutError, ReadTimeoutError))
+
+
+class RequestTiming:
+    """Timing of a request in a slot of the limiter (see :meth:`AdaptiveConcurrencyLimiter.slot`).
+
+    The latency of a request is measured up to :meth:`first_byte` if it is called, so the transfer of a large
+    response body does not count as latency.
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = time.perf_counter() if started is None else started
+        self.first_byte_at: Optional[float] = None
+
+    def first_byte(self) -> None:
+        """Mark the arrival of the response (before its body is read)."""
+        if self.first_byte_at is None:
+            self.first_byte_at = time.perf_counter()
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limits the number of concurrent requests and adapts the limit with AIMD (additive increase, multiplicative
+    decrease), like TCP congestion control.
+
+    * Each successful request with a latency below ``latency_tolerance`` times the baseline (the slowly rising
+      minimum latency) raises the limit by ``1 / limit``, i.e. by one per round of ``limit`` requests. The latency
+      is the time to the first byte of the response (see :class:`RequestTiming`); requests whose duration depends
+      on their size without a first byte (uploads, server-side copies) only adapt the limit to throttling.
+    * A throttled request (see :func:`is_throttling`) or a latency above the tolerance multiplies the limit by
+      ``backoff_ratio``. Only requests started after the last decrease can decrease the limit again, so a burst of
+      throttled requests counts as one congestion signal.
+
+    The limiter is thread-safe and meant to be shared by all handlers of one endpoint (see
+    :class:`~filet.boto3.async_handler.AsyncHandler`). Limit changes are logged (with the state in ``extra``), and
+    :meth:`snapshot` returns the state for metrics.
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=64)
+        >>> with limiter.slot() as timing:
+        ...     timing.first_byte()  # the response arrived, its body is read afterwards
+        >>> limiter.snapshot()["in_flight"]
+        0
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 5,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff_ratio: float = 0.5,
+        latency_tolerance: Optional[float] = 3.0,
+        baseline_drift: float = 0.01,
+        name: str = "s3",
+    ):
+        """Initialize the limiter.
+
+        :param initial_limit: The initial number of concurrent requests.
+        :param min_limit: The lower bound of the limit.
+        :param max_limit: The upper bound of the limit (also the size of the thread pools using the limiter).
+        :param backoff_ratio: Factor applied to the limit on congestion.
+        :param latency_tolerance: Latency (relative to the baseline) treated as congestion (None: errors only).
+        :param baseline_drift: Weight of a slower latency in the baseline (the baseline follows faster ones at once).
+        :param name: Name of the limiter in the logs.
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(f"Invalid concurrency limits: {min_limit} <= {initial_limit} <= {max_limit}.")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.baseline_drift = baseline_drift
+        self.name = name
+        self.baseline: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.succeeded = 0
+        self.throttled = 0
+        self.__limit = float(initial_limit)
+        self.__in_flight = 0
+        self.__last_decrease = 0.0
+        self.__condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """The current number of allowed concurrent requests."""
+        return int(self.__limit)
+
+    def acquire(self) -> float:
+        """Wait for a free slot.
+
+        :return: The start time of the request (to pass to :meth:`release`).
+        :rtype: float
+        """
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__in_flight < self.limit)
+            self.__in_flight += 1
+        return time.perf_counter()
+
+    def release(
+        self,
+        started: float,
+        error: Optional[BaseException] = None,
+        first_byte: Optional[float] = None,
+        latency: bool = True,
+    ) -> None:
+        """Release the slot of a finished request and adapt the limit.
+
+        :param started: The start time returned by :meth:`acquire`.
+        :param error: The error of the request (other errors than throttling do not change the limit).
+        :param first_byte: The arrival time of the response (the latency is measured up to now if not given).
+        :param latency: Adapt the limit to the latency of the request (False for requests whose duration depends on
+            their size, e.g. uploads).
+        """
+        measured = (first_byte or time.perf_counter()) - started
+        with self.__condition:
+            self.__in_flight -= 1
+            if error is not None:
+                if is_throttling(error):
+                    self.throttled += 1
+                    self.__decrease(started, f"throttled: {error!r}")
+            else:
+                self.__record(started, measured if latency else None)
+            self.__condition.notify_all()
+
+    def __record(self, started: float, latency: Optional[float]) -> None:
+        """Internal method to adapt the limit to a successful request (holding the lock).
+
+        :param latency: The latency of the request (None: only count the request).
+        """
+        self.succeeded += 1
+        if latency is not None:
+            self.latency = latency if self.latency is None else 0.9 * self.latency + 0.1 * latency
+            if self.baseline is None or latency < self.baseline:
+                self.baseline = latency
+            else:
+                self.baseline += self.baseline_drift * (latency - self.baseline)
+            if self.latency_tolerance is not None and latency > self.latency_tolerance * max(self.baseline, 1e-3):
+                self.__decrease(started, f"latency {latency:.3f}s, baseline {self.baseline:.3f}s")
+                return
+        previous = self.limit
+        self.__limit = min(self.max_limit, self.__limit + 1 / self.__limit)
+        if self.limit != previous:
+            logger.debug(f"Concurrency limit of {self.name}: {previous} -> {self.limit}", extra=self.__state())
+
+    def __decrease(self, started: float, reason: str) -> None:
+        """Internal method to decrease the limit once per congestion (holding the lock)."""
+        if started < self.__last_decrease:
+            return
+        previous = self.limit
+        self.__limit = max(float(self.min_limit), self.__limit * self.backoff_ratio)
+        self.__last_decrease = time.perf_counter()
+        logger.info(f"Concurrency limit of {self.name}: {previous} -> {self.limit} ({reason})", extra=self.__state())
+
+    def __state(self) -> Dict[str, Any]:
+        """Internal method to get the state (holding the lock)."""
+        return {
+            "concurrency_limit": self.limit,
+            "in_flight": self.__in_flight,
+            "latency": self.latency,
+            "baseline_latency": self.baseline,
+            "succeeded": self.succeeded,
+            "throttled": self.throttled,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the current state of the limiter (e.g. for metrics).
+
+        :return: The limit, the number of requests in flight, the smoothed and baseline latency and the number of
+            successful and throttled requests.
+        :rtype: Dict[str, Any]
+        """
+        with self.__condition:
+            return {"name": self.name, **self.__state()}
+
+    @contextmanager
+    def slot(self, latency: bool = True) -> Iterator[RequestTiming]:
+        """Context manager running a request in a slot (errors raised in the block are passed to :meth:`release`).
+
+        :param latency: Adapt the limit to the latency of the request (see :meth:`release`).
+        :return: The timing of the request, to mark the arrival of the response.
+        """
+        timing = RequestTiming(self.acquire())
+        try:
+            yield timing
+        except BaseException as e:
+            self.release(timing.started, e)
+            raise
+        self.release(timing.started, first_byte=timing.first_byte_at, latency=latency)
+
+
+def request_slot(limiter: Optional[AdaptiveConcurrencyLimiter], latency: bool = True) -> ContextManager[RequestTiming]:
+    """Get a context manager running one (blocking) request in a slot of an adaptive limiter, if there is one.
+
+    Without a limiter the request runs right away (its timing is returned all the same).
+
+    :param limiter: The limiter (None for no limit).
+    :param latency: Adapt the limit to the latency of the request (False e.g. for uploads).
+    :return: The context manager of the slot, it returns the timing of the request.
+    :rtype: ContextManager[RequestTiming]
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> with request_slot(limiter, latency=False):  # xdoctest: +SKIP
+        ...     s3_client.upload_part(**part)
+    """
+    if limiter:
+        return limiter.slot(latency=latency)
+    return nullcontext(RequestTiming())
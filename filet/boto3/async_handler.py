@@ -1,10 +1,15 @@
 """AsyncHandler Module - Creates and handles async sessions."""
 
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import ContextManager, Optional
+from weakref import WeakKeyDictionary
 
 import nest_asyncio
 import uvloop
 
+from filet.boto3.adaptive_limiter import AdaptiveConcurrencyLimiter, RequestTiming, request_slot
+
 
 class AsyncHandler:
     """Create and handle an async session.
@@ -16,22 +21,36 @@ class AsyncHandler:
         >>> handler = AsyncHandler(limit_concurrency_count=5)
         >>> loop = handler.event_loop  # xdoctest: +SKIP
         >>> semaphore = handler.semaphore  # xdoctest: +SKIP
+        >>> executor = handler.executor  # xdoctest: +SKIP
     """
 
     nest_asyncio.apply()
     uvloop.install()
     asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
-    def __init__(self, limit_concurrency_count: int = 5, **kwargs):
+    def __init__(
+        self,
+        limit_concurrency_count: int = 5,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        **kwargs,
+    ):
         """Initialize the handler.
 
         :param limit_concurrency_count: Limit the number of concurrent operations.
         :type limit_concurrency_count: int
+        :param concurrency_limiter: Adapt the number of concurrent requests with this (shared) limiter instead of
+            the fixed limit. The thread pool and semaphore are then sized by its ``max_limit``.
+        :type concurrency_limiter: Optional[AdaptiveConcurrencyLimiter]
         :param kwargs: Additional keyword arguments.
         """
         super().__init__(**kwargs)
-        self.__semaphore = asyncio.BoundedSemaphore(limit_concurrency_count)
+        self.concurrency_limiter = concurrency_limiter
+        if concurrency_limiter:
+            limit_concurrency_count = concurrency_limiter.max_limit
+        self.limit_concurrency_count: int = limit_concurrency_count
+        self.__semaphores: WeakKeyDictionary = WeakKeyDictionary()  # event loop -> semaphore
         self.__event_loop = asyncio.get_event_loop()
+        self.__executor: Optional[ThreadPoolExecutor] = None
 
     @property
     def event_loop(self):
@@ -55,7 +74,10 @@ class AsyncHandler:
 
     @property
     def semaphore(self):
-        """Get the semaphore for the async session.
+        """Get the semaphore of the running event loop (or of :attr:`event_loop`) for the async session.
+
+        An asyncio semaphore is bound to one event loop, so each loop (e.g. of a listing in a background thread)
+        gets its own. The blocking requests of all loops are bounded by the thread pool (see :attr:`executor`).
 
         :return: The semaphore for the async session.
         :rtype: asyncio.BoundedSemaphore
@@ -67,4 +89,63 @@ class AsyncHandler:
             >>> handler = AsyncHandler()
             >>> semaphore = handler.semaphore  # xdoctest: +SKIP
         """
-        return self.__semaphore
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = self.__event_loop
+        if loop not in self.__semaphores:
+            self.__semaphores[loop] = asyncio.BoundedSemaphore(self.limit_concurrency_count)
+        return self.__semaphores[loop]
+
+    @property
+    def executor(self):
+        """Get the thread pool used to run blocking (boto3) calls concurrently.
+
+        The pool is created lazily and sized by ``limit_concurrency_count``, so at most that many blocking
+        requests are in flight at once.
+
+        :return: The thread pool executor of the async session.
+        :rtype: concurrent.futures.ThreadPoolExecutor
+
+        :Example:
+
+        .. code-block:: python
+
+            >>> handler = AsyncHandler(limit_concurrency_count=8)
+            >>> future = handler.executor.submit(sum, [1, 2, 3])  # xdoctest: +SKIP
+        """
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(
+                max_workers=self.limit_concurrency_count, thread_name_prefix=self.__class__.__name__
+            )
+        return self.__executor
+
+    @property
+    def concurrency(self) -> int:
+        """Get the current number of concurrent operations (the limit of the adaptive limiter, if any).
+
+        :return: The number of concurrent operations.
+        :rtype: int
+        """
+        return self.concurrency_limiter.limit if self.concurrency_limiter else self.limit_concurrency_count
+
+    def request_slot(self, latency: bool = True) -> ContextManager[RequestTiming]:
+        """Get a context manager running one (blocking) request in a slot of the adaptive limiter.
+
+        Without a limiter the concurrency is only bounded by the thread pool / semaphore.
+
+        :param latency: Adapt the limit to the latency of the request (False e.g. for uploads).
+        :return: The context manager of the slot, it returns the timing of the request.
+        :rtype: ContextManager[RequestTiming]
+
+        :Example:
+
+        .. code-block:: python
+
+            >>> handler = AsyncHandler(concurrency_limiter=AdaptiveConcurrencyLimiter())  # xdoctest: +SKIP
+            >>> with handler.request_slot() as timing:  # xdoctest: +SKIP
+            ...     body = s3_client.get_object(Bucket=bucket, Key=key)["Body"]
+            ...     timing.first_byte()
+            ...     data = body.read()
+        """
+        return request_slot(self.concurrency_limiter, latency=latency)
@@ -0,0 +1,101 @@
+"""Reusable part-sized buffers for uploads."""
+
+import io
+import threading
+from typing import List, Union
+
+
+class PartBufferPool:
+    """A bounded pool of reusable ``bytearray`` buffers of one part size.
+
+    Buffers are allocated on demand up to ``max_buffers``; :meth:`acquire` blocks while all of them are in use,
+    which bounds the memory of the parts that are being filled or uploaded. Released buffers are reused without
+    being cleared or reallocated.
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> pool = PartBufferPool(part_size=8, max_buffers=2)
+        >>> buffer = pool.acquire()
+        >>> len(buffer)
+        8
+        >>> pool.release(buffer)
+        >>> pool.acquire() is buffer
+        True
+    """
+
+    def __init__(self, part_size: int, max_buffers: int):
+        """Initialize the pool.
+
+        :param part_size: Size of every buffer in bytes.
+        :param max_buffers: Maximum number of buffers.
+        """
+        if part_size < 1 or max_buffers < 1:
+            raise ValueError(f"Invalid buffer pool: {max_buffers} buffers of {part_size} bytes.")
+        self.part_size = part_size
+        self.max_buffers = max_buffers
+        self.__free: List[bytearray] = []
+        self.__allocated = 0
+        self.__condition = threading.Condition()
+
+    def acquire(self) -> bytearray:
+        """Get a free buffer, waiting while all buffers are in use.
+
+        :return: A buffer of ``part_size`` bytes (with arbitrary content).
+        :rtype: bytearray
+        """
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__free or self.__allocated < self.max_buffers)
+            if self.__free:
+                return self.__free.pop()
+            self.__allocated += 1
+        return bytearray(self.part_size)
+
+    def release(self, buffer: bytearray) -> None:
+        """Return a buffer to the pool."""
+        with self.__condition:
+            self.__free.append(buffer)
+            self.__condition.notify()
+
+
+class MemoryviewReader(io.RawIOBase):
+    """Read-only, seekable file object over a memoryview, to pass a slice of a buffer as request body without
+    copying it (botocore only accepts ``bytes``, ``bytearray`` or file objects).
+
+    >>> reader = MemoryviewReader(memoryview(b"some bytes")[5:])
+    >>> reader.read()
+    b'bytes'
+    >>> reader.seek(0)
+    0
+    >>> reader.read(2)
+    b'by'
+    """
+
+    def __init__(self, view: Union[memoryview, bytes, bytearray]):
+        super().__init__()
+        self.__view = memoryview(view).cast("B")
+        self.__position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = max(0, min(len(buffer), len(self.__view) - self.__position))
+        buffer[:count] = self.__view[self.__position : self.__position + count]
+        self.__position += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.__position, io.SEEK_END: len(self.__view)}[whence]
+        self.__position = max(0, base + offset)
+        return self.__position
+
+    def tell(self) -> int:
+        return self.__position
+
+    def __len__(self) -> int:
+        return len(self.__view)
@@ -0,0 +1,190 @@
+"""Content-addressed on-disk cache of downloaded byte ranges, stored in fixed size blocks."""
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+import tempfile
+import threading
+from typing import Optional, Tuple
+
+import filet
+
+logger = logging.getLogger(__name__)
+
+CHUNK_CACHE_DIR = str(Path(filet.__file__).parent.resolve() / "config" / "chunk_cache")
+CHUNK_CACHE_BLOCK_SIZE = 256 * 1024
+
+
+class ChunkCache:
+    """Caches S3 objects on disk in fixed size blocks, keyed by (bucket, key, ETag / VersionId, block number).
+
+    The blocks are aligned to multiples of ``block_size``, so a byte range is served from the blocks covering it,
+    independent of the range (chunk) sizes the blocks were fetched with. Only complete blocks are cached: a block
+    is complete if it has ``block_size`` bytes or ends with the object. Use :meth:`align` to fetch ranges that
+    consist of complete blocks.
+
+    The cache is bounded by ``max_size`` bytes; the least recently used blocks are evicted first (a hit refreshes
+    the modification time of its file). Files are written atomically, so several threads and processes can share
+    one cache directory.
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> cache = ChunkCache(max_size=2 * 1024**3)  # xdoctest: +SKIP
+        >>> chunk_download = ChunkDownload(s3_client, s3_source, chunk_cache=cache)  # xdoctest: +SKIP
+    """
+
+    def __init__(
+        self, directory: str = CHUNK_CACHE_DIR, max_size: int = 1024**3, block_size: int = CHUNK_CACHE_BLOCK_SIZE
+    ):
+        """Initialize the cache.
+
+        :param directory: The cache directory (created if it does not exist).
+        :param max_size: Maximum total size of the cached blocks in bytes.
+        :param block_size: Size of the cached blocks in bytes (must be the same for all users of a directory).
+        """
+        self.directory = Path(directory).expanduser()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.block_size = block_size
+        self.__lock = threading.Lock()
+        self.__size = sum(path.stat().st_size for path in self.__files())
+
+    @property
+    def size(self) -> int:
+        """The total size of the cached blocks in bytes (written by this instance or found when it was opened)."""
+        return self.__size
+
+    @staticmethod
+    def cache_key(bucket: str, key: str, version: str, block: int) -> str:
+        """Get the content address of a block.
+
+        >>> len(ChunkCache.cache_key("bucket", "key", '"etag"', 0))
+        64
+        """
+        return hashlib.sha256(f"{bucket}\0{key}\0{version}\0{block}".encode()).hexdigest()
+
+    def align(self, start: int, end: int, size: int) -> Tuple[int, int]:
+        """Extend a byte range to the boundaries of the blocks covering it.
+
+        :param start: First byte of the range.
+        :param end: Last byte of the range (inclusive).
+        :param size: Size of the object (the last block ends with the object).
+        :return: The inclusive (start, end) byte range of the covering blocks.
+        :rtype: Tuple[int, int]
+        """
+        return start - start % self.block_size, min((end // self.block_size + 1) * self.block_size, size) - 1
+
+    def __path(self, bucket: str, key: str, version: str, block: int) -> Path:
+        """Internal method to get the file of a block."""
+        digest = self.cache_key(bucket, key, version, block)
+        return self.directory / digest[:2] / digest
+
+    def __files(self):
+        """Internal method to list the cached files."""
+        return (path for path in self.directory.glob("??/*") if not path.name.startswith("."))
+
+    def __read_blocks(self, view: memoryview, bucket: str, key: str, version: str, start: int) -> Optional[int]:
+        """Internal method to read the cached blocks from ``start`` into a view.
+
+        :return: The number of bytes read (less than the view if the object ends) or None if a block is missing.
+        """
+        filled = 0
+        while filled < len(view):
+            block, offset = divmod(start + filled, self.block_size)
+            path = self.__path(bucket, key, version, block)
+            try:
+                with open(path, "rb") as cached_file:
+                    cached_file.seek(offset)
+                    read_count = cached_file.readinto(view[filled : filled + self.block_size - offset])
+                os.utime(path)
+            except FileNotFoundError:
+                return None
+            filled += read_count
+            if offset + read_count < self.block_size:
+                break  # the last block of the object
+        return filled
+
+    def get(self, bucket: str, key: str, version: str, start: int, end: int) -> Optional[bytes]:
+        """Get a cached byte range.
+
+        :return: The cached bytes or None if a block of the range is not cached.
+        """
+        buffer = bytearray(end - start + 1)
+        filled = self.__read_blocks(memoryview(buffer), bucket, key, version, start)
+        if filled is None:
+            return None
+        logger.debug(f"Chunk cache hit: {key} {start}-{end}")
+        return bytes(buffer[:filled])
+
+    def read_into(self, view: memoryview, bucket: str, key: str, version: str, start: int, end: int) -> bool:
+        """Read a cached byte range directly into a buffer.
+
+        :return: Whether the range was cached (and completely read into the view).
+        """
+        if self.__read_blocks(view[: end - start + 1], bucket, key, version, start) != len(view):
+            return False
+        logger.debug(f"Chunk cache hit: {key} {start}-{end}")
+        return True
+
+    def put(
+        self, bucket: str, key: str, version: str, start: int, end: int, data: bytes, size: Optional[int] = None
+    ) -> None:
+        """Store the complete blocks of a byte range and evict the least recently used blocks if the cache is full.
+
+        :param size: Size of the object, to store its last block (which is shorter than ``block_size``).
+        """
+        if self.block_size > self.max_size:
+            return
+        data = memoryview(data)
+        data_end = start + len(data)
+        first_block = -(-start // self.block_size)  # the first block that starts inside the range
+        for block_start in range(first_block * self.block_size, data_end, self.block_size):
+            block_end = block_start + self.block_size
+            if block_end > data_end and (size is None or data_end < size):
+                break  # incomplete block
+            block_data = data[block_start - start : block_end - start]
+            self.__put_block(bucket, key, version, block_start // self.block_size, block_data)
+
+    def __put_block(self, bucket: str, key: str, version: str, block: int, data: memoryview) -> None:
+        """Internal method to write the file of a block."""
+        path = self.__path(bucket, key, version, block)
+        path.parent.mkdir(exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".")
+        with os.fdopen(file_descriptor, "wb") as temp_file:
+            temp_file.write(data)
+        try:
+            replaced_size = path.stat().st_size
+        except FileNotFoundError:
+            replaced_size = 0
+        os.replace(temp_path, path)
+        with self.__lock:
+            self.__size += len(data) - replaced_size
+            if self.__size > self.max_size:
+                self.__evict()
+
+    def __evict(self) -> None:
+        """Internal method to delete the least recently used blocks until the cache fits into ``max_size``."""
+        files = []
+        for path in self.__files():
+            try:
+                files.append((path.stat(), path))
+            except FileNotFoundError:
+                continue
+        files.sort(key=lambda file: file[0].st_mtime)
+        self.__size = sum(stat.st_size for stat, _ in files)
+        for stat, path in files:
+            if self.__size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            self.__size -= stat.st_size
+        logger.debug(f"Chunk cache evicted to {self.__size} / {self.max_size} bytes.")
+
+    def clear(self) -> None:
+        """Delete all cached blocks."""
+        with self.__lock:
+            for path in self.__files():
+                path.unlink(missing_ok=True)
+            self.__size = 0
@@ -1,19 +1,81 @@
 """ChunkDownload class for asynchronous downloading of byte-sized chunks from an S3 object."""
 
 import asyncio
+from collections import deque
+from concurrent.futures import Future
 import logging
+import math
+import mmap
 import os
-from typing import Any, Callable, Optional
-import zlib
+import threading
+import time
+from typing import Any, Callable, Deque, Iterator, List, Optional, Tuple, Union
 
 import gnupg
 
+from filet.boto3.adaptive_chunk_size import AdaptiveChunkSize
 from filet.boto3.async_handler import AsyncHandler
-from filet.boto3.schema import Compression, Encryption, S3Source
+from filet.boto3.chunk_cache import ChunkCache
+from filet.boto3.compression import compression_from_key, get_decompressor
+from filet.boto3.gpg_stream import GPGStreamDecryptor, import_keyring_once
+from filet.boto3.gzip_index import GZIP_INDEX_SPAN, GzipCheckpoint, GzipIndex, GzipIndexBuilder, decompress_segment
+from filet.boto3.gzip_index_cache import gzip_index_cache
+from filet.boto3.record_splitter import CsvRecordSplitter, RecordSplitter
+from filet.boto3.retry import RetryPolicy
+from filet.boto3.schema import Compression, Encryption, S3Source, S3SourceExtra
 from filet.boto3.types import S3Client
 
+SAMPLE_SIZE = 1024 * 1024
+
+
+def _align_lines(data: bytes, skip_first: bool, skip_last: bool, max_lines: Optional[int] = None) -> bytes:
+    """Cut a byte range to complete lines.
+
+    :param data: The byte range.
+    :param skip_first: Drop the (partial) first line.
+    :param skip_last: Drop the (partial) last line, i.e. everything after the last newline.
+    :param max_lines: Keep at most this number of lines.
+
+    >>> _align_lines(b"ial\\nline 2\\nline 3\\nli", skip_first=True, skip_last=True)
+    b'line 2\\nline 3\\n'
+    """
+    newline = data.find(b"\n") if skip_first else -1
+    start = len(data) if skip_first and newline < 0 else newline + 1
+    end = data.rfind(b"\n") + 1 if skip_last else len(data)
+    if max_lines is not None:
+        position = start
+        for _ in range(max_lines):
+            newline = data.find(b"\n", position, end)
+            if newline < 0:
+                position = end
+                break
+            position = newline + 1
+        end = min(end, position)
+    return data[start : max(start, end)]
+
 
 class ChunkDownload(AsyncHandler):
+    """Downloads an S3 object in byte-ranged parts.
+
+    The ranged GET requests of :meth:`run_until_complete` run on the thread pool of the :class:`AsyncHandler`,
+    so ``limit_concurrency_count`` parts are fetched in parallel, while the parts are decrypted, decompressed and
+    passed to the callback in part order. With a shared ``concurrency_limiter`` (see
+    :class:`~filet.boto3.adaptive_limiter.AdaptiveConcurrencyLimiter`) the number of parallel requests adapts to
+    the throttling and latency of the endpoint.
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> chunk_download = ChunkDownload(s3_client, s3_source, limit_concurrency_count=8)  # xdoctest: +SKIP
+        >>> limiter = AdaptiveConcurrencyLimiter(max_limit=64)  # xdoctest: +SKIP
+        >>> chunk_download = ChunkDownload(s3_client, s3_source, concurrency_limiter=limiter)  # xdoctest: +SKIP
+        >>> first_part = chunk_download.get_part()  # xdoctest: +SKIP
+        >>> chunk_download.run_until_complete()  # xdoctest: +SKIP
+        >>> with ChunkDownload(s3_client, s3_source) as chunk_download:  # xdoctest: +SKIP
+        ...     sample = chunk_download.sample()
+    """
+
     logger = logging.getLogger(__name__)
 
     def __init__(
@@ -21,30 +83,42 @@ class ChunkDownload(AsyncHandler):
         boto3_client: S3Client,
         s3_source: S3Source,
         callback_func: Optional[Callable[[bytes], Any]] = None,
+        adaptive_chunk_size: Optional[AdaptiveChunkSize] = None,
+        chunk_cache: Optional[ChunkCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
         **kwargs,
     ):
+        """Initialize ChunkDownload.
+
+        :param boto3_client: A boto3 S3 client object.
+        :param s3_source: The S3Source of the object to download.
+        :param callback_func: Function applied to every part by :meth:`run_until_complete`.
+        :param adaptive_chunk_size: Adapt the range size to the measured latency and bandwidth instead of using
+            the fixed ``s3_source.ChunkSize`` (the instance can be shared by several downloads).
+        :param chunk_cache: Check this on-disk cache before every ranged request and store fetched ranges in it
+            (the ranges are then aligned to the blocks of the cache).
+        :param retry_policy: Retries, timeouts and hedging of the ranged requests (by default, transient errors are
+            retried up to 4 times with exponential backoff).
+        :param kwargs: Additional keyword arguments of the :class:`AsyncHandler`.
+        :raises ValueError: If the s3_source object does not contain a key.
+        """
         super().__init__(**kwargs)
         self.logger.debug("Initializing ChunkDownload for %s", s3_source)
         if not s3_source.Key:
             raise ValueError(f"S3Source {s3_source!r} has no key!")
 
-        if s3_source.Extra:
-            self.gpg_home = s3_source.Extra.GPGHome
-            self.keyring_file_path = s3_source.Extra.KeyringFilePath
-            self.passphrase = s3_source.Extra.Passphrase
+        extra = s3_source.Extra or S3SourceExtra()
+        self.gpg_home = extra.GPGHome
+        self.keyring_file_path = extra.KeyringFilePath
+        self.passphrase = extra.Passphrase
 
         self.encryption = s3_source.ObjectEncryption
-        self.compression = s3_source.ObjectCompression
-
-        self.gz_compress = (
-            self.compression == Compression.gzip
-            or (self.compression == Compression.none and ".gz" in s3_source.Key[-3:])
-            or None
-        )
-        self.gz_decompress_obj = self.gz_compress and zlib.decompressobj(zlib.MAX_WBITS | 16) or None
+        self.compression = compression_from_key(s3_source.Key, s3_source.ObjectCompression)
+        self.decompress_obj = get_decompressor(self.compression)
         self.decrypt_obj = (
             self.encryption != Encryption.none and gnupg.GPG(gnupghome=os.path.expanduser(self.gpg_home)) or None
         )
+        self.__decrypt_stream: Optional[GPGStreamDecryptor] = None
 
         self.__callback_func = callback_func or (lambda x: x)
         self.boto3_client = boto3_client
@@ -52,36 +126,31 @@ class ChunkDownload(AsyncHandler):
         self.Key: str = s3_source.Key
         self.VersionId: str = s3_source.VersionId
         self.chunk_size: int = s3_source.ChunkSize
+        self.adaptive_chunk_size = adaptive_chunk_size
+        self.retry_policy = retry_policy or RetryPolicy()
 
         object_response = self.boto3_client.list_objects_v2(Bucket=s3_source.Bucket, Prefix=s3_source.Key)
         if object_response.get("KeyCount", 0) > 0:
             self.estimated_size = object_response["Contents"][0]["Size"]
+            self.ETag: str = object_response["Contents"][0].get("ETag", "")
         else:
             raise Exception("Object not found.")
 
-        self.estimated_parts: int = round(self.estimated_size / self.chunk_size + 0.5)
+        # ranges are only cached for identifiable object versions
+        self.chunk_cache = chunk_cache
+        self.__cache_version: str = chunk_cache and (self.VersionId or self.ETag) or ""
+
+        self.estimated_parts: int = max(1, math.ceil(self.estimated_size / self.chunk_size))
         self.upload_contents: bytearray = bytearray()
         self.part_counter: int = 0
         self.current_upload_content_count: int = 0
-
-        # Adjust the get_part method based on encryption and compression
-        if self.encryption != Encryption.none:
-            self.estimated_parts = 1
-            self.chunk_size = self.estimated_size
-            self.get_part = self.__get_encrypted_part
-        elif self.gz_compress:
-            self.get_part = self.__get_compressed_part
-        else:
-            self.get_part = self.__get_raw_part
+        self.__offset: int = 0
 
     def decrypt_data(self, encrypted_data):
         """
         Decrypts encrypted data using GPG.
         """
-        if self.keyring_file_path:
-            with open(os.path.expanduser(self.keyring_file_path), "rb") as keyring_file:
-                import_result = self.decrypt_obj.import_keys(keyring_file.read())
-                self.logger.debug(f"Key Import Result: {import_result.summary()}")
+        import_keyring_once(self.gpg_home, self.keyring_file_path)
         self.logger.debug(f"Decrypting data... {len(encrypted_data)} bytes.")
         decrypted_data = self.decrypt_obj.decrypt(encrypted_data, passphrase=self.passphrase)
         if decrypted_data.ok:
@@ -91,63 +160,464 @@ class ChunkDownload(AsyncHandler):
             self.logger.error(f"Decryption failed: {decrypted_data.status}")
             return None
 
-    def __get_encrypted_part(self):
+    def new_decrypt_stream(self) -> GPGStreamDecryptor:
+        """Starts a streaming decryptor for the object (keys are imported once per process).
+
+        :return: A new streaming decryptor.
+        :rtype: GPGStreamDecryptor
         """
-        Fetches an encrypted part of the S3 object, decrypts it, and optionally decompresses it.
+        return GPGStreamDecryptor(
+            gpg_home=self.gpg_home, passphrase=self.passphrase, keyring_file_path=self.keyring_file_path
+        )
+
+    def close(self):
+        """Terminates the streaming decryptor of the object (if any), e.g. if the download is not finished.
+
+        Decrypting again afterwards starts at the current part with a new decryptor.
         """
-        encrypted_part = self.__get_raw_part()
-        self.logger.debug(f"Encrypted Part: {len(encrypted_part)}")
-        decrypted_part = self.decrypt_data(encrypted_part)
-        if self.gz_compress:
-            return self.gz_decompress_obj.decompress(decrypted_part)
-        return decrypted_part
+        if self.__decrypt_stream is not None:
+            self.__decrypt_stream.close()
+            self.__decrypt_stream = None
+
+    def __enter__(self) -> "ChunkDownload":
+        return self
 
-    def __get_raw_part(self):
-        """Internal method to fetch a raw part of an S3 object, based on the current part counter.
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __next_range(self) -> Optional[Tuple[int, int]]:
+        """Internal method to reserve the byte range of the next part.
+
+        :return: The inclusive (start, end) byte range or None if the object is exhausted.
+        :rtype: Optional[Tuple[int, int]]
+        """
+        if self.__offset >= self.estimated_size:
+            return None
+        if self.adaptive_chunk_size:
+            self.chunk_size = self.adaptive_chunk_size.chunk_size
+        start = self.__offset
+        end = min(start + self.chunk_size, self.estimated_size) - 1
+        if self.__cache_version:
+            # parts of whole cache blocks are cached completely
+            end = self.chunk_cache.align(start, end, self.estimated_size)[1]
+        self.__offset = end + 1
+        return start, end
+
+    def __fetch_range(self, start: int, end: int) -> bytes:
+        """Internal method to fetch a raw byte range of the S3 object.
+
+        It only records its timing in the (thread-safe) adaptive chunk size, so it can safely run on the thread pool.
 
         :return: The raw part as bytes.
         :rtype: bytes
         """
-        self.part_counter += 1
-        self.logger.debug(f"parts: {self.part_counter} / {self.estimated_parts}")
-        # TODO Here we can implement more error-handling from response if needed
+        if not self.__cache_version:
+            return self.retry_policy.call(self.__fetch_range_once, start, end)
+        if (raw_part := self.chunk_cache.get(*self.__cache_key(start, end))) is not None:
+            return raw_part
+        # fetch the blocks covering the range, so all of them can be cached
+        block_start, block_end = self.chunk_cache.align(start, end, self.estimated_size)
+        raw_part = self.retry_policy.call(self.__fetch_range_once, block_start, block_end)
+        self.chunk_cache.put(*self.__cache_key(block_start, block_end), raw_part, size=self.estimated_size)
+        if (block_start, block_end) == (start, end):
+            return raw_part
+        return raw_part[start - block_start : end - block_start + 1]
+
+    def __fetch_range_once(self, start: int, end: int) -> bytes:
+        """Internal method to fetch a raw byte range in one attempt.
+
+        :raises OSError: If the response body is shorter than the range (the attempt is retried).
+        """
+        with self.request_slot() as timing:
+            body = self.__get_range_body(start, end)
+            timing.first_byte()
+            raw_part = body.read()
+        if len(raw_part) != min(end, self.estimated_size - 1) - start + 1:
+            raise OSError(f"Short read for bytes {start}-{end} of {self.Key}: {len(raw_part)} bytes.")
+        if self.adaptive_chunk_size:
+            first_byte = timing.first_byte_at
+            self.adaptive_chunk_size.record(
+                len(raw_part), first_byte - timing.started, time.perf_counter() - first_byte
+            )
+        return raw_part
+
+    def __cache_key(self, start: int, end: int) -> Tuple[str, str, str, int, int]:
+        """Internal method to get the chunk cache key (bucket, key, version, start, end) of a byte range."""
+        return self.Bucket, self.Key, self.__cache_version, start, end
+
+    def __fetch_range_into(self, view: memoryview, start: int, end: int, settled: threading.Event) -> int:
+        """Internal method to stream a raw byte range of the S3 object directly into ``view`` (no copies).
+
+        :param view: Writable memoryview of exactly ``end - start + 1`` bytes.
+        :param settled: Set once nothing writes into the view anymore (abandoned or hedged attempts of the retry
+            policy can still write after the range has been fetched).
+        :return: The number of bytes written.
+        :rtype: int
+        :raises IOError: If the response body ends before the view is filled.
+        """
+        settle = settled.set
+        try:
+            if self.__cache_version:
+                if self.chunk_cache.read_into(view, *self.__cache_key(start, end)):
+                    return len(view)
+                if self.chunk_cache.align(start, end, self.estimated_size) != (start, end):
+                    view[:] = self.__fetch_range(start, end)
+                    return len(view)
+            settle = None  # the retry policy sets the event
+            filled = self.retry_policy.call(self.__fetch_range_into_once, view, start, end, on_settled=settled.set)
+            if self.__cache_version:
+                self.chunk_cache.put(*self.__cache_key(start, end), view, size=self.estimated_size)
+            return filled
+        finally:
+            if settle:
+                settle()
+
+    def __fetch_range_into_once(self, view: memoryview, start: int, end: int) -> int:
+        """Internal method to stream a raw byte range into ``view`` in one attempt.
+
+        A retried (or hedged) attempt rewrites the whole view, the ``IfMatch`` condition of the request makes sure
+        that every attempt writes the same bytes.
+        """
+        filled = 0
+        with self.request_slot() as timing:
+            body = self.__get_range_body(start, end)
+            timing.first_byte()
+            while filled < len(view):
+                read_count = body.readinto(view[filled:])
+                if not read_count:
+                    break
+                filled += read_count
+        if filled != len(view):
+            raise OSError(f"Short read for bytes {start}-{end} of {self.Key}: {filled} / {len(view)} bytes.")
+        return filled
+
+    def __get_range_body(self, start: int, end: int):
+        """Internal method to request a byte range of the S3 object.
+
+        :return: The streaming body of the ranged GET request.
+        :rtype: botocore.response.StreamingBody
+        """
+        self.logger.debug(f"Fetching bytes {start}-{end} / {self.estimated_size} of {self.Key}")
+        # all ranges must belong to the same object version, also if the object is overwritten during the download
+        version = {"VersionId": self.VersionId} if self.VersionId else {"IfMatch": self.ETag} if self.ETag else {}
         return self.boto3_client.get_object(
             Bucket=self.Bucket,
             Key=self.Key,
-            Range=f"bytes={(self.part_counter - 1) * self.chunk_size}-" f"{self.part_counter * self.chunk_size - 1}",
-        )["Body"].read()
+            Range=f"bytes={start}-{end}",
+            **version,
+        )["Body"]
 
-    def __get_compressed_part(self):
-        """Internal method to fetch a compressed part of an S3 object and decompress it.
+    def __decode_part(self, raw_part: bytes, last: bool = False) -> bytes:
+        """Internal method to decrypt and decompress a raw part (must be called in part order).
 
-        :return: The decompressed part as bytes.
+        :param raw_part: The raw part as fetched from S3.
+        :param last: Whether this is the last part of the object (flushes the decompressor).
+        :return: The decoded part as bytes.
         :rtype: bytes
         """
-        return self.gz_decompress_obj.decompress(self.__get_raw_part())
+        part = raw_part
+        if self.decrypt_obj:
+            self.logger.debug(f"Encrypted Part: {len(raw_part)}")
+            if self.__decrypt_stream is None:
+                self.__decrypt_stream = self.new_decrypt_stream()
+            part = self.__decrypt_stream.update(raw_part)
+            if last:
+                part += self.__decrypt_stream.finalize()
+                self.__decrypt_stream = None
+        if self.decompress_obj:
+            part = self.decompress_obj.decompress(part)
+            if last:
+                part += self.decompress_obj.flush()
+        return part
 
-    def __get_last_part(self):
-        """Internal method to fetch the last part of an S3 object.
+    def get_part(self) -> bytes:
+        """Fetches the next part of the S3 object, decrypted and decompressed if required.
 
-        :return: The last part as bytes.
+        :return: The next part as bytes (empty if all parts have been fetched).
         :rtype: bytes
         """
-        self.part_counter += 1
-        # TODO Here we can implement more error-handling from response if needed
-        return self.boto3_client.get_object(
-            Bucket=self.Bucket,
-            Key=self.Key,
-            VersionId=self.VersionId or "null",
-            Range=f"bytes={(self.part_counter - 1) * self.chunk_size}-" f"{self.estimated_size}",
-        )["Body"].read()
+        part = b""
+        # a decoder may hold back all of a part (e.g. gpg packet headers), so continue until there is output
+        while not part and (byte_range := self.__next_range()):
+            self.part_counter += 1
+            self.logger.debug(f"parts: {self.part_counter} / {self.estimated_parts}")
+            part = self.__decode_part(self.__fetch_range(*byte_range), last=byte_range[1] >= self.estimated_size - 1)
+        return part
+
+    def iter_parts(
+        self, prefetch: Optional[int] = None, record_splitter: Optional[RecordSplitter] = None
+    ) -> Iterator[bytes]:
+        """Yields the remaining parts of the S3 object in order, decrypted and decompressed if required.
+
+        Up to ``prefetch`` ranged requests are kept in flight on the thread pool while the consumer processes the
+        current part, so download and evaluation overlap with at most ``prefetch`` raw parts held in memory.
+
+        :param prefetch: Number of parts to fetch ahead (defaults to the current concurrency).
+        :param record_splitter: Cut the parts at record boundaries, i.e. every yielded part consists of complete
+            records (CSV rows, JSON documents) and can be parsed on its own.
+        :return: An iterator over the decoded parts.
+        :rtype: Iterator[bytes]
+
+        :Example:
+
+        .. code-block:: python
+
+            >>> for part in chunk_download.iter_parts(prefetch=4):  # xdoctest: +SKIP
+            ...     process(part)
+            >>> splitter = CsvRecordSplitter(header=True)  # xdoctest: +SKIP
+            >>> for rows in chunk_download.iter_parts(record_splitter=splitter):  # xdoctest: +SKIP
+            ...     executor.submit(eval_csv, rows)
+        """
+        parts = self.__iter_decoded_parts(prefetch)
+        try:
+            yield from record_splitter.iter_split(parts) if record_splitter else parts
+        finally:
+            parts.close()
+            self.close()
+
+    def __iter_decoded_parts(self, prefetch: Optional[int]) -> Iterator[bytes]:
+        """Internal generator of the remaining decoded parts (see :meth:`iter_parts`)."""
+        calls = ((end, self.__fetch_range, start, end) for start, end in iter(self.__next_range, None))
+        for end, raw_part in self.__prefetch(calls, prefetch):
+            self.part_counter += 1
+            self.logger.debug(f"parts: {self.part_counter} / {self.estimated_parts}")
+            yield self.__decode_part(raw_part, last=end >= self.estimated_size - 1)
+
+    def __prefetch(
+        self, calls: Iterator[Tuple[Any, Callable, Any]], prefetch: Optional[int]
+    ) -> Iterator[Tuple[Any, Any]]:
+        """Internal generator to run calls on the thread pool with up to ``prefetch`` in flight.
+
+        Without ``prefetch``, the window follows the current concurrency of the handler.
+
+        :param calls: Iterator of (key, function, *args), consumed lazily.
+        :return: Iterator of (key, result) in the order of the calls.
+        """
+        pending: Deque[Tuple[Any, Future]] = deque()
+        try:
+            while True:
+                while len(pending) < max(1, prefetch or self.concurrency) and (call := next(calls, None)):
+                    pending.append((call[0], self.executor.submit(*call[1:])))
+                if not pending:
+                    return
+                key, future = pending.popleft()
+                yield key, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def build_gzip_index(self, span: int = GZIP_INDEX_SPAN, refresh: bool = False) -> GzipIndex:
+        """Builds the random-access index of a gzip object, or loads it from the gzip index cache.
+
+        The index is stored per object in the :class:`~filet.boto3.gzip_index_cache.GzipIndexCache` and reused
+        while the ETag of the object is unchanged. Building it needs one sequential pass over the object (ranged
+        requests are still prefetched).
+
+        :param span: Minimum number of uncompressed bytes between two checkpoints.
+        :param refresh: Rebuild the index even if a cached one exists.
+        :return: The index of the object.
+        :rtype: GzipIndex
+        :raises ValueError: If the object is not a (plain) gzip object.
+        """
+        if self.compression != Compression.gzip or self.encryption != Encryption.none:
+            raise ValueError(f"Only unencrypted gzip objects can be indexed, not {self.Key}.")
+        index = None if refresh else gzip_index_cache.get(self.Bucket, self.Key, self.ETag)
+        if index:
+            return index
+        builder = GzipIndexBuilder(span=span, etag=self.ETag)
+        calls = (
+            (None, self.__fetch_range, start, min(start + self.chunk_size, self.estimated_size) - 1)
+            for start in range(0, self.estimated_size, self.chunk_size)
+        )
+        for _, raw_part in self.__prefetch(calls, None):
+            builder.update(raw_part)
+        index = builder.finalize()
+        gzip_index_cache.put(self.Bucket, self.Key, index)
+        return index
+
+    def __fetch_segment(self, checkpoint: GzipCheckpoint, compressed_end: int) -> bytes:
+        """Internal method to fetch and decompress one indexed gzip segment (runs on the thread pool)."""
+        return decompress_segment(self.__fetch_range(checkpoint.compressed_offset, compressed_end - 1), checkpoint)
+
+    def iter_indexed_parts(
+        self, index: Optional[GzipIndex] = None, start_offset: int = 0, prefetch: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """Yields the uncompressed data of a gzip object from an arbitrary offset, decompressed in parallel.
+
+        The segments between the checkpoints of the index are fetched and decompressed on the thread pool
+        (``zlib`` releases the GIL), so up to ``prefetch`` segments are decompressed on different cores.
+        Objects without checkpoints (single member gzip without flush points) are decompressed sequentially.
+
+        :param index: The gzip index (built or loaded with :meth:`build_gzip_index` if not given).
+        :param start_offset: Uncompressed offset of the first yielded byte.
+        :param prefetch: Number of segments processed ahead (defaults to the current concurrency).
+        :return: An iterator over the uncompressed segments.
+        :rtype: Iterator[bytes]
+
+        :Example:
+
+        .. code-block:: python
+
+            >>> index = chunk_download.build_gzip_index()  # xdoctest: +SKIP
+            >>> offset = index.uncompressed_size // 2  # xdoctest: +SKIP
+            >>> sample = next(chunk_download.iter_indexed_parts(index, start_offset=offset))  # xdoctest: +SKIP
+        """
+        index = index or self.build_gzip_index()
+        segments = index.segments()[index.find(start_offset) :]
+        calls = ((checkpoint, self.__fetch_segment, checkpoint, end) for checkpoint, end, _ in segments)
+        for checkpoint, part in self.__prefetch(calls, prefetch):
+            yield part[max(0, start_offset - checkpoint.uncompressed_offset) :]
+
+    def read_into(self, buffer: Optional[Union[bytearray, mmap.mmap]] = None, use_mmap: bool = False) -> memoryview:
+        """Downloads the whole S3 object in parallel directly into one preallocated buffer.
+
+        Every ranged request is streamed with ``readinto`` into its own slice of the buffer, so the raw bytes are
+        never copied. Plain objects are returned as a view on that buffer; encrypted or compressed objects are
+        decoded once from it. The download is independent of :meth:`get_part` / :meth:`iter_parts`.
+
+        :param buffer: Writable buffer of at least ``estimated_size`` bytes (allocated if not given).
+        :param use_mmap: Allocate an anonymous ``mmap`` instead of a ``bytearray`` (keeps large objects off-heap).
+        :return: A memoryview of the (decoded) object.
+        :rtype: memoryview
+        :raises ValueError: If the given buffer is smaller than the object.
+
+        :Example:
+
+        .. code-block:: python
+
+            >>> view = chunk_download.read_into(use_mmap=True)  # xdoctest: +SKIP
+            >>> header = bytes(view[:100])  # xdoctest: +SKIP
+        """
+        if buffer is None:
+            buffer = mmap.mmap(-1, max(1, self.estimated_size)) if use_mmap else bytearray(self.estimated_size)
+        if len(buffer) < self.estimated_size:
+            raise ValueError(f"Buffer of {len(buffer)} bytes is too small for {self.estimated_size} bytes.")
+        view = memoryview(buffer)[: self.estimated_size]
+        range_size = self.chunk_size
+        if self.__cache_version:
+            range_size = self.chunk_cache.align(0, self.chunk_size - 1, self.estimated_size)[1] + 1
+        futures = []
+        for start in range(0, self.estimated_size, range_size):
+            end = min(start + range_size, self.estimated_size)
+            settled = threading.Event()
+            future = self.executor.submit(self.__fetch_range_into, view[start:end], start, end - 1, settled)
+            futures.append((future, settled))
+        try:
+            for future, _ in futures:
+                future.result()
+        finally:
+            # the buffer is handed out only once no (abandoned) attempt writes into it anymore
+            for future, settled in futures:
+                if not future.cancel():
+                    settled.wait()
+        if not self.decrypt_obj and self.compression == Compression.none:
+            return view
+        part = view
+        if self.decrypt_obj:
+            with self.new_decrypt_stream() as decrypt_stream:
+                part = decrypt_stream.update(view) + decrypt_stream.finalize()
+        if decompress_obj := get_decompressor(self.compression):
+            part = decompress_obj.decompress(part) + decompress_obj.flush()
+        return memoryview(part)
+
+    def sample(
+        self,
+        sample_size: int = SAMPLE_SIZE,
+        slices: int = 4,
+        max_records: Optional[int] = None,
+        quotechar: Optional[bytes] = None,
+    ) -> List[bytes]:
+        """Fetches a representative sample of a line-delimited object (e.g. CSV or JSON lines) for schema inference.
+
+        The sample consists of ``slices`` byte ranges spread over the object (the head, evenly spaced middle slices
+        and the tail), fetched concurrently. Each slice is cut to complete lines (or CSV records with ``quotechar``),
+        so the slices can be concatenated behind the head (which keeps e.g. the CSV header). Objects not larger than
+        ``sample_size`` are fetched completely. Compressed or encrypted objects can only be decoded from the start,
+        for those the sample is the head of the decoded object, cut to ``sample_size`` (fetched with
+        :meth:`iter_parts`, i.e. the parts are consumed), or the uncut head if no record ends in it.
+
+        :param sample_size: Target number of bytes of the sample.
+        :param slices: Number of byte ranges (1 samples the head only).
+        :param max_records: Maximum number of lines of the sample (split evenly between the slices).
+        :param quotechar: Cut the slices at CSV records with this quote character (see
+            :meth:`~filet.boto3.record_splitter.CsvRecordSplitter.align`), i.e. not at line breaks in quoted fields.
+        :return: The aligned slices, head first.
+        :rtype: List[bytes]
+
+        :Example:
+
+        .. code-block:: python
+
+            >>> csv_sample = chunk_download.sample(sample_size=4 * 1024 * 1024, quotechar=b'"')  # xdoctest: +SKIP
+            >>> csv_schema = eval_csv(b"".join(csv_sample))  # xdoctest: +SKIP
+        """
+        slices = max(1, slices)
+        align = CsvRecordSplitter(quotechar=quotechar).align if quotechar else _align_lines
+        if self.decrypt_obj or self.compression != Compression.none:
+            return [self.__sample_head(sample_size, max_records, align)]
+        if self.estimated_size <= sample_size:
+            return [align(self.__fetch_range(0, self.estimated_size - 1), False, False, max_records)]
+
+        slice_size = max(1, sample_size // slices)
+        last_start = self.estimated_size - slice_size
+        starts = sorted({round(i * last_start / max(1, slices - 1)) for i in range(slices)})
+        # a middle / tail slice starts one byte early to see whether its first line is complete
+        ranges = [(max(0, start - 1), start + slice_size - 1) for start in starts]
+        calls = ((byte_range, self.__fetch_range, *byte_range) for byte_range in ranges)
+        record_limit = max_records and max(1, max_records // len(ranges))
+        sample = [
+            align(raw, start > 0, end < self.estimated_size - 1, record_limit)
+            for (start, end), raw in self.__prefetch(calls, len(ranges))
+        ]
+        self.logger.debug(f"Sampled {sum(map(len, sample))} bytes in {len(sample)} slices of {self.Key}.")
+        return sample
+
+    def __sample_head(self, sample_size: int, max_records: Optional[int], align: Callable[..., bytes]) -> bytes:
+        """Internal method to sample (at most ``sample_size`` bytes of) the head of the decoded object."""
+        head = bytearray()
+        parts = self.iter_parts(prefetch=min(self.concurrency, math.ceil(sample_size / self.chunk_size)))
+        try:
+            for part in parts:
+                head += part
+                if len(head) >= sample_size or (max_records is not None and head.count(b"\n") >= max_records):
+                    # a decompressed part can be much larger than the sample, keep the first record at least
+                    # (or the head, if not even one record ends in it, e.g. a JSON document on a single line)
+                    sample = align(bytes(head[:sample_size]), False, True, max_records)
+                    return sample or align(bytes(head), False, True, 1) or bytes(head)
+        finally:
+            parts.close()
+            self.close()
+        return align(bytes(head), False, False, max_records)
 
     async def __run_until_complete(self):
-        """Internal asynchronous method that runs until all parts are downloaded."""
+        """Internal asynchronous method that runs until all parts are downloaded.
 
-        async def run():
+        The ranged requests run on the thread pool of the handler (at most ``concurrency`` in flight),
+        while the parts are decoded and passed to the callback in part order.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def fetch(start: int, end: int) -> bytes:
             async with self.semaphore:
-                self.__callback_func(self.get_part())
+                return await loop.run_in_executor(self.executor, self.__fetch_range, start, end)
 
-        await asyncio.gather(*(run() for _ in range(self.estimated_parts - self.part_counter)))
+        pending: Deque[Tuple[int, asyncio.Future]] = deque()
+        result = None
+        try:
+            while True:
+                while len(pending) < self.concurrency and (byte_range := self.__next_range()):
+                    pending.append((byte_range[1], asyncio.ensure_future(fetch(*byte_range))))
+                if not pending:
+                    return result
+                end, task = pending.popleft()
+                raw_part = await task
+                self.part_counter += 1
+                self.logger.debug(f"parts: {self.part_counter} / {self.estimated_parts}")
+                result = self.__callback_func(self.__decode_part(raw_part, last=end >= self.estimated_size - 1))
+        finally:
+            for _, task in pending:
+                task.cancel()
+            self.close()
 
     def run_until_complete(self):
         """Executes the download process until completion.
@@ -161,12 +631,4 @@ class ChunkDownload(AsyncHandler):
 
             result = chunk_download.run_until_complete()  # xdoctest: +SKIP
         """
-        self.event_loop.run_until_complete(self.__run_until_complete())
-        last_part = bytearray(
-            self.gz_decompress_obj.decompress(self.__get_last_part())
-            if self.gz_decompress_obj
-            else self.__get_last_part()
-        )
-        if self.gz_decompress_obj:
-            last_part.extend(self.gz_decompress_obj.flush())
-        return self.__callback_func(last_part)
+        return self.event_loop.run_until_complete(self.__run_until_complete())
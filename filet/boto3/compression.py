@@ -0,0 +1,204 @@
+"""Registry of incremental (streaming) codecs for every :class:`~filet.boto3.schema.Compression`.
+
+The codecs are used by :class:`~filet.boto3.chunk_download.ChunkDownload` and
+:class:`~filet.boto3.multipart_upload.MultipartUpload` to (de)compress objects part by part.
+Only gzip is handled by the standard library, the other codecs need their optional dependency
+(``zstandard``, ``lz4`` or ``python-snappy``), which is imported when the codec is first used.
+
+:Example:
+
+.. code-block:: python
+
+    >>> from filet.boto3.schema import Compression
+    >>> compressor = get_compressor(Compression.gzip)
+    >>> data = compressor.compress(b"some bytes") + compressor.flush()
+    >>> decompressor = get_decompressor(Compression.gzip)
+    >>> decompressor.decompress(data) + decompressor.flush()
+    b'some bytes'
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Protocol
+import zlib
+
+from filet.boto3.parallel_gzip import ParallelGzipCompressor
+from filet.boto3.schema import Compression
+
+
+class Decompressor(Protocol):
+    """Incremental decompressor interface (as ``zlib.decompressobj``)."""
+
+    def decompress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+class Compressor(Protocol):
+    """Incremental compressor interface (as ``zlib.compressobj``)."""
+
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+@dataclass
+class Codec:
+    """Factories for the incremental decompressor and compressor of a compression."""
+
+    decompressor: Callable[[], Decompressor]
+    compressor: Callable[[], Compressor]
+
+
+codecs: Dict[Compression, Codec] = {}
+
+
+def register_codec(
+    compression: Compression,
+    decompressor: Callable[[], Decompressor],
+    compressor: Callable[[], Compressor],
+) -> None:
+    """Register (or replace) the codec of a compression.
+
+    :param compression: The compression handled by the codec.
+    :param decompressor: Factory of a new incremental decompressor.
+    :param compressor: Factory of a new incremental compressor.
+    """
+    codecs[compression] = Codec(decompressor=decompressor, compressor=compressor)
+
+
+def get_decompressor(compression: Compression) -> Optional[Decompressor]:
+    """Create a new incremental decompressor.
+
+    :param compression: The compression of the data.
+    :return: The decompressor or None for uncompressed data.
+    :raises NotImplementedError: If no codec is registered for the compression.
+    """
+    if compression == Compression.none:
+        return None
+    if compression not in codecs:
+        raise NotImplementedError(f"No codec registered for {compression}.")
+    return codecs[compression].decompressor()
+
+
+def get_compressor(compression: Compression, threads: int = 1) -> Optional[Compressor]:
+    """Create a new incremental compressor.
+
+    :param compression: The compression of the data.
+    :param threads: Compress blocks in parallel on this number of threads (gzip only, see
+        :class:`~filet.boto3.parallel_gzip.ParallelGzipCompressor`).
+    :return: The compressor or None for uncompressed data.
+    :raises NotImplementedError: If no codec is registered for the compression.
+    """
+    if compression == Compression.none:
+        return None
+    if compression == Compression.gzip and threads > 1:
+        return ParallelGzipCompressor(threads=threads)
+    if compression not in codecs:
+        raise NotImplementedError(f"No codec registered for {compression}.")
+    return codecs[compression].compressor()
+
+
+# key suffix -> compression, the values of Compression and common alternative suffixes
+COMPRESSION_SUFFIXES: Dict[str, Compression] = {
+    **{c.value: c for c in Compression if c.value},
+    ".zst": Compression.zstd,
+}
+
+
+def compression_from_key(key: str, compression: Compression = Compression.none) -> Compression:
+    """Get the compression of an object, falling back to the suffix of its key.
+
+    >>> compression_from_key("data/file.csv.gz")
+    <Compression.gzip: '.gz'>
+    >>> compression_from_key("data/file.json.zst")
+    <Compression.zstd: '.zstd'>
+    >>> compression_from_key("data/file.csv")
+    <Compression.none: ''>
+    """
+    if compression != Compression.none:
+        return compression
+    return next((c for suffix, c in COMPRESSION_SUFFIXES.items() if key.endswith(suffix)), Compression.none)
+
+
+def _import(module: str, package: str) -> Any:
+    """Import an optional codec dependency."""
+    try:
+        return __import__(module, fromlist=["_"])
+    except ImportError as e:
+        raise ImportError(f"Install '{package}' to handle this compression (pip install {package}).") from e
+
+
+class MultiFrameDecompressor:
+    """Decompresses concatenated frames / members by restarting the frame decompressor at the end of each frame.
+
+    Frame decompressors (``zlib``, ``zstandard``, ``lz4.frame``) stop at the end of the first frame, while
+    concatenated frames are valid streams (e.g. multi-member gzip).
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self.__factory = factory
+        self.__obj = factory()
+
+    def decompress(self, data: bytes) -> bytes:
+        out = []
+        while data:
+            out.append(self.__obj.decompress(data))
+            if not self.__obj.eof:
+                break
+            data = self.__obj.unused_data
+            self.__obj = self.__factory()
+        return b"".join(out)
+
+    def flush(self) -> bytes:
+        return self.__obj.flush() if hasattr(self.__obj, "flush") else b""
+
+
+class LZ4FrameCompressor:
+    """Adapter of ``lz4.frame.LZ4FrameCompressor`` to the compressor interface (writes the frame header)."""
+
+    def __init__(self):
+        self.__obj = _import("lz4.frame", "lz4").LZ4FrameCompressor()
+        self.__header = self.__obj.begin()
+
+    def compress(self, data: bytes) -> bytes:
+        header, self.__header = self.__header, b""
+        return header + self.__obj.compress(data)
+
+    def flush(self) -> bytes:
+        header, self.__header = self.__header, b""
+        return header + self.__obj.flush()
+
+
+class SnappyStreamDecompressor:
+    """Adapter of ``snappy.StreamDecompressor`` to the decompressor interface (accepts any bytes-like input)."""
+
+    def __init__(self):
+        self.__obj = _import("snappy", "python-snappy").StreamDecompressor()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self.__obj.decompress(bytes(data))
+
+    def flush(self) -> bytes:
+        return self.__obj.flush()
+
+
+register_codec(
+    Compression.gzip,
+    lambda: MultiFrameDecompressor(lambda: zlib.decompressobj(zlib.MAX_WBITS | 16)),
+    lambda: zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, zlib.MAX_WBITS | 16),
+)
+register_codec(
+    Compression.zstd,
+    lambda: MultiFrameDecompressor(_import("zstandard", "zstandard").ZstdDecompressor().decompressobj),
+    lambda: _import("zstandard", "zstandard").ZstdCompressor().compressobj(),
+)
+register_codec(
+    Compression.lz4,
+    lambda: MultiFrameDecompressor(_import("lz4.frame", "lz4").LZ4FrameDecompressor),
+    LZ4FrameCompressor,
+)
+register_codec(
+    Compression.snappy,
+    SnappyStreamDecompressor,
+    lambda: _import("snappy", "python-snappy").StreamCompressor(),
+)
@@ -1,46 +1,453 @@
 import asyncio
+from functools import partial
 import logging
-from typing import Optional
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, List, Optional, Set, Union
 
 from filet.boto3.async_handler import AsyncHandler
-from filet.boto3.schema import ListObjectsV2CommonPrefix, ListObjectsV2Content, ListObjectsV2Result
+from filet.boto3.inventory import InventoryReader
+from filet.boto3.listing_cache import ListingCache
+from filet.boto3.schema import ListObjectsV2Content, ListObjectsV2Result, S3Source
 from filet.boto3.utils import extract_file_meta
+from filet.config.cache_db import ListingWatermark, store
 from filet.config.objects_pattern import ObjectsPattern
 
 logger = logging.getLogger(__name__)
 
+# probe points of the key space (after the listed prefix) when sampling the bounds of shards (sorted)
+SHARD_ALPHABET = "!-.0123456789=ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+MAX_SAMPLE_DEPTH = 64
+MAX_SAMPLE_BRANCHES = 8
+MAX_KEY_CHAR = "\U0010ffff"  # sorts after all characters of keys (also in UTF-8)
+
 
 def fetch_s3_sources(
     s3_client,
     bucket_name,
-    max_keys_per_prefix: int = 20,
+    max_keys_per_prefix: int = 1000,
     objects_pattern: Optional[ObjectsPattern] = None,
     async_handler: Optional[AsyncHandler] = None,
     prefix: str = "",
-):
+    watermark: Optional[str] = None,
+    key_ordered: bool = False,
+    shards: int = 1,
+    shard_alphabet: str = "",
+    listing_cache: Optional[ListingCache] = None,
+    refresh: bool = False,
+    inventory_manifest: Optional[str] = None,
+) -> List[S3Source]:
+    """Lists all objects below a prefix (recursively along the delimiter "/") and extracts their meta.
+
+    See :func:`list_objects`. With ``watermark``, only the objects that are new since the watermark of that name
+    (e.g. the stage) was last advanced with :func:`advance_watermark` are returned, i.e. objects modified after
+    the newest listed ``LastModified``. If new objects always get greater keys than the existing ones (e.g.
+    date-named keys), ``key_ordered`` lists only the keys after the greatest listed key (``StartAfter``), so the
+    cost of the listing scales with the new objects instead of the whole prefix.
+
+    With ``shards``, the prefix is listed flat (without delimiter) in key ranges that are listed concurrently,
+    for large prefixes without sub-prefixes to parallelize on (see :func:`list_objects`).
+
+    With ``inventory_manifest``, the objects are read from an S3 Inventory report of the bucket instead of being
+    listed (see :class:`~filet.boto3.inventory.InventoryReader`): no ``list_objects_v2`` requests, but only the
+    objects as of the report date.
+
+    :param s3_client: A boto3 S3 client object.
+    :param bucket_name: The bucket.
+    :param max_keys_per_prefix: The number of keys per listed page (``MaxKeys``, at most 1000).
+    :param objects_pattern: The patterns to extract the meta (dates, extra fields) from the keys.
+    :param async_handler: Runs the requests (its thread pool, semaphore and adaptive limiter bound the concurrency).
+    :param prefix: The prefix to list.
+    :param watermark: Return only new objects since this watermark in ``store.watermarks`` (all if it is unset).
+    :param key_ordered: New objects have greater keys than the existing ones (list them with ``StartAfter``).
+    :param shards: Split the key space into this number of concurrently listed ranges (1 lists along "/").
+    :param shard_alphabet: Split the key space at these characters after the prefix instead of sampled keys.
+    :param listing_cache: Use the (unexpired) pages of this cache and cache the requested pages.
+    :param refresh: Request all pages, also if they are cached.
+    :param inventory_manifest: Read the objects from the inventory report of this ``manifest.json`` (a local path
+        or ``s3://bucket/key``).
+    :return: The objects, ordered by key.
+    :rtype: List[S3Source]
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> s3_sources = fetch_s3_sources(s3_client, "bucket", prefix="data/")  # xdoctest: +SKIP
+        >>> new_s3_sources = fetch_s3_sources(s3_client, "bucket", prefix="data/", watermark="stage")  # xdoctest: +SKIP
+        >>> advance_watermark("stage", new_s3_sources)  # after the objects are processed  # xdoctest: +SKIP
+        >>> s3_sources = fetch_s3_sources(s3_client, "bucket", prefix="logs/", shards=16)  # xdoctest: +SKIP
+        >>> manifest = "s3://inventory-bucket/bucket/config/2024-01-01T01-00Z/manifest.json"
+        >>> s3_sources = fetch_s3_sources(s3_client, "bucket", inventory_manifest=manifest)  # xdoctest: +SKIP
+    """
     if not async_handler:
         async_handler = AsyncHandler()
 
-    objects = ListObjectsV2Result(
-        **s3_client.list_objects_v2(Bucket=bucket_name, Prefix=prefix, Delimiter="/", MaxKeys=max_keys_per_prefix)
+    listing_watermark = store.watermarks.get(watermark) if watermark else None
+    start_after = listing_watermark.start_after if listing_watermark and key_ordered else ""
+    if inventory_manifest:
+        inventory = _iter_inventory(s3_client, bucket_name, inventory_manifest, async_handler, prefix, start_after)
+        contents = sorted((obj for batch in inventory for obj in batch), key=lambda obj: obj.Key)
+        objects = ListObjectsV2Result(Name=bucket_name, Prefix=prefix, Contents=contents)
+    else:
+        objects = async_handler.event_loop.run_until_complete(
+            list_objects(
+                s3_client,
+                bucket_name,
+                prefix,
+                max_keys_per_prefix,
+                async_handler,
+                start_after=start_after,
+                shards=shards,
+                shard_alphabet=shard_alphabet,
+                listing_cache=listing_cache,
+                refresh=refresh,
+            )
+        )
+    if listing_watermark and not key_ordered:
+        objects.Contents = [obj for obj in objects.Contents if _is_new(obj, listing_watermark)]
+    logger.debug("Listed %s objects in %s/%s", len(objects.Contents), bucket_name, prefix)
+    return extract_file_meta(objects, objects_pattern or ObjectsPattern())
+
+
+class _ListingStopped(Exception):
+    """The consumer of :func:`iter_s3_sources` stopped, the listing is cancelled."""
+
+
+def iter_s3_sources(
+    s3_client,
+    bucket_name,
+    max_keys_per_prefix: int = 1000,
+    objects_pattern: Optional[ObjectsPattern] = None,
+    async_handler: Optional[AsyncHandler] = None,
+    prefix: str = "",
+    watermark: Optional[str] = None,
+    key_ordered: bool = False,
+    shards: int = 1,
+    shard_alphabet: str = "",
+    listing_cache: Optional[ListingCache] = None,
+    refresh: bool = False,
+    inventory_manifest: Optional[str] = None,
+    max_pending_pages: int = 8,
+) -> Iterator[List[S3Source]]:
+    """Lists the objects below a prefix like :func:`fetch_s3_sources`, but yields the objects of every listed page
+    as soon as it arrives, while the listing continues in the background.
+
+    The listing runs on its own event loop in a background thread (the requests on the thread pool of the async
+    handler), so the event loop of the async handler stays free for the caller. At most ``max_pending_pages``
+    pages wait for the consumer (the listing pauses while they are not consumed), so the memory stays flat for
+    any number of objects. The batches are in listing order (not ordered by key across batches). Stopping the
+    iteration cancels the listing.
+
+    :param max_pending_pages: The number of listed pages buffered for the consumer (the other parameters are
+        the ones of :func:`fetch_s3_sources`).
+    :return: An iterator over the objects of each page (with extracted meta, empty pages are skipped).
+    :rtype: Iterator[List[S3Source]]
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> for s3_sources in iter_s3_sources(s3_client, "bucket", prefix="data/"):  # xdoctest: +SKIP
+        ...     ingest(s3_sources)
+    """
+    async_handler = async_handler or AsyncHandler()
+    objects_pattern = objects_pattern or ObjectsPattern()
+    listing_watermark = store.watermarks.get(watermark) if watermark else None
+    start_after = listing_watermark.start_after if listing_watermark and key_ordered else ""
+    pages: "queue.Queue[Union[List[ListObjectsV2Content], Exception, None]]" = queue.Queue(max_pending_pages)
+    stopped = threading.Event()
+
+    def put(item: Union[List[ListObjectsV2Content], Exception, None]) -> None:
+        while not stopped.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise _ListingStopped()
+
+    def produce() -> None:
+        try:
+            if inventory_manifest:
+                for batch in _iter_inventory(
+                    s3_client, bucket_name, inventory_manifest, async_handler, prefix, start_after
+                ):
+                    put(batch)
+                put(None)
+                return
+            event_loop = asyncio.new_event_loop()
+            try:
+                event_loop.run_until_complete(
+                    list_objects(
+                        s3_client,
+                        bucket_name,
+                        prefix,
+                        max_keys_per_prefix,
+                        async_handler,
+                        start_after=start_after,
+                        shards=shards,
+                        shard_alphabet=shard_alphabet,
+                        on_page=put,
+                        listing_cache=listing_cache,
+                        refresh=refresh,
+                    )
+                )
+            finally:
+                event_loop.close()
+            put(None)
+        except _ListingStopped:
+            pass
+        except Exception as e:  # noqa: BLE001 raised again by the consumer
+            try:
+                put(e)
+            except _ListingStopped:
+                pass
+
+    def get() -> Union[List[ListObjectsV2Content], Exception, None]:
+        while True:
+            try:
+                return pages.get(timeout=0.1)
+            except queue.Empty:
+                if producer.is_alive():
+                    continue
+            try:
+                return pages.get_nowait()
+            except queue.Empty:
+                raise RuntimeError(f"The listing of {bucket_name}/{prefix} stopped unexpectedly.") from None
+
+    producer = threading.Thread(target=produce, name=f"iter_s3_sources({bucket_name}/{prefix})", daemon=True)
+    producer.start()
+    try:
+        while (item := get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            if listing_watermark and not key_ordered:
+                item = [obj for obj in item if _is_new(obj, listing_watermark)]
+            if item:
+                yield extract_file_meta(ListObjectsV2Result(Name=bucket_name, Contents=item), objects_pattern)
+    finally:
+        stopped.set()
+        producer.join()
+
+
+def _iter_inventory(
+    s3_client, bucket_name: str, manifest: str, async_handler: AsyncHandler, prefix: str, start_after: str
+) -> Iterator[List[ListObjectsV2Content]]:
+    """Yields the objects of the data files of an inventory report of the bucket (after ``start_after``)."""
+    reader = InventoryReader(manifest, s3_client, max_workers=async_handler.limit_concurrency_count)
+    if reader.manifest.sourceBucket and reader.manifest.sourceBucket != bucket_name:
+        raise ValueError(f"The inventory {manifest} is a report of {reader.manifest.sourceBucket}, not {bucket_name}.")
+    for objects in reader.iter_objects(prefix=prefix):
+        yield [obj for obj in objects if obj.Key > start_after] if start_after else objects
+
+
+def _is_new(obj: ListObjectsV2Content, listing_watermark: ListingWatermark) -> bool:
+    """Whether an object was modified after the watermark (or at its time, but not listed yet)."""
+    if listing_watermark.last_modified is None or obj.LastModified > listing_watermark.last_modified:
+        return True
+    return obj.LastModified == listing_watermark.last_modified and obj.Key not in listing_watermark.keys
+
+
+def advance_watermark(watermark: str, objects: Iterable[ListObjectsV2Content]) -> ListingWatermark:
+    """Advances a watermark of incremental listings past the given objects (call it after they are processed).
+
+    :param watermark: The name of the watermark in ``store.watermarks`` (e.g. the stage).
+    :param objects: The processed objects (e.g. returned by :func:`fetch_s3_sources`).
+    :return: The new watermark.
+    :rtype: ListingWatermark
+    """
+    listing_watermark = store.watermarks.get(watermark) or ListingWatermark()
+    objects = list(objects)
+    if not objects:
+        return listing_watermark
+    newest = max(obj.LastModified for obj in objects)
+    newest_keys = [obj.Key for obj in objects if obj.LastModified == newest]
+    if listing_watermark.last_modified is None or newest > listing_watermark.last_modified:
+        last_modified, keys = newest, newest_keys
+    elif newest == listing_watermark.last_modified:
+        last_modified, keys = newest, sorted(set(listing_watermark.keys) | set(newest_keys))
+    else:
+        last_modified, keys = listing_watermark.last_modified, listing_watermark.keys
+    store.watermarks[watermark] = ListingWatermark(
+        start_after=max(listing_watermark.start_after, max(obj.Key for obj in objects)),
+        last_modified=last_modified,
+        keys=keys,
     )
+    store.save()
+    return store.watermarks[watermark]
+
+
+async def list_objects(
+    s3_client,
+    bucket_name: str,
+    prefix: str = "",
+    max_keys: int = 1000,
+    async_handler: Optional[AsyncHandler] = None,
+    start_after: str = "",
+    shards: int = 1,
+    shard_alphabet: str = "",
+    on_page: Optional[Callable[[List[ListObjectsV2Content]], None]] = None,
+    listing_cache: Optional[ListingCache] = None,
+    refresh: bool = False,
+) -> ListObjectsV2Result:
+    """Lists all objects and prefixes below a prefix, recursively along the delimiter "/".
+
+    Every prefix is listed completely (following ``NextContinuationToken``). The blocking requests run on the
+    thread pool of the async handler, at most ``limit_concurrency_count`` at once (its semaphore, and the slots of
+    its adaptive limiter if any). The sub-prefixes found on a page are listed concurrently with the next pages.
+
+    A flat prefix (e.g. millions of date-named keys) has no sub-prefixes to parallelize on. With ``shards``, the
+    whole prefix is listed without delimiter in lexicographic key ranges ``(bound, next bound]``, which are listed
+    concurrently (each from ``StartAfter=bound`` up to the next bound) and merged. The bounds are the characters
+    of ``shard_alphabet`` after the prefix, or sampled keys: the first keys after probe points
+    (:data:`SHARD_ALPHABET`) are requested with ``MaxKeys=1``, descending one character at a time into the
+    found branches until enough distinct keys are known.
+
+    :param s3_client: A boto3 S3 client object.
+    :param bucket_name: The bucket.
+    :param prefix: The prefix to list.
+    :param max_keys: The number of keys per page (``MaxKeys``, at most 1000).
+    :param async_handler: Runs the requests.
+    :param start_after: List only the keys (and the prefixes of keys) after this key.
+    :param shards: The number of concurrently listed key ranges (1 lists along the delimiter).
+    :param shard_alphabet: The characters after the prefix to split the key space at (sampled if empty).
+    :param on_page: Called with the objects of every listed page instead of collecting them in the result.
+    :param listing_cache: Use the (unexpired) pages of this cache and cache the requested pages.
+    :param refresh: Request all pages, also if they are cached.
+    :return: The objects (unless passed to ``on_page``) and common prefixes of the whole tree (no prefixes if
+        sharded), ordered by key.
+    :rtype: ListObjectsV2Result
+    """
+    async_handler = async_handler or AsyncHandler()
+    loop = asyncio.get_running_loop()
+    objects = ListObjectsV2Result(Name=bucket_name, Prefix=prefix, MaxKeys=max_keys)
+    tasks: List[asyncio.Future] = []
+
+    def add(contents: List[ListObjectsV2Content]) -> None:
+        if start_after:
+            contents = [obj for obj in contents if obj.Key > start_after]
+        if on_page:
+            on_page(contents)
+        else:
+            objects.Contents.extend(contents)
+
+    def request(**kwargs) -> dict:
+        kwargs = {"Bucket": bucket_name, "MaxKeys": max_keys, **kwargs}
+        if listing_cache and (response := listing_cache.get(refresh=refresh, **kwargs)) is not None:
+            return response
+        with async_handler.request_slot():
+            response = s3_client.list_objects_v2(**kwargs)
+        if listing_cache:
+            listing_cache.put(response, **kwargs)
+        return response
 
-    async def _fetch_prefix(prefix: ListObjectsV2CommonPrefix):
-        """Asynchronously fetch objects for a given prefix."""
-        logger.debug("Fetching objects for prefix %s", prefix.Prefix)
+    async def list_page(**kwargs) -> ListObjectsV2Result:
         async with async_handler.semaphore:
-            _objects = s3_client.list_objects_v2(
-                Bucket=bucket_name, Prefix=prefix.Prefix, Delimiter="/", MaxKeys=max_keys_per_prefix
-            )
-            if "Contents" in _objects:
-                objects.Contents.extend(ListObjectsV2Content(**obj) for obj in _objects["Contents"])
-            if "CommonPrefixes" in _objects:
-                prefixes = [ListObjectsV2CommonPrefix(**prefix) for prefix in _objects["CommonPrefixes"]]
-                objects.CommonPrefixes.extend(prefixes)
-                await asyncio.gather(*(_fetch_prefix(prefix) for prefix in prefixes))
-
-    async_handler.event_loop.run_until_complete(
-        asyncio.gather(*(_fetch_prefix(prefix) for prefix in objects.CommonPrefixes))
-    )
+            response = await loop.run_in_executor(async_handler.executor, partial(request, **kwargs))
+        return ListObjectsV2Result(**response)
 
-    return extract_file_meta(objects, objects_pattern or ObjectsPattern())
+    async def list_prefix(current_prefix: str) -> None:
+        logger.debug("Fetching objects for prefix %s", current_prefix)
+        kwargs = {"StartAfter": _start_after(current_prefix, start_after)} if start_after > current_prefix else {}
+        sub_prefixes = []
+        while True:
+            page = await list_page(Prefix=current_prefix, Delimiter="/", **kwargs)
+            add(page.Contents)
+            objects.CommonPrefixes.extend(page.CommonPrefixes)
+            new_tasks = [asyncio.ensure_future(list_prefix(p.Prefix)) for p in page.CommonPrefixes]
+            sub_prefixes.extend(new_tasks)
+            tasks.extend(new_tasks)
+            if not page.IsTruncated or not page.NextContinuationToken:
+                break
+            kwargs = {"ContinuationToken": page.NextContinuationToken}
+        await asyncio.gather(*sub_prefixes)
+
+    async def list_range(lower: str, upper: Optional[str]) -> None:
+        logger.debug("Fetching objects of %s in (%s, %s]", prefix, lower, upper)
+        kwargs = {"StartAfter": lower} if lower else {}
+        while True:
+            page = await list_page(Prefix=prefix, **kwargs)
+            contents = [obj for obj in page.Contents if upper is None or obj.Key <= upper]
+            add(contents)
+            if len(contents) < len(page.Contents) or not page.IsTruncated or not page.NextContinuationToken:
+                break
+            kwargs = {"ContinuationToken": page.NextContinuationToken}
+
+    async def first_key_after(key: str) -> Optional[str]:
+        page = await list_page(Prefix=prefix, StartAfter=key, MaxKeys=1)
+        return page.Contents[0].Key if page.Contents else None
+
+    async def sample_branch(base: str) -> Set[str]:
+        # the keys one character below the base: a branch without fork (e.g. a common date prefix) is descended
+        # with two requests, only forks are probed at every character of the alphabet
+        first = await first_key_after(max(base, start_after))
+        if not first or not first.startswith(base) or len(first) <= len(base):
+            return set()
+        other = await first_key_after(first[: len(base) + 1] + MAX_KEY_CHAR)
+        if not other or not other.startswith(base):
+            return {first}
+        probes = sorted({max(base + char, start_after) for char in SHARD_ALPHABET if base + char > first})
+        keys = await asyncio.gather(*map(first_key_after, probes))
+        return {first, other} | {key for key in keys if key and key.startswith(base)}
+
+    async def sample_bounds() -> List[str]:
+        sampled, bases = set(), [prefix]
+        for _ in range(MAX_SAMPLE_DEPTH):
+            keys = set().union(*await asyncio.gather(*map(sample_branch, bases)))
+            sampled |= keys
+            if len(sampled) >= shards or not keys:
+                break
+            depth = len(bases[0]) + 1
+            bases = sorted({key[:depth] for key in keys if len(key) >= depth})
+            bases = bases[:: -(-len(bases) // MAX_SAMPLE_BRANCHES)]
+        logger.debug("Sampled %s keys of %s", len(sampled), prefix)
+        return _pick_bounds(sorted(sampled), shards)
+
+    try:
+        if shards > 1:
+            if shard_alphabet:
+                bounds = [prefix + char for char in sorted(set(shard_alphabet))]
+            else:
+                bounds = await sample_bounds()
+            bounds = [bound for bound in bounds if bound > start_after]
+            lowers, uppers = [start_after] + bounds, bounds + [None]
+            tasks.extend(asyncio.ensure_future(list_range(lower, upper)) for lower, upper in zip(lowers, uppers))
+            await asyncio.gather(*tasks)
+        else:
+            await list_prefix(prefix)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    objects.Contents.sort(key=lambda obj: obj.Key)
+    objects.CommonPrefixes.sort(key=lambda common_prefix: common_prefix.Prefix)
+    objects.KeyCount = len(objects.Contents)
+    return objects
+
+
+def _start_after(prefix: str, start_after: str) -> str:
+    """The ``StartAfter`` of a listing with delimiter, which keeps the common prefix containing ``start_after``
+    (the listed keys are filtered by ``start_after`` afterwards).
+
+    >>> _start_after("logs/", "logs/2024/01.csv")
+    'logs/2024'
+    >>> _start_after("logs/2024/", "logs/2024/01.csv")
+    'logs/2024/01.csv'
+    """
+    if not start_after.startswith(prefix) or "/" not in start_after[len(prefix) :]:
+        return start_after
+    return prefix + start_after[len(prefix) :].split("/", 1)[0]
+
+
+def _pick_bounds(keys: List[str], shards: int) -> List[str]:
+    """Evenly picks the bounds of (at most) ``shards`` key ranges from sorted sample keys.
+
+    >>> _pick_bounds(["a", "b", "c", "d", "e", "f"], 3)
+    ['c', 'e']
+    >>> _pick_bounds(["a", "b"], 4)
+    ['a', 'b']
+    """
+    if len(keys) < shards:
+        return keys
+    return sorted({keys[len(keys) * i // shards] for i in range(1, shards)})
@@ -0,0 +1,175 @@
+"""Streaming GPG decryption through one long-lived gpg process per object."""
+
+import logging
+import os
+import queue
+import subprocess
+import threading
+from typing import List, Set, Tuple
+
+import gnupg
+
+logger = logging.getLogger(__name__)
+
+_imported_keyrings: Set[Tuple[str, str]] = set()
+_import_lock = threading.Lock()
+
+
+def import_keyring_once(gpg_home: str, keyring_file_path: str) -> None:
+    """Import the keys of a keyring file into a GPG home, once per process.
+
+    :param gpg_home: The GPG home directory.
+    :param keyring_file_path: Path to the keyring file (nothing is imported if empty).
+    """
+    if not keyring_file_path:
+        return
+    keyring = (os.path.expanduser(gpg_home), os.path.expanduser(keyring_file_path))
+    with _import_lock:
+        if keyring in _imported_keyrings:
+            return
+        with open(keyring[1], "rb") as keyring_file:
+            import_result = gnupg.GPG(gnupghome=keyring[0] or None).import_keys(keyring_file.read())
+        logger.debug(f"Key Import Result: {import_result.summary()}")
+        _imported_keyrings.add(keyring)
+
+
+class GPGStreamDecryptor:
+    """Incrementally decrypts a GPG stream by piping it through a gpg process.
+
+    Ciphertext is written to the stdin of gpg with :meth:`update`, while a reader thread collects the plaintext
+    from its stdout, so neither the ciphertext nor the plaintext has to be held in memory as a whole. :meth:`update`
+    does not wait for gpg: it returns the plaintext decrypted so far, :meth:`finalize` closes the input of gpg and
+    returns the rest. :meth:`close` (or leaving the ``with`` block) terminates gpg if the stream is abandoned.
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> decryptor = GPGStreamDecryptor(gpg_home="~/.gnupg", passphrase="secret")  # xdoctest: +SKIP
+        >>> plaintext = decryptor.update(first_part) + decryptor.update(last_part)  # xdoctest: +SKIP
+        >>> plaintext += decryptor.finalize()  # xdoctest: +SKIP
+        >>> with GPGStreamDecryptor(passphrase="secret") as decryptor:  # xdoctest: +SKIP
+        ...     head = decryptor.update(first_part)
+    """
+
+    def __init__(
+        self,
+        gpg_home: str = "",
+        passphrase: str = "",
+        keyring_file_path: str = "",
+        gpg_binary: str = "gpg",
+        read_size: int = 1 << 16,
+    ):
+        """Start the gpg process.
+
+        :param gpg_home: The GPG home directory (gpg default if empty).
+        :param passphrase: The passphrase of the secret key (passed through a pipe, never on the command line).
+        :param keyring_file_path: Keyring file to import once per process before decrypting.
+        :param gpg_binary: The gpg executable.
+        :param read_size: Maximum number of bytes read from gpg at once.
+        """
+        import_keyring_once(gpg_home, keyring_file_path)
+        self.read_size = read_size
+        args = [gpg_binary, "--batch", "--no-tty", "--yes", "--quiet", "--decrypt"]
+        if gpg_home:
+            args += ["--homedir", os.path.expanduser(gpg_home)]
+        pass_fds: Tuple[int, ...] = ()
+        if passphrase:
+            read_fd, write_fd = os.pipe()
+            os.write(write_fd, passphrase.encode("utf-8"))
+            os.close(write_fd)
+            args += ["--pinentry-mode", "loopback", "--passphrase-fd", str(read_fd)]
+            pass_fds = (read_fd,)
+        try:
+            self.process = subprocess.Popen(
+                args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, pass_fds=pass_fds
+            )
+        finally:
+            for fd in pass_fds:
+                os.close(fd)
+        self.__output: queue.Queue = queue.Queue()
+        self.__stderr: List[bytes] = []
+        self.__reader = threading.Thread(target=self.__read_stdout, daemon=True)
+        self.__stderr_reader = threading.Thread(target=self.__read_stderr, daemon=True)
+        self.__reader.start()
+        self.__stderr_reader.start()
+
+    def __read_stdout(self):
+        """Internal method (reader thread) to collect the plaintext of gpg."""
+        while chunk := self.process.stdout.read1(self.read_size):
+            self.__output.put(chunk)
+
+    def __read_stderr(self):
+        """Internal method (reader thread) to collect the status messages of gpg."""
+        self.__stderr.extend(self.process.stderr)
+
+    def __drain(self) -> bytes:
+        """Internal method to collect the plaintext that is available so far (without waiting)."""
+        chunks = []
+        try:
+            while True:
+                chunks.append(self.__output.get_nowait())
+        except queue.Empty:
+            pass
+        return b"".join(chunks)
+
+    def update(self, data: bytes) -> bytes:
+        """Write ciphertext to gpg and return the plaintext that is available so far.
+
+        :param data: The next ciphertext part.
+        :return: The plaintext decrypted up to now (may be empty, gpg may still be decrypting the part).
+        :rtype: bytes
+        """
+        try:
+            self.process.stdin.write(data)
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            # gpg exited early (e.g. wrong passphrase), finalize raises with its status
+            return self.finalize()
+        return self.__drain()
+
+    def finalize(self) -> bytes:
+        """Close the input of gpg and return the remaining plaintext.
+
+        :return: The remaining plaintext.
+        :rtype: bytes
+        :raises ValueError: If gpg could not decrypt the stream.
+        """
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        # the readers end with the output of gpg, i.e. all plaintext is in the queue afterwards
+        self.__reader.join()
+        self.__stderr_reader.join()
+        try:
+            if self.process.wait() != 0:
+                status = b"".join(self.__stderr).decode("utf-8", errors="replace").strip()
+                logger.error(f"Decryption failed: {status}")
+                raise ValueError(f"Decryption failed: {status}")
+            logger.debug("Decryption successful.")
+            return self.__drain()
+        finally:
+            self.close()
+
+    def close(self):
+        """Terminate the gpg process if it is still running (e.g. if the download is aborted) and release its
+        pipes and reader threads. Can be called repeatedly."""
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        # gpg has exited, so the readers reach the end of its output before the pipes are closed
+        self.__reader.join()
+        self.__stderr_reader.join()
+        self.process.stdout.close()
+        self.process.stderr.close()
+
+    def __enter__(self) -> "GPGStreamDecryptor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,304 @@
+"""Random-access index for gzip objects.
+
+A gzip stream can only be decompressed from the start, unless the decompressor is restarted at a point where
+
+* a new gzip member begins (multi-member gzip, e.g. BGZF or concatenated parallel compression), or
+* the deflate stream was flushed (``Z_SYNC_FLUSH`` / ``Z_FULL_FLUSH``, e.g. ``pigz``): the next deflate block
+  starts byte aligned and can be inflated with the last 32 KiB of output as dictionary (zran-style checkpoint).
+
+:class:`GzipIndexBuilder` finds such checkpoints (at least ``span`` uncompressed bytes apart) in one sequential
+pass. With the resulting :class:`GzipIndex` the segments between two checkpoints can be decompressed
+independently (see :func:`decompress_segment`), i.e. in parallel or starting at an arbitrary offset.
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass, field
+import logging
+from typing import List, Optional, Tuple
+import zlib
+
+from filet.boto3.compression import get_decompressor
+from filet.boto3.schema import Compression
+
+logger = logging.getLogger(__name__)
+
+GZIP_INDEX_SPAN = 8 * 1024 * 1024
+WINDOW_SIZE = 32 * 1024
+SYNC_FLUSH_MARKER = b"\x00\x00\xff\xff"
+VERIFY_SIZE = 4096
+
+_FHCRC, _FEXTRA, _FNAME, _FCOMMENT = 2, 4, 8, 16
+
+
+@dataclass
+class GzipCheckpoint:
+    """A point of a gzip stream where decompression can start.
+
+    :ivar compressed_offset: Offset in the compressed object.
+    :ivar uncompressed_offset: Offset in the uncompressed data.
+    :ivar member_start: Whether a gzip member (header) starts at the offset.
+    :ivar window: The zlib compressed dictionary (last 32 KiB of output) of a flush point.
+    """
+
+    compressed_offset: int
+    uncompressed_offset: int
+    member_start: bool = True
+    window: bytes = b""
+
+
+@dataclass
+class GzipIndex:
+    """Checkpoints of a gzip object (see :class:`GzipIndexBuilder`)."""
+
+    etag: str = ""
+    compressed_size: int = 0
+    uncompressed_size: int = 0
+    members: int = 0
+    bgzf: bool = False
+    checkpoints: List[GzipCheckpoint] = field(default_factory=list)
+
+    @property
+    def is_random_access(self) -> bool:
+        """Whether the object can be decompressed in more than one segment."""
+        return len(self.checkpoints) > 1
+
+    def segments(self) -> List[Tuple[GzipCheckpoint, int, int]]:
+        """Get the independently decompressible segments.
+
+        :return: List of (start checkpoint, compressed end offset, uncompressed end offset).
+        """
+        ends = [(cp.compressed_offset, cp.uncompressed_offset) for cp in self.checkpoints[1:]]
+        ends.append((self.compressed_size, self.uncompressed_size))
+        return [(cp, *end) for cp, end in zip(self.checkpoints, ends)]
+
+    def find(self, uncompressed_offset: int) -> int:
+        """Get the position of the last checkpoint at or before an uncompressed offset."""
+        return max(0, bisect_right([cp.uncompressed_offset for cp in self.checkpoints], uncompressed_offset) - 1)
+
+
+def parse_gzip_header(data: bytes) -> Optional[Tuple[int, bool]]:
+    """Parse a gzip member header.
+
+    :param data: The bytes starting at the member.
+    :return: (header length, whether it is a BGZF block) or None if the header is incomplete.
+    :raises ValueError: If the data is not a gzip member.
+
+    >>> import gzip
+    >>> parse_gzip_header(gzip.compress(b"data", mtime=0))
+    (10, False)
+    """
+    if len(data) < 10:
+        return None
+    if data[:3] != b"\x1f\x8b\x08":
+        raise ValueError("Not a gzip member (invalid magic bytes).")
+    flags, position, bgzf = data[3], 10, False
+    if flags & _FEXTRA:
+        if len(data) < position + 2:
+            return None
+        extra_length = int.from_bytes(data[position : position + 2], "little")
+        extra = data[position + 2 : position + 2 + extra_length]
+        if len(extra) < extra_length:
+            return None
+        bgzf = extra[:2] == b"BC"
+        position += 2 + extra_length
+    for flag in (_FNAME, _FCOMMENT):
+        if flags & flag:
+            end = data.find(b"\x00", position)
+            if end < 0:
+                return None
+            position = end + 1
+    if flags & _FHCRC:
+        position += 2
+    return (position, bgzf) if len(data) >= position else None
+
+
+class GzipIndexBuilder:
+    """Builds a :class:`GzipIndex` from the compressed parts of a gzip object (in order).
+
+    Flush points are only used as checkpoints after a second decompressor, started at the flush point with the
+    window as dictionary, produced the same output as the sequential decompressor (``VERIFY_SIZE`` bytes or up to
+    the end of the member). This rejects marker bytes that occur by chance in the compressed data.
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> builder = GzipIndexBuilder(span=1024 * 1024)  # xdoctest: +SKIP
+        >>> for part in compressed_parts:  # xdoctest: +SKIP
+        ...     builder.update(part)
+        >>> index = builder.finalize()  # xdoctest: +SKIP
+    """
+
+    def __init__(self, span: int = GZIP_INDEX_SPAN, etag: str = ""):
+        """Initialize the builder.
+
+        :param span: Minimum number of uncompressed bytes between two checkpoints.
+        :param etag: ETag of the indexed object.
+        """
+        self.span = span
+        self.index = GzipIndex(etag=etag)
+        self.__state = "header"
+        self.__pending = bytearray()  # unparsed header / trailer bytes or held back deflate bytes
+        self.__offset = 0  # compressed offset of the next byte that is not pending
+        self.__inflate = zlib.decompressobj(-zlib.MAX_WBITS)
+        self.__window = bytearray()
+        self.__candidate: Optional[Tuple[GzipCheckpoint, "zlib._Decompress", int]] = None
+
+    def __add_checkpoint(self, checkpoint: GzipCheckpoint) -> None:
+        """Internal method to add a checkpoint if it is at least ``span`` bytes after the previous one."""
+        checkpoints = self.index.checkpoints
+        if not checkpoints or checkpoint.uncompressed_offset - checkpoints[-1].uncompressed_offset >= self.span:
+            checkpoints.append(checkpoint)
+
+    def __flush_point(self) -> None:
+        """Internal method to start the verification of a flush point (byte aligned deflate block start)."""
+        uncompressed_offset = self.index.uncompressed_size
+        if self.__candidate or not self.__window:
+            return
+        if uncompressed_offset - self.index.checkpoints[-1].uncompressed_offset < self.span:
+            return
+        checkpoint = GzipCheckpoint(
+            self.__offset, uncompressed_offset, member_start=False, window=zlib.compress(bytes(self.__window))
+        )
+        self.__candidate = (checkpoint, zlib.decompressobj(-zlib.MAX_WBITS, zdict=bytes(self.__window)), 0)
+
+    def __inflate_chunk(self, data: bytes) -> None:
+        """Internal method to inflate deflate data of the current member and verify the pending flush point."""
+        out = self.__inflate.decompress(data)
+        if self.__candidate:
+            checkpoint, shadow, verified = self.__candidate
+            try:
+                matches = shadow.decompress(data) == out
+            except zlib.error:
+                matches = False
+            if not matches:
+                self.__candidate = None
+            elif verified + len(out) >= VERIFY_SIZE or (self.__inflate.eof and shadow.eof):
+                self.__candidate = None
+                self.__add_checkpoint(checkpoint)
+            else:
+                self.__candidate = (checkpoint, shadow, verified + len(out))
+        self.index.uncompressed_size += len(out)
+        self.__window.extend(out)
+        del self.__window[:-WINDOW_SIZE]
+
+    def __consume_deflate(self, data: bytes, final: bool = False) -> bytes:
+        """Internal method to consume deflate data, split after each flush marker.
+
+        :return: The data after the end of the member (empty while the member continues).
+        """
+        data = bytes(self.__pending) + data
+        self.__pending.clear()
+        position = 0
+        while position < len(data) or final:
+            marker = data.find(SYNC_FLUSH_MARKER, position)
+            # hold back a tail that could be the start of a marker split across parts
+            end = marker + len(SYNC_FLUSH_MARKER) if marker >= 0 else len(data) if final else len(data) - 3
+            end = max(position, end)
+            self.__inflate_chunk(data[position:end])
+            if self.__inflate.eof:
+                unused_data = self.__inflate.unused_data + data[end:]
+                self.__offset += end - position - len(self.__inflate.unused_data)
+                self.__state = "trailer"
+                self.__candidate = None
+                return unused_data
+            self.__offset += end - position
+            position = end
+            if marker < 0:
+                self.__pending.extend(data[position:])
+                return b""
+            self.__flush_point()
+        return b""
+
+    def update(self, data: bytes) -> None:
+        """Consume the next compressed part.
+
+        :param data: The compressed part.
+        :raises ValueError: If the object is not gzip compressed.
+        """
+        self.__process(bytes(data))
+
+    def __process(self, data: bytes) -> None:
+        """Internal method to consume compressed data depending on the current position in the stream."""
+        while data:
+            if self.__state == "deflate":
+                data = self.__consume_deflate(data)
+            elif self.__state == "trailer":
+                missing = 8 - len(self.__pending)
+                self.__pending.extend(data[:missing])
+                data = data[missing:]
+                if len(self.__pending) == 8:
+                    self.__offset += 8
+                    self.__pending.clear()
+                    self.__state = "header"
+            elif self.__state == "header":
+                self.__pending.extend(data)
+                data = self.__consume_header()
+            else:
+                return
+
+    def __consume_header(self) -> bytes:
+        """Internal method to parse the pending member header and start the member.
+
+        :return: The data after the header (empty while the header is incomplete).
+        """
+        try:
+            header = parse_gzip_header(self.__pending)
+        except ValueError:
+            if not self.index.members:
+                raise
+            logger.warning(f"Ignoring {len(self.__pending)} trailing bytes after the last gzip member.")
+            self.__state = "done"
+            return b""
+        if header is None:
+            return b""
+        length, bgzf = header
+        self.index.bgzf = bgzf if not self.index.members else self.index.bgzf and bgzf
+        self.index.members += 1
+        self.__add_checkpoint(GzipCheckpoint(self.__offset, self.index.uncompressed_size))
+        data = bytes(self.__pending[length:])
+        self.__pending.clear()
+        self.__offset += length
+        self.__inflate = zlib.decompressobj(-zlib.MAX_WBITS)
+        self.__window.clear()
+        self.__state = "deflate"
+        return data
+
+    def finalize(self) -> GzipIndex:
+        """Finish the index after the last part.
+
+        :return: The index of the object.
+        :raises ValueError: If the gzip stream is truncated.
+        """
+        if self.__state == "deflate":
+            self.__process(self.__consume_deflate(b"", final=True))
+        if self.__state in ("deflate", "trailer") or not self.index.members:
+            raise ValueError("Truncated gzip stream.")
+        if self.__state == "header" and self.__pending:
+            logger.warning(f"Ignoring {len(self.__pending)} trailing bytes after the last gzip member.")
+        self.index.compressed_size = self.__offset
+        logger.debug(
+            f"Gzip index: {len(self.index.checkpoints)} checkpoints, {self.index.members} members, "
+            f"bgzf: {self.index.bgzf}"
+        )
+        return self.index
+
+
+def decompress_segment(data: bytes, checkpoint: GzipCheckpoint) -> bytes:
+    """Decompress the compressed bytes of a segment, starting at its checkpoint.
+
+    :param data: The compressed bytes from the checkpoint to the next one (or the end of the object).
+    :param checkpoint: The checkpoint at the start of the data.
+    :return: The uncompressed segment.
+    """
+    if checkpoint.member_start:
+        decompressor = get_decompressor(Compression.gzip)
+        return decompressor.decompress(data) + decompressor.flush()
+    inflate = zlib.decompressobj(-zlib.MAX_WBITS, zdict=zlib.decompress(checkpoint.window))
+    out = inflate.decompress(data)
+    if not inflate.eof:
+        return out + inflate.flush()
+    if next_members := inflate.unused_data[8:]:
+        # the segment continues with the next members (after the trailer of the current one)
+        out += decompress_segment(next_members, GzipCheckpoint(0, 0))
+    return out
@@ -0,0 +1,67 @@
+"""Persistent cache of gzip indices."""
+
+import logging
+from typing import Optional
+
+from sqlitedict import SqliteDict
+
+from filet.boto3.gzip_index import GzipIndex
+from filet.config.cache_db import DATABASE_URL, CacheTable
+
+logger = logging.getLogger(__name__)
+
+
+class GzipIndexCache:
+    """Caches the :class:`~filet.boto3.gzip_index.GzipIndex` of gzip objects in their own table of the cache database.
+
+    The indices hold a 32 KiB window per checkpoint, so every index is a single entry of a
+    :class:`~filet.config.cache_db.CacheTable`. An index is used while the ETag of its object is unchanged.
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> cache = GzipIndexCache()  # xdoctest: +SKIP
+        >>> cache.put("bucket", "data/file.csv.gz", index)  # xdoctest: +SKIP
+        >>> index = cache.get("bucket", "data/file.csv.gz", etag=index.etag)  # xdoctest: +SKIP
+    """
+
+    def __init__(self, db_path: str = DATABASE_URL):
+        """Initialize the cache.
+
+        :param db_path: The SqliteDict database (by default the one of the cache store).
+        """
+        self.db_path = db_path
+        self.__table = CacheTable(self.__class__.__name__, db_path)
+
+    @property
+    def db(self) -> SqliteDict:
+        """The table of the cached indices (opened on first use)."""
+        return self.__table.db
+
+    def get(self, bucket: str, key: str, etag: str) -> Optional[GzipIndex]:
+        """Get the cached index of an object version.
+
+        :param bucket: The bucket.
+        :param key: The key of the object.
+        :param etag: The current ETag of the object.
+        :return: The index or None if no index of this ETag is cached.
+        :rtype: Optional[GzipIndex]
+        """
+        index = self.db.get(f"{bucket}/{key}")
+        if index is None or index.etag != etag:
+            return None
+        logger.debug("Gzip index cache hit: %s/%s", bucket, key)
+        return index
+
+    def put(self, bucket: str, key: str, index: GzipIndex) -> None:
+        """Cache the index of an object (replaces the index of a previous version).
+
+        :param bucket: The bucket.
+        :param key: The key of the object.
+        :param index: The index (with the ETag of the indexed version).
+        """
+        self.db[f"{bucket}/{key}"] = index
+
+
+gzip_index_cache = GzipIndexCache()
@@ -0,0 +1,328 @@
+"""Columnar (bulk) extraction of the key meta.
+
+:func:`extract_file_meta_bulk` computes the fields of :func:`~filet.boto3.utils.extract_file_meta` for a whole
+column of keys with Arrow compute kernels (RE2 regular expressions) instead of one Python call chain per key, and
+creates the :class:`S3Source` objects only when they are accessed (:class:`S3SourceFrame`).
+
+Keys the kernels cannot handle exactly like :class:`~filet.boto3.utils.KeyMetaExtractor` (non-ASCII keys, keys
+that are parsed as URL, keys ending with ``/``) and patterns RE2 does not support are extracted per key.
+"""
+
+import logging
+import re
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union, overload
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from filet.boto3.schema import Compression, Encryption, Format, S3Source
+from filet.boto3.utils import KeyMetaExtractor, key_meta_extractor
+from filet.config.objects_pattern import ObjectsPattern
+
+logger = logging.getLogger(__name__)
+
+META_SCHEMA = pa.schema(
+    [
+        ("DateStr", pa.string()),
+        ("DateFormat", pa.string()),
+        ("FileDate", pa.timestamp("us")),
+        ("KeyPattern", pa.string()),
+        ("ObjectBaseName", pa.string()),
+        ("ObjectSuffix", pa.string()),
+        ("ObjectEncryption", pa.string()),
+        ("ObjectCompression", pa.string()),
+        ("ObjectFormat", pa.string()),
+        ("Prefix", pa.string()),
+    ]
+)
+# keys that are not plain paths for urlparse, end with an empty or "." path component (also once a suffix like
+# ".gpg" is split off a last component "..gpg") or are not ASCII
+IRREGULAR_KEY_PATTERN = r"^[A-Za-z][A-Za-z0-9+.\-]*:|^//|[?#;\t\r\n]|^[\x00-\x20]|(^|/)\.?$|(^|/)\.\.[^/]*$"
+SUFFIX_PATTERN = r"[^/](?P<suffix>\.[^./]+)$"
+S3_SOURCE_BATCH_SIZE = 65536
+
+Keys = Union[pa.Array, pa.ChunkedArray, pa.Table, pd.Series, pd.DataFrame, Sequence[str]]
+
+
+class _NotVectorizable(Exception):
+    """The patterns cannot be evaluated by the compute kernels (e.g. capture groups)."""
+
+
+class S3SourceFrame(Sequence[S3Source]):
+    """The objects with their extracted meta as Arrow table, which creates the :class:`S3Source` objects only on
+    access (by index or iteration).
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> s3_sources = extract_file_meta_bulk(["data/2024-01-01.csv.gz"], bucket="bucket")
+        >>> s3_sources.table.column("KeyPattern").to_pylist()
+        ['data/<Y-m-d>.csv.gz']
+        >>> s3_sources[0].ObjectCompression
+        <Compression.gzip: '.gz'>
+    """
+
+    def __init__(self, table: pa.Table, bucket: str = ""):
+        """Initialize the frame.
+
+        :param table: The listed objects (at least ``Key``) and their meta columns.
+        :param bucket: The bucket of the objects (overrides a ``Bucket`` column).
+        """
+        self.table = table
+        self.bucket = bucket
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    @overload
+    def __getitem__(self, index: int) -> S3Source: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "S3SourceFrame": ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return S3SourceFrame(self.table.take(np.arange(len(self))[index]), self.bucket)
+        if not -len(self) <= index < len(self):
+            raise IndexError(f"Index {index} out of range of {len(self)} objects.")
+        return self.__s3_source(self.table.slice(index % len(self), 1).to_pylist()[0])
+
+    def __iter__(self) -> Iterator[S3Source]:
+        for batch in self.table.to_batches(max_chunksize=S3_SOURCE_BATCH_SIZE):
+            yield from map(self.__s3_source, batch.to_pylist())
+
+    def __s3_source(self, row: Dict[str, Any]) -> S3Source:
+        """Internal method to create the S3Source of a row (null fields keep their defaults)."""
+        if self.bucket:
+            row["Bucket"] = self.bucket
+        return S3Source(**{name: value for name, value in row.items() if value is not None})
+
+    def to_pandas(self) -> pd.DataFrame:
+        """Get the objects as DataFrame."""
+        return self.table.to_pandas()
+
+
+def extract_file_meta_bulk(
+    keys: Keys, objects_pattern: Optional[ObjectsPattern] = None, bucket: str = ""
+) -> S3SourceFrame:
+    """Extract the meta of a column of keys (the bulk path of :func:`~filet.boto3.utils.extract_file_meta`).
+
+    :param keys: The keys (a string column) or the listed objects (a table with a ``Key`` column, e.g. of an
+        inventory report, whose other columns are kept).
+    :param objects_pattern: The patterns to extract the meta (dates, extra fields) from the keys.
+    :param bucket: The bucket of the objects.
+    :return: The objects with the extracted meta.
+    :rtype: S3SourceFrame
+    """
+    if isinstance(keys, pd.DataFrame):
+        keys = pa.Table.from_pandas(keys, preserve_index=False)
+    if isinstance(keys, pa.Table):
+        table = keys
+    else:
+        table = pa.table({"Key": pa.chunked_array([pa.array(keys, pa.string())])})
+    key_column = pc.fill_null(table.column("Key").cast(pa.string()).combine_chunks(), "")
+    meta = _extract_meta_table(key_meta_extractor(objects_pattern or ObjectsPattern()), key_column, bucket)
+    for name in meta.column_names:
+        if name in table.column_names:
+            table = table.drop_columns([name])
+        table = table.append_column(name, meta.column(name))
+    return S3SourceFrame(table, bucket)
+
+
+def _extract_meta_table(extractor: KeyMetaExtractor, keys: pa.Array, bucket: str) -> pa.Table:
+    """The meta columns of the keys (see :data:`META_SCHEMA`)."""
+    logger.debug("Extracting file meta of %s keys in bulk", len(keys))
+    try:
+        columns = _extract_ext(keys, bucket)
+        columns.update(_extract_dates(extractor, keys))
+        columns["KeyPattern"] = _extract_patterns(extractor, columns["KeyPattern"])
+        irregular = pc.or_(pc.invert(pc.string_is_ascii(keys)), pc.match_substring_regex(keys, IRREGULAR_KEY_PATTERN))
+    except (_NotVectorizable, pa.ArrowInvalid) as e:
+        logger.debug("Extracting the file meta per key: %s", e)
+        columns = {field.name: pa.nulls(len(keys), field.type) for field in META_SCHEMA}
+        irregular = pa.array(np.ones(len(keys), dtype=bool))
+
+    irregular_rows = np.flatnonzero(irregular.to_numpy(zero_copy_only=False))
+    if len(irregular_rows):
+        metas = [extractor.extract_meta(key, bucket) for key in keys.take(irregular_rows).to_pylist()]
+        for field in META_SCHEMA:
+            values = [_field_value(meta.get(field.name)) for meta in metas]
+            columns[field.name] = pc.replace_with_mask(columns[field.name], irregular, pa.array(values, field.type))
+
+    return pa.table(
+        {
+            field.name: columns[field.name] if field.name == "FileDate" else pc.fill_null(columns[field.name], "")
+            for field in META_SCHEMA
+        },
+        schema=META_SCHEMA,
+    )
+
+
+def _field_value(value: Any) -> Any:
+    """The column value of an extracted field."""
+    return value.value if isinstance(value, (Encryption, Compression, Format)) else value
+
+
+def _first_group(array: pa.Array, pattern: str) -> pa.Array:
+    """The first group of the first match of a pattern (null if it does not match)."""
+    return pc.struct_field(pc.extract_regex(array, pattern), [0])
+
+
+def _extract_ext(keys: pa.Array, bucket: str) -> Dict[str, pa.Array]:
+    """Split the encryption, compression and format suffixes off the keys (as ``KeyMetaExtractor.extract_ext``)."""
+    base = pc.utf8_ltrim(keys, characters="/")
+    suffix = pc.fill_null(_first_group(keys, SUFFIX_PATTERN), "")
+    has_suffix = pc.not_equal(suffix, "")
+    columns = {}
+    for field, suffix_type in (
+        ("ObjectEncryption", Encryption),
+        ("ObjectCompression", Compression),
+        ("ObjectFormat", Format),
+    ):
+        column = pa.nulls(len(keys), pa.string())
+        stripped = pa.array(np.zeros(len(keys), dtype=bool))
+        for member in suffix_type:
+            mask = pc.and_(has_suffix, pc.equal(suffix, member.value))
+            if not pc.any(mask).as_py():
+                continue
+            column = pc.if_else(mask, member.value, column)
+            # an empty suffix (after stripping the last one) strips the whole base name, like base[:-0]
+            base = pc.if_else(mask, pc.utf8_slice_codeunits(base, 0, -len(member.value)) if member.value else "", base)
+            stripped = pc.or_(stripped, mask)
+        if pc.any(stripped).as_py():
+            suffix = pc.if_else(stripped, pc.fill_null(_first_group(base, SUFFIX_PATTERN), ""), suffix)
+        columns[field] = column
+
+    prefix = pc.list_element(pc.split_pattern(base, "/", max_splits=1, reverse=True), 0)
+    prefix = pc.if_else(pc.and_(has_suffix, pc.not_equal(prefix, bucket)), prefix, "")
+    columns.update(ObjectBaseName=base, ObjectSuffix=suffix, Prefix=prefix)
+    return columns
+
+
+def _find_all(keys: pa.Array, regex: re.Pattern) -> List[tuple]:
+    """The matches of a pattern in the keys as (row indices, matches) per match number (like ``findall``)."""
+    if regex.groups:
+        raise _NotVectorizable(f"Pattern with groups: {regex.pattern}")
+    counts = pc.count_substring_regex(keys, regex.pattern).to_numpy(zero_copy_only=False)
+    matches = []
+    for number in range(int(counts.max()) if len(counts) else 0):
+        rows = np.flatnonzero(counts > number)
+        # skip the first matches lazily, which finds the following match like a scan of findall
+        pattern = f"(?s)^(?:.*?(?:{regex.pattern})){{{number}}}.*?(?P<match>{regex.pattern})"
+        matches.append((rows, _first_group(keys.take(rows), pattern)))
+    return matches
+
+
+def _extract_dates(extractor: KeyMetaExtractor, keys: pa.Array) -> Dict[str, pa.Array]:
+    """Extract the first date of the keys and the key patterns (as ``KeyMetaExtractor.extract_date``)."""
+    candidates = pc.and_(pc.not_equal(keys, ""), pc.not_equal(keys, "nan"))
+    if extractor.date_regex:
+        candidates = pc.and_(candidates, pc.match_substring_regex(keys, extractor.date_regex.pattern))
+    candidate_rows = np.flatnonzero(candidates.to_numpy(zero_copy_only=False))
+    candidate_keys = keys.take(candidate_rows)
+    found = [
+        (candidate_rows[rows], matches)
+        for regex in extractor.date_regexes
+        for rows, matches in _find_all(candidate_keys, regex)
+    ]
+
+    key_pattern = pc.if_else(pc.equal(keys, "nan"), "", keys)
+    columns = {
+        "DateStr": pa.nulls(len(keys), pa.string()),
+        "DateFormat": pa.nulls(len(keys), pa.string()),
+        "FileDate": pa.nulls(len(keys), pa.timestamp("us")),
+        "KeyPattern": key_pattern,
+    }
+    if not found:
+        return columns
+
+    # the matches of a key in the order of findall per pattern (the sort is stable)
+    rows = np.concatenate([rows for rows, _ in found])
+    order = np.argsort(rows, kind="stable")
+    rows = rows[order]
+    date_strs = pc.dictionary_encode(pa.concat_arrays([matches.cast(pa.string()) for _, matches in found]).take(order))
+    uniques = date_strs.dictionary.to_pylist()
+    indices = date_strs.indices.to_numpy()
+    parsed = [extractor.parse_date(date_str) for date_str in uniques]
+    is_parsed = np.array([parsed_date is not None for parsed_date in parsed], dtype=bool)[indices]
+
+    # keys with dates that do not match any format get an empty key pattern
+    first_matches = _first_of_rows(rows)
+    dated_rows = rows[first_matches]
+    first_parsed = _first_of_rows(rows[is_parsed])
+    parsed_rows = rows[is_parsed][first_parsed]
+    key_pattern = pc.replace_with_mask(
+        key_pattern, _row_mask(len(keys), dated_rows), pa.array([""] * len(dated_rows), pa.string())
+    )
+    if not len(parsed_rows):
+        return columns | {"KeyPattern": key_pattern}
+
+    first_matches = first_matches[np.isin(dated_rows, parsed_rows, assume_unique=True)]
+    parsed_mask = _row_mask(len(keys), parsed_rows)
+    first_parsed_dates = [parsed[index] for index in indices[is_parsed][first_parsed]]
+    columns["DateStr"] = pc.replace_with_mask(
+        columns["DateStr"], parsed_mask, date_strs.take(first_matches).cast(pa.string())
+    )
+    columns["FileDate"] = pc.replace_with_mask(
+        columns["FileDate"], parsed_mask, pa.array([date for date, _ in first_parsed_dates], pa.timestamp("us"))
+    )
+    columns["DateFormat"] = pc.replace_with_mask(
+        columns["DateFormat"], parsed_mask, pa.array([date_format for _, date_format in first_parsed_dates])
+    )
+
+    # replace the dates in the order of their matches (overlapping dates, e.g. of several patterns, are kept)
+    tokens = [f"<{parsed_date[1].replace('%', '')}>" if parsed_date else None for parsed_date in parsed]
+    key_patterns = keys.take(parsed_rows).to_pylist()
+    for position, index in zip(np.searchsorted(parsed_rows, rows[is_parsed]).tolist(), indices[is_parsed].tolist()):
+        key_patterns[position] = key_patterns[position].replace(uniques[index], tokens[index])
+    columns["KeyPattern"] = pc.replace_with_mask(key_pattern, parsed_mask, pa.array(key_patterns, pa.string()))
+    return columns
+
+
+def _extract_patterns(extractor: KeyMetaExtractor, key_patterns: pa.Array) -> pa.Array:
+    """Replace the matches of the extra patterns in the key patterns (as ``KeyMetaExtractor.extract_pattern``)."""
+    for replace_str, combined, regexes in extractor.extra_regexes:
+        if combined is None:
+            raise _NotVectorizable(f"Extra patterns that cannot be combined: {replace_str}")
+        mask = pc.and_(pc.not_equal(key_patterns, ""), pc.match_substring_regex(key_patterns, combined.pattern))
+        rows = np.flatnonzero(pc.fill_null(mask, False).to_numpy(zero_copy_only=False))
+        if not len(rows):
+            continue
+        values = key_patterns.take(rows)
+        if len(regexes) == 1 and not regexes[0].groups:
+            # a single match is replaced by the kernels; keys with several matches per key as before
+            single = pc.equal(pc.count_substring_regex(values, regexes[0].pattern), 1)
+            rewrite = replace_str.replace("\\", "\\\\")
+            replaced = pc.replace_substring_regex(values, regexes[0].pattern, rewrite, max_replacements=1)
+            if pc.any(pc.match_substring(replaced, replace_str * 2)).as_py():
+                replaced = pc.replace_substring_regex(replaced, f"(?:{re.escape(replace_str)})+", rewrite)
+            several = np.flatnonzero(pc.invert(single).to_numpy(zero_copy_only=False))
+            values = pc.if_else(single, replaced, values)
+        else:
+            several = np.arange(len(rows))
+        if len(several):
+            replaced_values = [
+                extractor.replace_extra(value, replace_str, regexes) for value in values.take(several).to_pylist()
+            ]
+            values = pc.replace_with_mask(values, _row_mask(len(values), several), pa.array(replaced_values))
+        key_patterns = pc.replace_with_mask(key_patterns, _row_mask(len(key_patterns), rows), values)
+    return key_patterns
+
+
+def _first_of_rows(rows: np.ndarray) -> np.ndarray:
+    """The positions of the first entries of each row in sorted row indices.
+
+    >>> _first_of_rows(np.array([0, 0, 2, 5, 5, 5])).tolist()
+    [0, 2, 3]
+    """
+    return np.flatnonzero(np.diff(rows, prepend=-1))
+
+
+def _row_mask(length: int, rows: np.ndarray) -> pa.Array:
+    """A boolean mask of the rows."""
+    mask = np.zeros(length, dtype=bool)
+    mask[rows] = True
+    return pa.array(mask)
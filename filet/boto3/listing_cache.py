@@ -0,0 +1,192 @@
+"""Persistent cache of ``list_objects_v2`` pages."""
+
+import logging
+import threading
+import time
+from typing import Iterable, Optional, Set
+
+from sqlitedict import SqliteDict
+
+from filet.config.cache_db import DATABASE_URL, CacheTable
+
+logger = logging.getLogger(__name__)
+
+LISTING_CACHE_TTL = 600.0
+
+
+class ListingCache:
+    """Caches the pages of ``list_objects_v2`` requests in a :class:`~filet.config.cache_db.CacheTable`.
+
+    A page is cached per request (bucket, prefix, delimiter, page size, ``StartAfter`` / ``ContinuationToken``)
+    for ``ttl`` seconds. The pages of one listing are consistent as long as its first page is cached: the
+    continuation tokens of cached pages lead to the cached following pages.
+
+    Objects written by filet invalidate the cached pages of their parent prefixes (see :meth:`invalidate`): a page
+    that already lists the object with its new ETag stays valid, all others of the prefixes are dropped. An index
+    table holds the listed prefixes of every bucket and the cached pages of every prefix, so an invalidation only
+    reads the pages of the prefixes of the object.
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> cache = ListingCache(ttl=3600)  # xdoctest: +SKIP
+        >>> page = cache.list_objects_v2(s3_client, Bucket="bucket", Prefix="data/", Delimiter="/")  # xdoctest: +SKIP
+        >>> s3_sources = fetch_s3_sources(s3_client, "bucket", listing_cache=cache)  # xdoctest: +SKIP
+    """
+
+    def __init__(self, db_path: str = DATABASE_URL, ttl: float = LISTING_CACHE_TTL):
+        """Initialize the cache.
+
+        :param db_path: The SqliteDict database (by default the one of the cache store).
+        :param ttl: Seconds a cached page is used.
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.__table = CacheTable(self.__class__.__name__, db_path)
+        self.__index_table = CacheTable(f"{self.__class__.__name__}Index", db_path)
+        self.__index_lock = threading.Lock()
+
+    @property
+    def db(self) -> SqliteDict:
+        """The table of the cached pages (opened on first use)."""
+        return self.__table.db
+
+    @property
+    def index(self) -> SqliteDict:
+        """The index of the cached pages (opened on first use).
+
+        ``bucket`` maps to the set of listed prefixes of the bucket, ``bucket\0prefix`` to the set of the cache keys
+        of the pages of the prefix.
+        """
+        return self.__index_table.db
+
+    @staticmethod
+    def cache_key(**kwargs) -> str:
+        """Get the key of a ``list_objects_v2`` request.
+
+        >>> ListingCache.cache_key(Bucket="bucket", Prefix="data/", Delimiter="/")
+        'bucket\\x00data/\\x00Delimiter=/'
+        """
+        options = "&".join(f"{name}={kwargs[name]}" for name in sorted(kwargs) if name not in ("Bucket", "Prefix"))
+        return f"{kwargs.get('Bucket', '')}\0{kwargs.get('Prefix', '')}\0{options}"
+
+    def get(self, refresh: bool = False, **kwargs) -> Optional[dict]:
+        """Get the cached page of a request.
+
+        :param refresh: Ignore (and drop) the cached page.
+        :param kwargs: The arguments of the ``list_objects_v2`` request.
+        :return: The cached response or None if the page is not cached or expired.
+        :rtype: Optional[dict]
+        """
+        cache_key = self.cache_key(**kwargs)
+        entry = self.db.get(cache_key)
+        if entry is None:
+            return None
+        cached_at, response = entry
+        if refresh or time.time() - cached_at > self.ttl:
+            self.db.pop(cache_key, None)
+            self.__remove_from_index([cache_key])
+            return None
+        logger.debug("Listing cache hit: %s", cache_key.replace("\0", "/"))
+        return response
+
+    def put(self, response: dict, **kwargs) -> dict:
+        """Cache the page of a request.
+
+        :param response: The response of the ``list_objects_v2`` request.
+        :param kwargs: The arguments of the request.
+        :return: The cached page (the response without ``ResponseMetadata``).
+        :rtype: dict
+        """
+        response = {name: value for name, value in response.items() if name != "ResponseMetadata"}
+        cache_key = self.cache_key(**kwargs)
+        self.db[cache_key] = (time.time(), response)
+        self.__add_to_index(cache_key)
+        return response
+
+    def __add_to_index(self, cache_key: str) -> None:
+        """Internal method to add a cached page to the index of its bucket and prefix."""
+        bucket, prefix, _ = cache_key.split("\0", 2)
+        index = self.index
+        with self.__index_lock:
+            pages: Set[str] = index.get(f"{bucket}\0{prefix}", set())
+            if cache_key not in pages:
+                index[f"{bucket}\0{prefix}"] = pages | {cache_key}
+            prefixes: Set[str] = index.get(bucket, set())
+            if prefix not in prefixes:
+                index[bucket] = prefixes | {prefix}
+
+    def __remove_from_index(self, cache_keys: Iterable[str]) -> None:
+        """Internal method to remove dropped pages from the index."""
+        index = self.index
+        with self.__index_lock:
+            for cache_key in cache_keys:
+                bucket, prefix, _ = cache_key.split("\0", 2)
+                pages: Set[str] = index.get(f"{bucket}\0{prefix}", set()) - {cache_key}
+                if pages:
+                    index[f"{bucket}\0{prefix}"] = pages
+                    continue
+                index.pop(f"{bucket}\0{prefix}", None)
+                prefixes: Set[str] = index.get(bucket, set()) - {prefix}
+                if prefixes:
+                    index[bucket] = prefixes
+                else:
+                    index.pop(bucket, None)
+
+    def list_objects_v2(self, s3_client, refresh: bool = False, **kwargs) -> dict:
+        """Get a page from the cache or request (and cache) it.
+
+        :param s3_client: A boto3 S3 client object.
+        :param refresh: Request the page even if it is cached.
+        :param kwargs: The arguments of the ``list_objects_v2`` request.
+        :return: The response.
+        :rtype: dict
+        """
+        response = self.get(refresh=refresh, **kwargs)
+        if response is None:
+            response = self.put(s3_client.list_objects_v2(**kwargs), **kwargs)
+        return response
+
+    def invalidate(self, bucket: str, key: str = "", etag: Optional[str] = None) -> int:
+        """Drop the cached pages of the prefixes of an object that was written or deleted.
+
+        :param bucket: The bucket.
+        :param key: The key of the object (all pages of the bucket if empty).
+        :param etag: The new ETag of the object: pages listing the object with this ETag are kept.
+        :return: The number of dropped pages.
+        :rtype: int
+        """
+        prefixes = [prefix for prefix in self.index.get(bucket, set()) if not key or key.startswith(prefix)]
+        removed = []
+        dropped = 0
+        for prefix in prefixes:
+            for cache_key in self.index.get(f"{bucket}\0{prefix}", set()):
+                entry = self.db.get(cache_key)
+                if entry is not None and etag and key:
+                    contents = entry[1].get("Contents", [])
+                    if any(obj.get("Key") == key and obj.get("ETag") == etag for obj in contents):
+                        continue
+                if self.db.pop(cache_key, None) is not None:
+                    dropped += 1
+                removed.append(cache_key)
+        self.__remove_from_index(removed)
+        if dropped:
+            logger.debug("Dropped %s cached listing pages of %s/%s", dropped, bucket, key)
+        return dropped
+
+    def prune(self) -> int:
+        """Drop the expired pages.
+
+        :return: The number of dropped pages.
+        :rtype: int
+        """
+        now = time.time()
+        expired = [cache_key for cache_key, (cached_at, _) in self.db.items() if now - cached_at > self.ttl]
+        for cache_key in expired:
+            self.db.pop(cache_key, None)
+        self.__remove_from_index(expired)
+        return len(expired)
+
+
+listing_cache = ListingCache()
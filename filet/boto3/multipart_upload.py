@@ -1,23 +1,65 @@
 """MultipartUpload class for uploading large data in parts to S3."""
 
-import gc
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 import logging
-import zlib
+import threading
+from typing import Callable, Dict, Optional, Union
 
+from botocore.exceptions import ClientError
 from mypy_boto3_s3.type_defs import CompletedMultipartUploadTypeDef
 
-from filet.boto3.schema import Compression, S3Source
+from filet.boto3.adaptive_limiter import AdaptiveConcurrencyLimiter, request_slot
+from filet.boto3.buffer_pool import MemoryviewReader, PartBufferPool
+from filet.boto3.compression import COMPRESSION_SUFFIXES, compression_from_key, get_compressor
+from filet.boto3.listing_cache import listing_cache
+from filet.boto3.retry import RetryPolicy
+from filet.boto3.schema import Encryption, S3Source
 from filet.boto3.types import S3Client
+from filet.boto3.upload_state_store import upload_states
+from filet.config.cache_db import UploadedPart, UploadState
+
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_COPY_PART_SIZE = 5 * 1024 * 1024 * 1024
+
+
+def _copy_source_args(s3_source: S3Source) -> dict:
+    """Arguments of ``upload_part_copy`` / ``copy_object`` selecting the (unchanged) source object."""
+    copy_source = {"Bucket": s3_source.Bucket, "Key": s3_source.Key}
+    if s3_source.VersionId:
+        copy_source["VersionId"] = s3_source.VersionId
+    return {"CopySource": copy_source, **({"CopySourceIfMatch": s3_source.ETag} if s3_source.ETag else {})}
 
 
 class MultipartUpload:
     """Handles uploading byte-sized chunks to an S3 object in a memory-efficient manner.
 
-    Supports optional GZIP compression before uploading to S3.
+    Supports optional compression (see :mod:`filet.boto3.compression`) before uploading to S3.
+
+    The (compressed) content is written into part-sized buffers of a :class:`~filet.boto3.buffer_pool.PartBufferPool`
+    (``chunk_size``, at least the S3 minimum of 5 MiB). A full buffer is uploaded as it is and reused afterwards,
+    so the content is copied once into the buffer and never sliced, moved or garbage collected.
+
+    With ``max_in_flight_parts``, the parts are uploaded on a worker pool while the caller continues to compress
+    and buffer the next part. At most ``max_in_flight_parts`` parts are uploading at once (further parts wait for
+    a free slot), so the memory is bounded by about ``max_in_flight_parts + 1`` parts. The ETags are collected in
+    part order for :meth:`complete`.
+
+    With ``resumable``, the UploadId and the ETag and source offset of every finished part are persisted (see
+    :class:`~filet.boto3.upload_state_store.UploadStateStore`), and a failed :meth:`complete` keeps the upload instead
+    of aborting it. A new ``MultipartUpload`` of the same object (with the same part size and compression) checks the
+    persisted parts with ``list_parts`` and continues after the last consecutive one: the caller passes the source
+    from :attr:`resume_offset` on. In this mode a part ends after the :meth:`upload_part` call that fills it (parts may
+    be larger than ``chunk_size``) and the compression is restarted for every part (a new gzip member / frame), so
+    each part starts at a known source offset.
+
+    :meth:`copy_part` appends byte ranges of other S3 objects server-side (``upload_part_copy``), e.g. to move or
+    concatenate objects into a new layout without passing their bytes through the client.
 
     :Example:
         >>> import boto3
-        >>> from filet.boto3.schema import Compression, S3Source
+        >>> from filet.boto3.schema import S3Source
         >>> from filet.config.boto3_client import Boto3ClientConfig
         >>> fake_boto3_client = boto3.client( # xdoctest: +SKIP
         ... **Boto3ClientConfig(endpoint_url="",aws_access_key_id="",aws_secret_access_key=""))
@@ -25,6 +67,13 @@ class MultipartUpload:
         >>> uploader = MultipartUpload(fake_boto3_client, fake_s3_source)  # xdoctest: +SKIP
         >>> uploader.upload_part(b"some bytes") # xdoctest: +SKIP
         >>> uploader.complete() # xdoctest: +SKIP
+        >>> uploader = MultipartUpload(fake_boto3_client, fake_s3_source, max_in_flight_parts=8)  # xdoctest: +SKIP
+        >>> uploader = MultipartUpload(fake_boto3_client, fake_s3_source, resumable=True)  # xdoctest: +SKIP
+        >>> source.seek(uploader.resume_offset)  # xdoctest: +SKIP
+        >>> uploader = MultipartUpload(fake_boto3_client, fake_s3_source)  # xdoctest: +SKIP
+        >>> for s3_source in s3_sources:  # xdoctest: +SKIP
+        ...     uploader.copy_part(s3_source)
+        >>> uploader.complete()  # xdoctest: +SKIP
     """
 
     logger = logging.getLogger(__name__)
@@ -34,89 +83,399 @@ class MultipartUpload:
         s3_client: S3Client,
         s3_source: S3Source,
         chunk_size: int = 10000000,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        max_in_flight_parts: int = 0,
+        retry_policy: Optional[RetryPolicy] = None,
+        compression_threads: int = 1,
+        resumable: bool = False,
         **kwargs,
     ):
         """Initialize MultipartUpload.
 
         :param boto3_client: A boto3 S3 client object.
         :param s3_source: A S3Source object that contains information about the S3 destination.
+        :param chunk_size: The part size in bytes (raised to the S3 minimum of 5 MiB).
+        :param concurrency_limiter: Run the upload requests in slots of this (shared) adaptive limiter.
+        :param max_in_flight_parts: Upload up to this number of parts concurrently on a worker pool (0 uploads
+            every part synchronously).
+        :param retry_policy: Retries of the part uploads (by default, transient errors are retried up to 4 times).
+        :param compression_threads: Compress blocks in parallel on this number of threads (gzip only).
+        :param resumable: Persist the upload state and continue a previous upload of the object (see above).
         :param kwargs: Additional keyword arguments (current unused).
         :raises ValueError: If the s3_source object does not contain a key.
         """
         if not s3_source.Key:
             raise ValueError(f"S3Source {s3_source!r} has no key!")
-        gz_compress = (
-            s3_source.ObjectCompression == Compression.gzip
-            or (s3_source.ObjectCompression == Compression.none and ".gz" in s3_source.Key[-3:])
-            or None
-        )
-        if s3_source.ObjectCompression.value == Compression.gzip and ".gz" not in s3_source.Key[-3:]:
-            s3_source.Key += ".gz"  # append .gz in key object if not exists
-        self.gz_compress_obj = (
-            gz_compress and zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, zlib.MAX_WBITS | 16) or None
+        self.compression = compression_from_key(s3_source.Key, s3_source.ObjectCompression)
+        suffixes = tuple(
+            suffix for suffix, compression in COMPRESSION_SUFFIXES.items() if compression == self.compression
         )
+        if not s3_source.Key.endswith(suffixes):
+            s3_source.Key += self.compression.value  # append the compression suffix in key object if not exists
+        self.compression_threads = compression_threads
+        self.compress_obj = get_compressor(self.compression, threads=compression_threads)
         self.boto3_client = s3_client
         self.Bucket: str = s3_source.Bucket
         self.Key: str = s3_source.Key
         self.VersionId: str = s3_source.VersionId
-        self.chunk_size: int = chunk_size
-        self.multipart_upload = s3_client.create_multipart_upload(Bucket=self.Bucket, Key=self.Key)
+        self.chunk_size: int = max(chunk_size, MIN_PART_SIZE)
+        self.concurrency_limiter = concurrency_limiter
+        self.max_in_flight_parts = max_in_flight_parts
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.resumable = resumable
         self.parts: list = []
-        self.upload_contents: bytearray = bytearray()
         self.part_counter: int = 0
+        self.resume_offset: int = 0
+        self.upload_state: Optional[UploadState] = None
+        self.__source_offset = 0
+        self.__compressing = False
+        self.__deferred_copy: Optional[S3Source] = None
+        self.__state_lock = threading.Lock()
+        if resumable:
+            self.__resume()
+        else:
+            self.multipart_upload = s3_client.create_multipart_upload(Bucket=self.Bucket, Key=self.Key)
+        self.buffer_pool = PartBufferPool(self.chunk_size, max_buffers=max_in_flight_parts + 1)
+        self.__part: Optional[bytearray] = None
+        self.__filled = 0
+        self.__pending_parts: Dict[int, Future] = {}
+        self.__in_flight = threading.BoundedSemaphore(max(1, max_in_flight_parts))
+        self.__executor: Optional[ThreadPoolExecutor] = None
         super().__init__(**kwargs)
 
-    def upload_part_skip_cache(self, content: bytes):
+    @property
+    def state_key(self) -> str:
+        """The key of the persisted upload state."""
+        return f"{self.Bucket}/{self.Key}"
+
+    def __resume(self) -> None:
+        """Internal method to continue the persisted upload of the object or to start (and persist) a new one."""
+        state = upload_states.get(self.state_key)
+        if state and state.part_size == self.chunk_size and state.compression == self.compression.value:
+            try:
+                uploaded = self.__list_parts(state.upload_id)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                    raise
+                self.logger.warning(f"Persisted upload of {self.Key} no longer exists, starting a new upload.")
+            else:
+                # continue after the last consecutive part that is persisted and uploaded with the same ETag
+                while (part := state.parts.get(self.part_counter + 1)) and uploaded.get(part.part_number) == part.etag:
+                    self.part_counter += 1
+                    self.parts.append({"ETag": part.etag})
+                    self.resume_offset = part.source_offset
+                state.parts = {number: state.parts[number] for number in range(1, self.part_counter + 1)}
+                self.__source_offset = self.resume_offset
+                self.multipart_upload = {"UploadId": state.upload_id}
+                self.upload_state = state
+                self.logger.info(
+                    f"Resume upload of {self.Key} after part {self.part_counter} (source offset {self.resume_offset}).",
+                    extra={"part_id": self.part_counter, "resume_offset": self.resume_offset},
+                )
+                self.__save_state()
+                return
+        self.multipart_upload = self.boto3_client.create_multipart_upload(Bucket=self.Bucket, Key=self.Key)
+        self.upload_state = UploadState(
+            upload_id=self.multipart_upload["UploadId"], part_size=self.chunk_size, compression=self.compression.value
+        )
+        self.__save_state()
+
+    def __list_parts(self, upload_id: str) -> Dict[int, str]:
+        """Internal method to get the ETags of the uploaded parts of an upload by part number."""
+        paginator = self.boto3_client.get_paginator("list_parts")
+        return {
+            part["PartNumber"]: part["ETag"]
+            for page in paginator.paginate(Bucket=self.Bucket, Key=self.Key, UploadId=upload_id)
+            for part in page.get("Parts", [])
+        }
+
+    def __save_state(self, part: Optional[UploadedPart] = None) -> None:
+        """Internal method to persist the upload state (with a newly finished part)."""
+        with self.__state_lock:
+            if part:
+                self.upload_state.parts[part.part_number] = part
+            upload_states.put(self.state_key, self.upload_state)
+
+    def __drop_state(self) -> None:
+        """Internal method to remove the persisted upload state (after the upload completed or was aborted)."""
+        with self.__state_lock:
+            upload_states.pop(self.state_key)
+
+    def upload_part_skip_cache(self, content: Union[bytes, bytearray, memoryview]):
         """Uploads a part to S3 directly, without utilizing the internal buffer.
 
+        With ``max_in_flight_parts``, the part is handed to the worker pool (the content must not be modified
+        afterwards) and the call only blocks while all in-flight slots are taken.
+
         :param content: The byte content to upload as part of the multipart upload.
+        :raises Exception: The error of a previous part upload that failed in the background.
+        """
+        self.__submit_part(partial(self.__upload_part, content=content))
+
+    def __submit_part(self, request: Callable[[int], dict], on_done: Optional[Callable] = None):
+        """Internal method to run the request of the next part synchronously or on the worker pool.
+
+        :param request: Uploads (or copies) the part with the given part number and returns the response.
+        :param on_done: Called once no attempt of the upload is running anymore (e.g. to return the buffer of the
+            part to the pool), abandoned or hedged attempts of the retry policy can outlive the upload.
         """
         self.part_counter += 1
-        self.parts.append(
-            self.boto3_client.upload_part(
+        source_offset = self.__source_offset
+        if not self.max_in_flight_parts:
+            self.parts.append(self.__run_part(request, self.part_counter, source_offset, on_done))
+            return
+        self.__raise_failed_parts()
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(
+                max_workers=self.max_in_flight_parts, thread_name_prefix=self.__class__.__name__
+            )
+
+        def release(future: Future) -> None:
+            self.__in_flight.release()
+            if future.cancelled() and on_done:
+                on_done()
+
+        self.__in_flight.acquire()
+        future = self.__executor.submit(self.__run_part, request, self.part_counter, source_offset, on_done)
+        future.add_done_callback(release)
+        self.__pending_parts[self.part_counter] = future
+
+    def __run_part(
+        self, request: Callable[[int], dict], part_number: int, source_offset: int, on_done: Optional[Callable]
+    ) -> dict:
+        """Internal method to run the request of one part (with retries) and persist the part in resumable mode.
+
+        :param source_offset: The number of source bytes written up to the end of the part.
+        :param on_done: Called once no attempt of the request is running anymore (see :meth:`__submit_part`).
+        :return: The response of the request (with the ETag of the part).
+        """
+        response = self.retry_policy.call(request, part_number, on_settled=on_done)
+        if self.upload_state:
+            self.__save_state(UploadedPart(part_number, response["ETag"], source_offset))
+        return response
+
+    def __upload_part(self, part_number: int, content: Union[bytes, bytearray, memoryview]) -> dict:
+        """Internal method to upload one part (one attempt)."""
+        with request_slot(self.concurrency_limiter, latency=False):
+            response = self.boto3_client.upload_part(
                 Bucket=self.Bucket,
                 Key=self.Key,
-                PartNumber=self.part_counter,
+                PartNumber=part_number,
                 UploadId=self.multipart_upload["UploadId"],
-                Body=content,
+                Body=MemoryviewReader(content) if isinstance(content, memoryview) else content,
             )
-        )
+        self.logger.debug(f"Uploaded part {part_number} of {self.Key} ({len(content)} bytes).")
+        return response
+
+    def __upload_part_copy(self, part_number: int, s3_source: S3Source, start: int, end: int) -> dict:
+        """Internal method to copy a byte range of an object server-side into one part (one attempt)."""
+        with request_slot(self.concurrency_limiter, latency=False):
+            response = self.boto3_client.upload_part_copy(
+                Bucket=self.Bucket,
+                Key=self.Key,
+                PartNumber=part_number,
+                UploadId=self.multipart_upload["UploadId"],
+                CopySourceRange=f"bytes={start}-{end - 1}",
+                **_copy_source_args(s3_source),
+            )
+        self.logger.debug(f"Copied part {part_number} of {self.Key} from {s3_source.Key} (bytes {start}-{end - 1}).")
+        return {"ETag": response["CopyPartResult"]["ETag"]}
+
+    def __raise_failed_parts(self) -> None:
+        """Internal method to raise the error of a failed background part upload as early as possible."""
+        for future in self.__pending_parts.values():
+            if future.done() and future.exception():
+                raise future.exception()
+
+    def __wait_for_parts(self) -> None:
+        """Internal method to wait for the background part uploads and collect their responses in part order."""
+        try:
+            for part_number in sorted(self.__pending_parts):
+                self.parts.append(self.__pending_parts[part_number].result())
+        finally:
+            for future in self.__pending_parts.values():
+                future.cancel()
+            self.__pending_parts.clear()
+            if self.__executor is not None:
+                self.__executor.shutdown(wait=True)
+                self.__executor = None
 
     def upload_part(self, content: bytes) -> None:
-        """Adds content to the upload buffer and uploads to S3 when a certain size is reached.
+        """Adds content to the upload buffer and uploads every full part to S3.
 
         :param content: The byte content to add to the upload buffer.
 
         :Example:
             >>> uploader.upload_part(b'Hello, world!')  # xdoctest: +SKIP
         """
-        self.upload_contents.extend(self.gz_compress_obj.compress(content) if self.gz_compress_obj else content)
-        size = len(self.upload_contents)
+        self.__copy_deferred()
+        self.__compressing = self.compress_obj is not None
+        if self.resumable:
+            self.__write_resumable(content)
+        else:
+            self.__write(self.compress_obj.compress(content) if self.compress_obj else content)
         self.logger.info(
-            f"add s3-upload buffer, size: {size}, parts: {self.part_counter}",
-            extra={"buffer_size": size, "part_id": self.part_counter},
+            f"add s3-upload buffer, size: {self.__filled}, parts: {self.part_counter}",
+            extra={"buffer_size": self.__filled, "part_id": self.part_counter},
         )
-        if size >= 20000000:
-            self.upload_part_skip_cache(self.upload_contents[: size - 10000000])
-            del self.upload_contents[: size - 10000000]
-            gc.collect()
+
+    def __write(self, data: bytes) -> None:
+        """Internal method to copy data into the part buffers and hand over every full buffer."""
+        view = memoryview(data).cast("B")
+        while view:
+            if self.__part is None:
+                self.__part = self.buffer_pool.acquire()
+            count = min(len(view), self.chunk_size - self.__filled)
+            self.__part[self.__filled : self.__filled + count] = view[:count]
+            self.__filled += count
+            view = view[count:]
+            if self.__filled == self.chunk_size:
+                self.__flush_part()
+
+    def __write_resumable(self, content: bytes) -> None:
+        """Internal method to buffer content without splitting it and to end the part once it is full.
+
+        The buffer grows beyond the part size if needed, and the compression of every part is finished, so a part
+        ends exactly after ``content`` at a known source offset.
+        """
+        self.__append(self.compress_obj.compress(content) if self.compress_obj else content)
+        self.__source_offset += len(content)
+        if self.__filled >= self.chunk_size:
+            if self.compress_obj:
+                self.__append(self.compress_obj.flush())
+                self.compress_obj = get_compressor(self.compression, threads=self.compression_threads)
+                self.__compressing = False
+            self.__flush_part()
+
+    def __append(self, data: bytes) -> None:
+        """Internal method to copy data into the current buffer (growing it beyond the part size if needed)."""
+        if self.__part is None:
+            self.__part = self.buffer_pool.acquire()
+        self.__part[self.__filled : self.__filled + len(data)] = data
+        self.__filled += len(data)
+
+    def __flush_part(self) -> None:
+        """Internal method to upload the filled part of the current buffer and return the buffer afterwards."""
+        part, filled = self.__part, self.__filled
+        self.__part, self.__filled = None, 0
+        content = part if filled == len(part) else memoryview(part)[:filled]
+        self.__submit_part(partial(self.__upload_part, content=content), on_done=lambda: self.buffer_pool.release(part))
+
+    def copy_part(self, s3_source: S3Source, start: int = 0, end: Optional[int] = None) -> None:
+        """Appends a byte range of another S3 object to the upload, copied server-side.
+
+        The bytes are copied as they are, so the source must not be encrypted and must have the compression of the
+        upload (e.g. gzip objects are concatenated into a multi-member gzip object; the compressed content written
+        before is finished as a member of its own). Ranges of at least 5 MiB are copied with ``upload_part_copy``
+        in parts of up to 5 GiB. Shorter ranges, and the bytes needed to fill buffered content up to the minimum
+        part size of 5 MiB, are downloaded into the buffer. An upload of one whole object (up to 5 GiB) and nothing
+        else is completed with ``copy_object``.
+
+        :param s3_source: The source object (``Size`` and ``ETag`` are requested if unset; the copy fails if the
+            object changed in the meantime).
+        :param start: The first byte of the range.
+        :param end: The end of the range, exclusive (the end of the object if None).
+        :raises ValueError: If the source is encrypted or has another compression than the upload.
+
+        :Example:
+            >>> uploader.copy_part(S3Source(Bucket='test_bucket', Key='part-0001.csv'))  # xdoctest: +SKIP
+        """
+        compression = compression_from_key(s3_source.Key, s3_source.ObjectCompression)
+        if s3_source.ObjectEncryption != Encryption.none or compression != self.compression:
+            raise ValueError(f"Cannot copy {s3_source.Key} ({compression}) into {self.Key} ({self.compression}).")
+        if not s3_source.Size or not s3_source.ETag:
+            with request_slot(self.concurrency_limiter):
+                head = self.boto3_client.head_object(
+                    Bucket=s3_source.Bucket,
+                    Key=s3_source.Key,
+                    **({"VersionId": s3_source.VersionId} if s3_source.VersionId else {}),
+                )
+            s3_source = s3_source.model_copy(update={"Size": head["ContentLength"], "ETag": head["ETag"]})
+        end = s3_source.Size if end is None else min(end, s3_source.Size)
+        if start >= end:
+            return
+        self.__copy_deferred()
+        if not (self.part_counter or self.__filled or self.__compressing) and start == 0 and end == s3_source.Size:
+            if end <= MAX_COPY_PART_SIZE:
+                # the copy may be the only content of the upload (see complete)
+                self.__deferred_copy = s3_source
+                return
+        if self.__compressing:
+            self.__write_copied(self.compress_obj.flush(), source_size=0)
+            self.compress_obj = get_compressor(self.compression, threads=self.compression_threads)
+            self.__compressing = False
+        self.__copy_range(s3_source, start, end)
+
+    def __copy_deferred(self) -> None:
+        """Internal method to copy a deferred whole object once more content follows."""
+        if self.__deferred_copy is not None:
+            s3_source, self.__deferred_copy = self.__deferred_copy, None
+            self.__copy_range(s3_source, 0, s3_source.Size)
+
+    def __copy_range(self, s3_source: S3Source, start: int, end: int) -> None:
+        """Internal method to append a byte range of an object, server-side as far as the minimum part size allows."""
+        if self.__filled:
+            # the buffered content ends up in a part of at least the minimum part size
+            if self.__filled < MIN_PART_SIZE:
+                fill_end = min(end, start + MIN_PART_SIZE - self.__filled)
+                self.__write_copied(self.__get_range(s3_source, start, fill_end))
+                start = fill_end
+            if self.__filled >= MIN_PART_SIZE:
+                self.__flush_part()
+        if end - start < MIN_PART_SIZE:
+            if start < end:
+                self.__write_copied(self.__get_range(s3_source, start, end))
+            return
+        parts = -(-(end - start) // MAX_COPY_PART_SIZE)
+        bounds = [start + (end - start) * i // parts for i in range(parts + 1)]
+        for part_start, part_end in zip(bounds, bounds[1:]):
+            self.__source_offset += part_end - part_start
+            self.__submit_part(partial(self.__upload_part_copy, s3_source=s3_source, start=part_start, end=part_end))
+
+    def __write_copied(self, data: bytes, source_size: Optional[int] = None) -> None:
+        """Internal method to buffer downloaded (or already compressed) bytes as they are.
+
+        :param source_size: The number of source bytes the data stands for (its length if None).
+        """
+        self.__source_offset += len(data) if source_size is None else source_size
+        if not self.resumable:
+            self.__write(data)
+            return
+        self.__append(data)
+        if self.__filled >= self.chunk_size:
+            self.__flush_part()
+
+    def __get_range(self, s3_source: S3Source, start: int, end: int) -> bytes:
+        """Internal method to download a (short) byte range of an object (with retries)."""
+
+        def get() -> bytes:
+            with request_slot(self.concurrency_limiter) as timing:
+                response = self.boto3_client.get_object(
+                    Bucket=s3_source.Bucket,
+                    Key=s3_source.Key,
+                    Range=f"bytes={start}-{end - 1}",
+                    **({"VersionId": s3_source.VersionId} if s3_source.VersionId else {"IfMatch": s3_source.ETag}),
+                )
+                timing.first_byte()
+                body = response["Body"].read()
+            if len(body) != end - start:
+                raise OSError(f"Short read of {s3_source.Key}: {len(body)} of {end - start} bytes.")
+            return body
+
+        return self.retry_policy.call(get)
 
     async def async_upload_part(self, content: bytes) -> None:
         """Asynchronous wrapper for the upload_part method.
 
+        The compression and the (back pressured) hand over of full parts run in the default executor, so the
+        event loop is not blocked. Calls must be awaited one after another to keep the content in order.
+
         :param content: The byte content to add to the upload buffer.
 
         :Example:
             >>> asyncio.run(uploader.async_upload_part(b'Hello, world!')) # xdoctest: +SKIP
         """
-        self.upload_part(content)
-
-    def __upload_last(self):
-        """Internal method to handle the upload of the last part and clear the internal buffer."""
-        if self.gz_compress_obj:
-            self.upload_contents.extend(self.gz_compress_obj.flush())
-        self.upload_part_skip_cache(self.upload_contents)
-        self.upload_contents.clear()
+        await asyncio.get_running_loop().run_in_executor(None, self.upload_part, content)
 
     def abort(self) -> None:
         """Aborts the current multipart upload and cleans up any uploaded parts.
@@ -124,9 +483,13 @@ class MultipartUpload:
         :Example:
             >>> uploader.abort()  # xdoctest: +SKIP
         """
+        for future in self.__pending_parts.values():
+            future.cancel()
         self.boto3_client.abort_multipart_upload(
             Bucket=self.Bucket, Key=self.Key, UploadId=self.multipart_upload["UploadId"]
         )
+        if self.resumable:
+            self.__drop_state()
 
     def complete(self) -> None:
         """Completes the multipart upload by sending a completion request to S3.
@@ -135,32 +498,61 @@ class MultipartUpload:
             >>> uploader.complete()  # xdoctest: +SKIP
         """
         try:
-            if len(self.upload_contents):
+            has_content = self.__deferred_copy or self.part_counter or self.__filled
+            if self.compress_obj and (self.__compressing or not has_content):
+                if self.resumable:
+                    self.__append(self.compress_obj.flush())
+                else:
+                    self.__write(self.compress_obj.flush())
+            self.compress_obj = None
+            if self.__deferred_copy is not None:
+                self.logger.info(f"Copy {self.__deferred_copy.Key} to {self.Key}")
+                with request_slot(self.concurrency_limiter, latency=False):
+                    response = self.boto3_client.copy_object(
+                        Bucket=self.Bucket, Key=self.Key, **_copy_source_args(self.__deferred_copy)
+                    )
+                listing_cache.invalidate(self.Bucket, self.Key, response["CopyObjectResult"].get("ETag"))
+                self.abort()  # the object is written, the (empty) multipart upload is not needed
+                return
+            if self.__filled or not self.part_counter:
                 if self.part_counter:
-                    self.__upload_last()
+                    self.__flush_part()
                 else:
                     try:
-                        self.logger.warning("Upload small Object with Size under 10Mb")
-                        if self.gz_compress_obj:
-                            self.upload_contents.extend(self.gz_compress_obj.flush())
-                        self.boto3_client.put_object(Body=self.upload_contents, Bucket=self.Bucket, Key=self.Key)
+                        self.logger.warning(f"Upload small Object with Size under {self.chunk_size} bytes")
+                        with request_slot(self.concurrency_limiter, latency=False):
+                            response = self.boto3_client.put_object(
+                                Body=MemoryviewReader(memoryview(self.__part or b"")[: self.__filled]),
+                                Bucket=self.Bucket,
+                                Key=self.Key,
+                            )
+                        listing_cache.invalidate(self.Bucket, self.Key, response.get("ETag"))
                     except Exception as e:
                         self.logger.error(e, exc_info=True)
                         self.logger.error(
                             "Not parts uploaded!" + "Currently small Data not implemented for MultipartUpload!"
                         )
                         self.abort()
+                    else:
+                        self.abort()  # the object is written, the (empty) multipart upload is not needed
                     return
+            self.__wait_for_parts()
             part_info: CompletedMultipartUploadTypeDef = {
                 "Parts": list({"PartNumber": x + 1, "ETag": self.parts[x]["ETag"]} for x in range(len(self.parts)))
             }
             self.logger.info("Complete Upload", extra={"part_info": part_info})
-            self.boto3_client.complete_multipart_upload(
+            response = self.boto3_client.complete_multipart_upload(
                 Bucket=self.Bucket,
                 Key=self.Key,
                 UploadId=self.multipart_upload["UploadId"],
                 MultipartUpload=part_info,
             )
+            listing_cache.invalidate(self.Bucket, self.Key, response.get("ETag"))
+            if self.resumable:
+                self.__drop_state()
         except Exception as e:
             self.logger.error(e)
+            if self.resumable:
+                self.logger.error(f"Upload of {self.Key} failed, it can be resumed with resumable=True.")
+                raise
             self.abort()
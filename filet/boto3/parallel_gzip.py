@@ -0,0 +1,127 @@
+"""Block-parallel gzip compression (like ``pigz``).
+
+The input is cut into blocks that are deflated independently on a thread pool (``zlib`` releases the GIL), so
+compression scales with the number of cores:
+
+* By default, every block is deflated with the last 32 KiB of the previous block as dictionary and ends with a
+  ``Z_SYNC_FLUSH`` (the last one with ``Z_FINISH``). The concatenated blocks form one deflate stream in a single
+  gzip member, with nearly the ratio of sequential compression. The flush points are random-access checkpoints
+  for :class:`~filet.boto3.gzip_index.GzipIndexBuilder`.
+* With ``multi_member``, every block is a complete gzip member (concatenated gzip, e.g. as written by BGZF
+  tools), which can be decompressed starting at any member.
+"""
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import struct
+from typing import Deque, Optional
+import zlib
+
+GZIP_BLOCK_SIZE = 1024 * 1024
+WINDOW_SIZE = 32 * 1024
+# magic, deflate, no flags, no mtime, no extra flags, unknown OS
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+
+class ParallelGzipCompressor:
+    """Incremental gzip compressor (as ``zlib.compressobj``) that deflates blocks on a thread pool.
+
+    :meth:`compress` returns the compressed blocks that are finished so far, in order; at most ``2 * threads``
+    blocks are compressed ahead, so the memory stays bounded. :meth:`flush` finishes the stream (the compressor
+    cannot be used afterwards).
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> import gzip
+        >>> compressor = ParallelGzipCompressor(threads=2, block_size=64 * 1024)
+        >>> data = b"some line\\n" * 100000
+        >>> gzip.decompress(compressor.compress(data) + compressor.flush()) == data
+        True
+    """
+
+    def __init__(
+        self,
+        level: int = zlib.Z_DEFAULT_COMPRESSION,
+        threads: Optional[int] = None,
+        block_size: int = GZIP_BLOCK_SIZE,
+        multi_member: bool = False,
+    ):
+        """Initialize the compressor.
+
+        :param level: The zlib compression level.
+        :param threads: Number of compression threads (defaults to the number of cores).
+        :param block_size: Number of uncompressed bytes per block.
+        :param multi_member: Write every block as an independent gzip member.
+        """
+        self.level = level
+        self.threads = threads or os.cpu_count() or 1
+        self.block_size = max(block_size, WINDOW_SIZE)
+        self.multi_member = multi_member
+        self.__executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix=self.__class__.__name__)
+        self.__pending: Deque[Future] = deque()
+        self.__input = bytearray()  # the data of the incomplete block
+        self.__dictionary = b""
+        self.__crc = 0
+        self.__size = 0
+        self.__blocks = 0
+        self.__header = b"" if multi_member else GZIP_HEADER
+
+    def __deflate(self, block: bytes, dictionary: bytes, last: bool) -> bytes:
+        """Internal method (worker thread) to compress one block."""
+        if self.multi_member:
+            compress_obj = zlib.compressobj(self.level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            return compress_obj.compress(block) + compress_obj.flush()
+        kwargs = {"zdict": dictionary} if dictionary else {}
+        compress_obj = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS, **kwargs)
+        return compress_obj.compress(block) + compress_obj.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+    def __submit(self, block: bytes, last: bool = False) -> None:
+        """Internal method to start the compression of a block (the checksum is computed in order)."""
+        if not self.multi_member:
+            self.__crc = zlib.crc32(block, self.__crc)
+            self.__size += len(block)
+        self.__pending.append(self.__executor.submit(self.__deflate, block, self.__dictionary, last))
+        self.__dictionary = block[-WINDOW_SIZE:]
+        self.__blocks += 1
+
+    def __collect(self, ahead: int) -> bytes:
+        """Internal method to get the finished blocks in order, waiting while more than ``ahead`` are pending."""
+        out = [self.__header]
+        self.__header = b""
+        while self.__pending and (len(self.__pending) > ahead or self.__pending[0].done()):
+            out.append(self.__pending.popleft().result())
+        return b"".join(out)
+
+    def compress(self, data: bytes) -> bytes:
+        """Add data to the stream.
+
+        :param data: The uncompressed data.
+        :return: The compressed blocks that are finished so far (may be empty).
+        :rtype: bytes
+        """
+        self.__input += data
+        full_blocks = len(self.__input) // self.block_size * self.block_size
+        for start in range(0, full_blocks, self.block_size):
+            self.__submit(bytes(self.__input[start : start + self.block_size]))
+        del self.__input[:full_blocks]
+        return self.__collect(ahead=2 * self.threads)
+
+    def flush(self) -> bytes:
+        """Compress the remaining data and finish the stream.
+
+        :return: The remaining compressed blocks (and the gzip trailer).
+        :rtype: bytes
+        """
+        if self.__input or not self.multi_member or not self.__blocks:
+            self.__submit(bytes(self.__input), last=True)
+            self.__input.clear()
+        try:
+            out = self.__collect(ahead=0)
+        finally:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+        if self.multi_member:
+            return out
+        return out + struct.pack("<II", self.__crc, self.__size & 0xFFFFFFFF)
@@ -0,0 +1,289 @@
+"""Split a stream of parts (e.g. of a ranged download) at record boundaries.
+
+The parts of a ranged download start and end at arbitrary byte offsets, i.e. in the middle of a CSV row or a JSON
+document. A splitter carries the partial trailing record of each part over to the next one, so every chunk it
+returns only contains complete records and can be parsed (or processed in parallel) on its own.
+
+:Example:
+
+.. code-block:: python
+
+    >>> splitter = CsvRecordSplitter(header=True)
+    >>> splitter.split(b'id,text\\n1,"multi')
+    b''
+    >>> splitter.split(b'\\nline"\\n2,b\\n3,')
+    b'id,text\\n1,"multi\\nline"\\n2,b\\n'
+    >>> splitter.flush()
+    b'id,text\\n3,'
+"""
+
+import re
+from typing import Iterable, Iterator, Optional, Tuple
+
+_JSON_TOKEN = re.compile(rb'\\.|["\[\]{},]', re.DOTALL)
+_FIRST_CHAR = re.compile(rb"\s*(\S)")
+_FIELD_BREAKS = frozenset(b",;\t|\r\n")
+QUOTE_GUESS_SIZE = 64 * 1024
+
+
+class RecordSplitter:
+    """Carries the partial trailing record of a part over to the next part.
+
+    Subclasses implement :meth:`_scan`, which finds the record boundaries in the buffered data incrementally (every
+    byte is scanned once, also if a record spans many parts). A splitter is used for one stream.
+    """
+
+    def __init__(self):
+        self.__buffer = bytearray()
+        self.__scanned = 0
+
+    def _scan(self, buffer: bytearray, start: int) -> Tuple[int, int]:
+        """Scan the buffered data from ``start`` (the end of the previous scan).
+
+        :return: (end of the last complete record or 0, position up to which the buffer has been scanned).
+        """
+        raise NotImplementedError
+
+    def _emit(self, records: bytes, final: bool) -> bytes:
+        """Convert complete records into the returned chunk (e.g. to add a header)."""
+        return records
+
+    def split(self, part: bytes) -> bytes:
+        """Add the next part of the stream.
+
+        :param part: The next part.
+        :return: The complete records buffered so far (empty if the part did not complete a record).
+        :rtype: bytes
+        """
+        self.__buffer += part
+        boundary, self.__scanned = self._scan(self.__buffer, self.__scanned)
+        if not boundary:
+            return b""
+        records = bytes(self.__buffer[:boundary])
+        del self.__buffer[:boundary]
+        self.__scanned -= boundary
+        return self._emit(records, final=False)
+
+    def flush(self) -> bytes:
+        """Get the remaining records at the end of the stream (the last one may be incomplete if it was truncated).
+
+        :return: The remaining records.
+        :rtype: bytes
+        """
+        records = bytes(self.__buffer)
+        self.__buffer.clear()
+        self.__scanned = 0
+        return self._emit(records, final=True)
+
+    def iter_split(self, parts: Iterable[bytes]) -> Iterator[bytes]:
+        """Split a stream of parts into chunks of complete records (empty chunks are skipped).
+
+        :param parts: The parts of the stream.
+        :return: An iterator over the chunks.
+        :rtype: Iterator[bytes]
+        """
+        for part in parts:
+            if chunk := self.split(part):
+                yield chunk
+        if chunk := self.flush():
+            yield chunk
+
+
+class CsvRecordSplitter(RecordSplitter):
+    """Splits CSV at line breaks outside of quoted fields (quotes inside fields are escaped by doubling them).
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> splitter = CsvRecordSplitter()
+        >>> splitter.split(b'1,"a\\nb",2\\n3,"c')
+        b'1,"a\\nb",2\\n'
+        >>> splitter.flush()
+        b'3,"c'
+    """
+
+    def __init__(self, header: bool = False, quotechar: bytes = b'"'):
+        """Initialize the splitter.
+
+        :param header: The first record is a header, which is prepended to every returned chunk.
+        :param quotechar: The quote character of the fields.
+        """
+        super().__init__()
+        self.quotechar = quotechar
+        self.header: Optional[bytes] = None if header else b""
+        self.__in_quotes = False
+        self.__emitted = False
+
+    def _scan(self, buffer: bytearray, start: int) -> Tuple[int, int]:
+        boundary, position = 0, start
+        while True:
+            quote = buffer.find(self.quotechar, position)
+            if not self.__in_quotes:
+                newline = buffer.rfind(b"\n", position, len(buffer) if quote < 0 else quote)
+                boundary = newline + 1 if newline >= 0 else boundary
+            if quote < 0:
+                return boundary, len(buffer)
+            self.__in_quotes = not self.__in_quotes
+            position = quote + 1
+
+    def __record_ends(self, data: bytes, position: int = 0, in_quotes: bool = False) -> Iterator[int]:
+        """Internal generator of the ends of the records in ``data`` (the positions after their line breaks)."""
+        quote = data.find(self.quotechar, position)
+        while True:
+            if not in_quotes:
+                newline = data.find(b"\n", position, len(data) if quote < 0 else quote)
+                if newline >= 0:
+                    position = newline + 1
+                    yield position
+                    continue
+            if quote < 0:
+                return
+            in_quotes = not in_quotes
+            position = quote + 1
+            quote = data.find(self.quotechar, position)
+
+    def __first_record_end(self, data: bytes) -> int:
+        """Internal method to get the end of the first record (e.g. the header)."""
+        return next(self.__record_ends(data), len(data))
+
+    def __starts_in_quotes(self, data: bytes) -> bool:
+        """Internal method to guess whether data from an arbitrary offset of a CSV starts inside a quoted field.
+
+        A quoted field opens after a delimiter or line break and closes before one. The quotes are counted which
+        are at such a position assuming the data starts outside of quotes, against those that are assuming it
+        starts inside.
+        """
+        data = data[:QUOTE_GUESS_SIZE]
+        quotechar = self.quotechar[0]
+        score, in_quotes = 0, False
+        position = data.find(self.quotechar)
+        while position >= 0:
+            before = data[position - 1] if position else None
+            after = data[position + 1] if position + 1 < len(data) else None
+            # escaped (doubled) quotes do not tell whether they are inside of a field
+            if quotechar not in (before, after):
+                opens = before in _FIELD_BREAKS
+                if opens != (after in _FIELD_BREAKS):
+                    score += 1 if opens != in_quotes else -1
+            in_quotes = not in_quotes
+            position = data.find(self.quotechar, position + 1)
+        return score < 0
+
+    def align(
+        self, data: bytes, skip_first: bool = False, skip_last: bool = False, max_records: Optional[int] = None
+    ) -> bytes:
+        """Cut a byte range of a CSV (e.g. a slice of a sample) to complete records.
+
+        A range from the middle of a CSV may start inside a quoted field, which is guessed from the positions of
+        its quotes.
+
+        :param data: The byte range.
+        :param skip_first: Drop the (partial) first record, i.e. the range starts at an arbitrary offset.
+        :param skip_last: Drop the (partial) last record, i.e. the range ends at an arbitrary offset.
+        :param max_records: Keep at most this number of records.
+        :return: The complete records of the range.
+        :rtype: bytes
+
+        >>> CsvRecordSplitter().align(b'x"\\n2,"c\\nd"\\n3,e\\n4,"f', skip_first=True, skip_last=True)
+        b'2,"c\\nd"\\n3,e\\n'
+        """
+        start = 0
+        if skip_first:
+            start = next(self.__record_ends(data, 0, self.__starts_in_quotes(data)), len(data))
+        end = start
+        for count, record_end in enumerate(self.__record_ends(data, start), 1):
+            end = record_end
+            if count == max_records:
+                break
+        else:
+            if not skip_last:
+                end = len(data)
+        return data[start:end]
+
+    def _emit(self, records: bytes, final: bool) -> bytes:
+        if self.header is None:
+            header_end = self.__first_record_end(records)
+            self.header, records = records[:header_end], records[header_end:]
+        # a file without data records still returns its header
+        if not records and (self.__emitted or not final):
+            return b""
+        self.__emitted = True
+        return self.header + records
+
+
+class JsonRecordSplitter(RecordSplitter):
+    """Splits JSON after each top-level document (JSON lines, concatenated or pretty printed documents) or, if the
+    stream is one top-level array, between the elements of the array. Chunks of an array are wrapped in brackets,
+    so each one is a valid JSON array of complete elements.
+
+    Brackets are counted outside of strings (including escaped quotes), top-level scalars are not split.
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> splitter = JsonRecordSplitter()
+        >>> splitter.split(b'[{"id": 1, "t": "]"}, {"id"')
+        b'[{"id": 1, "t": "]"}]'
+        >>> splitter.split(b': 2}]\\n')
+        b'[{"id": 2}]'
+        >>> splitter.flush()
+        b''
+    """
+
+    def __init__(self, array: Optional[bool] = None):
+        """Initialize the splitter.
+
+        :param array: Whether the stream is one top-level array (detected from the first character if None).
+        """
+        super().__init__()
+        self.array = array
+        self.__depth = 0
+        self.__in_string = False
+        self.__opened = False
+        self.__closed = False
+
+    def _scan(self, buffer: bytearray, start: int) -> Tuple[int, int]:
+        if self.array is None:
+            if not (first_char := _FIRST_CHAR.match(buffer)):
+                return 0, start
+            self.array = first_char.group(1) == b"["
+        if self.__closed:
+            return 0, len(buffer)
+        # trailing backslashes may escape the first character of the next part
+        end = len(buffer)
+        while end > start and buffer[end - 1] == ord("\\"):
+            end -= 1
+        boundary = 0
+        for token in _JSON_TOKEN.finditer(buffer, start, end):
+            char = token.group()
+            if self.__in_string:
+                self.__in_string = char != b'"'
+            elif char == b'"':
+                self.__in_string = True
+            elif char in (b"{", b"["):
+                self.__depth += 1
+            elif char in (b"}", b"]"):
+                self.__depth -= 1
+                if self.__depth == 0 and self.array:
+                    # end of the top-level array, the rest of the stream is ignored
+                    self.__closed = True
+                    return token.start(), len(buffer)
+                boundary = token.end() if self.__depth == 0 else boundary
+            elif char == b"," and self.array and self.__depth == 1:
+                boundary = token.end()
+        return boundary, end
+
+    def _emit(self, records: bytes, final: bool) -> bytes:
+        if not self.array:
+            return records
+        if final and self.__closed:
+            return b""
+        elements = records.strip()
+        if not self.__opened:
+            self.__opened = True
+            elements = elements[1:].lstrip()
+        if elements.endswith(b","):
+            elements = elements[:-1].rstrip()
+        return b"[" + elements + b"]" if elements else b""
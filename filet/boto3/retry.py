@@ -0,0 +1,272 @@
+"""Retries, timeouts and hedged requests for idempotent S3 calls (e.g. ranged GETs)."""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Deque, List, Optional, Set
+
+from botocore.exceptions import ClientError, HTTPClientError, IncompleteReadError, ResponseStreamingError
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERROR_CODES = {
+    "SlowDown",
+    "ServiceUnavailable",
+    "InternalError",
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "Throttling",
+    "ThrottlingException",
+}
+
+
+def _when_all_done(futures: List[Future], callback: Callable[[], Any]) -> None:
+    """Call ``callback`` once, after all futures are done (immediately if they are)."""
+    remaining = len(futures)
+    lock = threading.Lock()
+
+    def done(_: Future) -> None:
+        nonlocal remaining
+        with lock:
+            remaining -= 1
+            if remaining:
+                return
+        callback()
+
+    if not futures:
+        callback()
+    for future in futures:
+        future.add_done_callback(done)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error of a request is transient (throttling, server errors, timeouts, broken connections).
+
+    >>> is_retryable(TimeoutError())
+    True
+    >>> is_retryable(ValueError())
+    False
+    """
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code", "")
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return code in RETRYABLE_ERROR_CODES or status >= 500
+    return isinstance(error, (HTTPClientError, IncompleteReadError, ResponseStreamingError, OSError))
+
+
+class RetryPolicy:
+    """Runs idempotent calls with retries, exponential backoff, timeouts and optional hedging.
+
+    * A failed attempt is retried after ``backoff * 2 ** (attempt - 1)`` seconds (full jitter, at most
+      ``max_backoff``), if the error is transient (see :func:`is_retryable`) and attempts are left.
+    * An attempt that runs longer than ``timeout`` seconds is abandoned and retried immediately.
+    * With ``hedge_percentile``, a duplicate request is started once an attempt runs longer than that percentile
+      of the recent attempt latencies. The first successful attempt wins.
+    * ``deadline`` bounds the total seconds of all attempts of a call.
+
+    Timed attempts run on a separate thread pool (the caller usually runs on the pool of the download), so an
+    abandoned attempt can still finish in the background; its result is discarded. The calls must therefore be
+    idempotent and return a complete result or raise (e.g. a short read must raise, see
+    :class:`~filet.boto3.chunk_download.ChunkDownload`). Attempts that read or write a shared buffer must not
+    release it before ``on_settled`` of :meth:`call` is called, i.e. after abandoned attempts finished as well.
+    Without timeout, deadline and hedging, the attempts run in the calling thread.
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> policy = RetryPolicy(max_attempts=5, timeout=30, hedge_percentile=0.95)  # xdoctest: +SKIP
+        >>> chunk_download = ChunkDownload(s3_client, s3_source, retry_policy=policy)  # xdoctest: +SKIP
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        backoff: float = 0.2,
+        max_backoff: float = 10.0,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        latency_window: int = 200,
+        max_workers: int = 32,
+    ):
+        """Initialize the retry policy (one instance can be shared by several downloads).
+
+        :param max_attempts: Maximum number of attempts per call (hedged duplicates included).
+        :param backoff: Base of the exponential backoff in seconds.
+        :param max_backoff: Upper bound of one backoff in seconds.
+        :param timeout: Seconds after which an attempt is abandoned and retried.
+        :param deadline: Seconds after which a call fails with a ``TimeoutError``.
+        :param hedge_percentile: Latency percentile (e.g. 0.95) after which a duplicate request is started.
+        :param hedge_min_samples: Number of measured latencies needed before requests are hedged.
+        :param latency_window: Number of recent latencies the percentile is computed from.
+        :param max_workers: Maximum number of threads running timed attempts.
+        """
+        if max_attempts < 1:
+            raise ValueError(f"Invalid number of attempts: {max_attempts}.")
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.max_workers = max_workers
+        self.__latencies: Deque[float] = deque(maxlen=latency_window)
+        self.__lock = threading.Lock()
+        self.__executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """The thread pool of the timed attempts (created on first use)."""
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="RetryPolicy")
+            return self.__executor
+
+    def hedge_after(self) -> Optional[float]:
+        """Seconds after which an attempt is hedged (None while hedging is disabled or too few latencies are known).
+
+        :rtype: Optional[float]
+        """
+        if self.hedge_percentile is None:
+            return None
+        with self.__lock:
+            if len(self.__latencies) < self.hedge_min_samples:
+                return None
+            latencies = sorted(self.__latencies)
+        return latencies[min(len(latencies) - 1, int(self.hedge_percentile * len(latencies)))]
+
+    def __record(self, latency: float) -> None:
+        """Internal method to record the latency of a successful attempt."""
+        with self.__lock:
+            self.__latencies.append(latency)
+
+    def __sleep_backoff(self, attempt: int) -> None:
+        """Internal method to wait before the next attempt (exponential backoff with full jitter)."""
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1))))
+
+    def call(self, func: Callable[..., Any], *args, on_settled: Optional[Callable[[], Any]] = None, **kwargs) -> Any:
+        """Run a call with retries (and timeouts / hedging if configured).
+
+        :param func: The idempotent function.
+        :param on_settled: Called once no attempt of the call is running anymore (also abandoned or hedged ones,
+            which can outlive the call), e.g. to release a buffer the attempts read from or write into.
+        :return: The result of the first successful attempt.
+        :raises TimeoutError: If the deadline passed or all attempts timed out.
+        :raises Exception: The error of the last attempt if it is not retryable or no attempts are left.
+
+        :Example:
+
+        .. code-block:: python
+
+            >>> policy.call(upload, buffer, on_settled=lambda: pool.release(buffer))  # xdoctest: +SKIP
+        """
+        if self.timeout is None and self.deadline is None and self.hedge_percentile is None:
+            try:
+                return self.__call_inline(func, *args, **kwargs)
+            finally:
+                if on_settled:
+                    on_settled()
+        submitted: List[Future] = []
+        try:
+            return self.__call_timed(submitted, func, *args, **kwargs)
+        finally:
+            if on_settled:
+                _when_all_done(submitted, on_settled)
+
+    def __call_inline(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Internal method to run the attempts in the calling thread."""
+        for attempt in range(1, self.max_attempts + 1):
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_attempts or not is_retryable(e):
+                    raise
+                logger.warning(f"Attempt {attempt} / {self.max_attempts} failed, retrying: {e!r}")
+                self.__sleep_backoff(attempt)
+                continue
+            self.__record(time.perf_counter() - started)
+            return result
+
+    def __call_timed(self, submitted: List[Future], func: Callable[..., Any], *args, **kwargs) -> Any:  # noqa: C901
+        """Internal method to run the attempts on the thread pool, with timeouts and hedging.
+
+        :param submitted: Collects the futures of all attempts.
+        """
+        call_started = time.perf_counter()
+        pending: Set[Future] = set()
+        started = {}
+        attempts, hedged, last_error = 0, False, None
+
+        def submit() -> None:
+            nonlocal attempts
+            attempts += 1
+            future = self.executor.submit(func, *args, **kwargs)
+            submitted.append(future)
+            started[future] = time.perf_counter()
+            pending.add(future)
+
+        submit()
+        while pending:
+            now = time.perf_counter()
+            newest = max(started[future] for future in pending)
+            wakeups = []
+            if self.timeout is not None:
+                wakeups.append(newest + self.timeout)
+            if self.deadline is not None:
+                wakeups.append(call_started + self.deadline)
+            hedge_after = None if hedged else self.hedge_after()
+            if hedge_after is not None and attempts < self.max_attempts:
+                wakeups.append(newest + hedge_after)
+            timeout = max(0.0, min(wakeups) - now) if wakeups else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                pending.discard(future)
+                if future.exception() is None:
+                    self.__record(time.perf_counter() - started[future])
+                    for abandoned in pending:
+                        abandoned.cancel()
+                    return future.result()
+                last_error = future.exception()
+                if not is_retryable(last_error):
+                    raise last_error
+                logger.warning(f"Attempt {attempts} / {self.max_attempts} failed: {last_error!r}")
+
+            now = time.perf_counter()
+            if self.deadline is not None and now - call_started >= self.deadline:
+                break
+            timed_out = self.timeout is not None and now - newest >= self.timeout
+            if attempts >= self.max_attempts:
+                if timed_out:
+                    break
+                continue
+            if done and not pending:
+                self.__sleep_backoff(attempts)
+                submit()
+            elif timed_out:
+                logger.warning(f"Attempt {attempts} / {self.max_attempts} timed out after {self.timeout}s, retrying.")
+                submit()
+            elif hedge_after is not None and now - newest >= hedge_after:
+                logger.debug(f"Hedging attempt {attempts} after {hedge_after:.3f}s.")
+                hedged = True
+                submit()
+
+        for abandoned in pending:
+            abandoned.cancel()
+        if pending or last_error is None:
+            raise TimeoutError(f"No attempt finished in time ({attempts} attempts).")
+        raise last_error
+
+    def shutdown(self) -> None:
+        """Shut down the thread pool (abandoned attempts are not waited for)."""
+        with self.__lock:
+            if self.__executor is not None:
+                self.__executor.shutdown(wait=False, cancel_futures=True)
+                self.__executor = None
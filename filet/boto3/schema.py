@@ -47,18 +47,11 @@ class ListObjectsV2CommonPrefix(BaseModel):
     Prefix: str = ""
 
 
-class ListObjectsV2ContentsChecksumAlgorithm(BaseModel):
-    CRC32: str = ""
-    CRC32C: str = ""
-    SHA1: str = ""
-    SHA256: str = ""
-
-
 class ListObjectsV2Content(BaseModel):
     Key: str = ""
     LastModified: datetime = datetime.now()
     ETag: str = ""
-    ChecksumAlgorithm: List[ListObjectsV2ContentsChecksumAlgorithm] = Field(default_factory=list)
+    ChecksumAlgorithm: List[str] = Field(default_factory=list)  # e.g. ["CRC32"]
     Size: int = 0
     StorageClass: str = ""
     Owner: ListObjectsV2ContentsOwner = Field(default_factory=ListObjectsV2ContentsOwner)
@@ -99,7 +92,6 @@ class Compression(Enum):
     """String representation of compressions."""
 
     gzip = ".gz"
-    # TODO: Other compressions not implemented
     zstd = ".zstd"
     lz4 = ".lz4"
     snappy = ".snappy"
@@ -0,0 +1,76 @@
+"""Persistent state of resumable multipart uploads."""
+
+import logging
+import threading
+from typing import Optional
+
+from sqlitedict import SqliteDict
+
+from filet.config.cache_db import DATABASE_URL, CacheTable, UploadState
+
+logger = logging.getLogger(__name__)
+
+
+class UploadStateStore:
+    """Persists the :class:`~filet.config.cache_db.UploadState` of resumable uploads in their own table of the cache
+    database.
+
+    Every finished part updates the state of its upload, so every state is a single entry of a
+    :class:`~filet.config.cache_db.CacheTable`. The part uploads of one or more uploads may save concurrently from
+    worker threads.
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> upload_states = UploadStateStore()  # xdoctest: +SKIP
+        >>> upload_states.put("bucket/data/file.csv.gz", state)  # xdoctest: +SKIP
+        >>> state = upload_states.get("bucket/data/file.csv.gz")  # xdoctest: +SKIP
+    """
+
+    def __init__(self, db_path: str = DATABASE_URL):
+        """Initialize the store.
+
+        :param db_path: The SqliteDict database (by default the one of the cache store).
+        """
+        self.db_path = db_path
+        self.__table = CacheTable(self.__class__.__name__, db_path)
+        self.__lock = threading.Lock()
+
+    @property
+    def db(self) -> SqliteDict:
+        """The table of the upload states (opened on first use)."""
+        return self.__table.db
+
+    def get(self, key: str) -> Optional[UploadState]:
+        """Get the persisted state of an upload.
+
+        :param key: The key of the upload (see :attr:`~filet.boto3.multipart_upload.MultipartUpload.state_key`).
+        :return: The state or None if no upload of the key is persisted.
+        :rtype: Optional[UploadState]
+        """
+        return self.db.get(key)
+
+    def put(self, key: str, state: UploadState) -> None:
+        """Persist the state of an upload (replaces the previous state of the key).
+
+        :param key: The key of the upload.
+        :param state: The state.
+        """
+        db = self.db
+        with self.__lock:
+            db[key] = state
+
+    def pop(self, key: str) -> Optional[UploadState]:
+        """Remove the persisted state of an upload.
+
+        :param key: The key of the upload.
+        :return: The removed state or None if no upload of the key was persisted.
+        :rtype: Optional[UploadState]
+        """
+        db = self.db
+        with self.__lock:
+            return db.pop(key, None)
+
+
+upload_states = UploadStateStore()
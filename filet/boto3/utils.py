@@ -1,9 +1,9 @@
 from datetime import datetime
+from functools import lru_cache
 from itertools import chain
 import logging
-from pathlib import Path
 import re
-from typing import List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urlparse
 
 from filet.boto3.schema import (
@@ -18,6 +18,8 @@ from filet.config.objects_pattern import ObjectsPattern
 
 logger = logging.getLogger(__name__)
 
+MAX_MEMOIZED_DATES = 100000
+
 
 def validate_date(date_text, date_format):
     """Extract date from String according to given format."""
@@ -27,103 +29,278 @@ def validate_date(date_text, date_format):
         return
 
 
-def extract_file_meta(  # noqa: C901 TODO: reduce complexity
-    objects: ListObjectsV2Result, objects_pattern: ObjectsPattern
-) -> List[S3Source]:
-    """Extract the file date from the key."""
-    logger.debug("Extracting file meta for %s, %s (objects)", objects.Name, len(objects.Contents))
+class KeyMetaExtractor:
+    """Extracts the meta (file date, key pattern, suffixes) of object keys with the patterns of an
+    :class:`ObjectsPattern`.
+
+    The patterns are compiled once. Per key, one combined pass of all date patterns (and one per extra pattern
+    group) rules out keys without matches before the single patterns are searched. The date format that parsed a
+    date string is memoized per shape of the string (its digits replaced by ``0``), so later dates of the same
+    shape are parsed with that format directly instead of trying every format. A format is only memoized if no
+    earlier format can match the shape (see :func:`_format_shape`), so the result is always the one of the first
+    matching format; if the memoized format fails, all formats are tried again. The parsed dates are memoized as
+    well (up to ``MAX_MEMOIZED_DATES``), as many keys share their dates.
+
+    Use :func:`key_meta_extractor` to share the extractor (and its memo) of equal patterns.
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> extractor = KeyMetaExtractor(ObjectsPattern())  # xdoctest: +SKIP
+        >>> obj = ListObjectsV2Content(Key="data/2024-01-01.csv.gz")
+        >>> s3_source = extractor.extract(obj, "bucket")  # xdoctest: +SKIP
+        >>> s3_source.KeyPattern, s3_source.ObjectCompression  # xdoctest: +SKIP
+        ('data/<Y-m-d>.csv.gz', <Compression.gzip: '.gz'>)
+    """
+
+    def __init__(self, objects_pattern: ObjectsPattern):
+        """Initialize the extractor.
+
+        :param objects_pattern: The patterns to extract the meta (dates, extra fields) from the keys.
+        """
+        self.date_formats = tuple(objects_pattern.date_formats)
+        self.date_regexes = [re.compile(pattern) for pattern in objects_pattern.date_regex_patterns]
+        self.date_regex = _combine(objects_pattern.date_regex_patterns)
+        self.extra_regexes = [
+            (f"<{pattern_key}>".replace("%", "_"), _combine(patterns), [re.compile(pattern) for pattern in patterns])
+            for pattern_key, patterns in objects_pattern.extra_regex_patterns.items()
+        ]
+        self.__format_shapes = [_format_shape(date_format) for date_format in self.date_formats]
+        self.__shape_formats: Dict[str, str] = {}
+        self.__dates: Dict[str, Optional[Tuple[datetime, str]]] = {}
+
+    def parse_date(self, date_str: str) -> Optional[Tuple[datetime, str]]:
+        """Parse a date string with the first matching date format.
+
+        :param date_str: The date string (found by a date pattern).
+        :return: The date and its format or None if no format matches.
+        :rtype: Optional[Tuple[datetime, str]]
+        """
+        if date_str in self.__dates:
+            return self.__dates[date_str]
+        shape = date_str.translate(_DIGITS_TO_ZERO)
+        date_format = self.__shape_formats.get(shape)
+        parsed = None
+        if date_format and (file_date := validate_date(date_str, date_format)):
+            parsed = file_date, date_format
+        else:
+            for index, date_format in enumerate(self.date_formats):
+                if file_date := validate_date(date_str, date_format):
+                    if not any(format_shape.fullmatch(shape) for format_shape in self.__format_shapes[:index]):
+                        self.__shape_formats[shape] = date_format
+                    parsed = file_date, date_format
+                    break
+        if len(self.__dates) >= MAX_MEMOIZED_DATES:
+            self.__dates.clear()
+        self.__dates[date_str] = parsed
+        return parsed
+
+    def extract_date(self, key: str) -> Dict[str, Any]:
+        """Extract the first date of a key and the key pattern with the dates replaced by their formats.
+
+        :param key: The object key.
+        :return: The fields ``DateStr``, ``DateFormat``, ``FileDate`` and ``KeyPattern`` (the key pattern is empty
+            if the key contains dates that do not match any format).
+        :rtype: Dict[str, Any]
+        """
+        if self.date_regex and not self.date_regex.search(key):
+            return {"KeyPattern": key}
+        date_strs = [date_str for regex in self.date_regexes for date_str in regex.findall(key)]
+        if not date_strs:
+            return {"KeyPattern": key}
 
-    def extract_date(obj: ListObjectsV2Content) -> S3Source:
-        if not obj.Key or str(obj.Key) == "nan":
-            return S3Source(Bucket=objects.Name, **obj.model_dump())
-        date_strs = list(
+        parsed = []
+        key_pattern = key
+        for date_str in date_strs:
+            if parsed_date := self.parse_date(date_str):
+                parsed.append(parsed_date)
+                key_pattern = key_pattern.replace(date_str, f"<{parsed_date[1].replace('%', '')}>")
+        if not parsed:
+            return {}
+        (file_date, date_format), *_ = parsed
+        return {"DateStr": date_strs[0], "FileDate": file_date, "DateFormat": date_format, "KeyPattern": key_pattern}
+
+    def extract_pattern(self, key_pattern: str) -> str:
+        """Replace the matches of the extra patterns in a key pattern by their names.
+
+        :param key_pattern: The key pattern (with the dates replaced).
+        :return: The key pattern.
+        :rtype: str
+        """
+        for replace_str, combined, regexes in self.extra_regexes:
+            if combined and not combined.search(key_pattern):
+                continue
+            key_pattern = self.replace_extra(key_pattern, replace_str, regexes)
+        return key_pattern
+
+    @staticmethod
+    def replace_extra(key_pattern: str, replace_str: str, regexes: List[re.Pattern]) -> str:
+        """Replace the matches of one extra pattern group (repeated replacements are merged into one)."""
+        extra_strs = list(
             chain(
                 *[
-                    match
-                    for match in [re.findall(pattern, str(obj.Key)) for pattern in objects_pattern.date_regex_patterns]
+                    match if len(match) == 1 else list(chain(*match))
+                    for match in [regex.findall(key_pattern) for regex in regexes]
                     if match
                 ]
             )
         )
-        if not date_strs:
-            extended_obj = S3Source(Bucket=objects.Name, **obj.model_dump())
-            extended_obj.KeyPattern = obj.Key
-            return extended_obj
-
-        file_dates = []
-        date_formats_used = []
-        key_pattern = obj.Key
-        extended_obj = S3Source(Bucket=objects.Name, **obj.model_dump())
-        for date_str in date_strs:
-            for date_format in objects_pattern.date_formats:
-                if file_date := validate_date(date_str, date_format):
-                    file_dates.append(file_date)
-                    date_formats_used.append(date_format)
-                    key_pattern = key_pattern.replace(date_str, f"<{date_format.replace('%', '')}>")
-        if file_dates:
-            extended_obj.DateStr = date_strs[0]
-            extended_obj.DateFormat = date_formats_used[0]
-            extended_obj.FileDate = file_dates[0]
-            extended_obj.KeyPattern = key_pattern
-        return extended_obj
-
-    def extract_pattern(obj: S3Source) -> S3Source:
-        if not obj.KeyPattern:
-            return obj
-
-        for pattern_key, patterns in objects_pattern.extra_regex_patterns.items():
-            extra_strs = list(
-                chain(
-                    *[
-                        match if len(match) == 1 else list(chain(*match))
-                        for match in [
-                            re.findall(
-                                pattern,
-                                str(obj.KeyPattern),
-                            )
-                            for pattern in patterns
-                        ]
-                        if match
-                    ]
-                )
-            )
-            if not extra_strs:
-                continue
-            key_pattern = obj.KeyPattern
-            obj.KeyPattern = obj.Key
-            replace_str = f"<{pattern_key}>".replace("%", "_")
-            for extra_str in extra_strs:
-                key_pattern = key_pattern.replace(extra_str, replace_str)
+        for extra_str in extra_strs:
+            key_pattern = key_pattern.replace(extra_str, replace_str)
+        if extra_strs:
             while f"{replace_str}{replace_str}" in key_pattern:
                 key_pattern = key_pattern.replace(f"{replace_str}{replace_str}", replace_str)
-            obj.KeyPattern = key_pattern
-        return obj
-
-    def extract_ext(obj: S3Source) -> S3Source:
-        url = urlparse(obj.Key)
-        obj.ObjectBaseName = url.path.lstrip("/")
-        obj.ObjectSuffix = Path(url.path).suffix
-        if not obj.ObjectSuffix:
-            return obj
-
-        if obj.ObjectSuffix in [c.value for c in Encryption]:
-            obj.ObjectEncryption = Encryption(obj.ObjectSuffix)
-            obj.ObjectBaseName = obj.ObjectBaseName[: -len(obj.ObjectSuffix)]
-            obj.ObjectSuffix = Path(obj.ObjectBaseName).suffix
-
-        if obj.ObjectSuffix in [c.value for c in Compression]:
-            obj.ObjectCompression = Compression(obj.ObjectSuffix)
-            obj.ObjectBaseName = obj.ObjectBaseName[: -len(obj.ObjectSuffix)]
-            obj.ObjectSuffix = Path(obj.ObjectBaseName).suffix
-
-        if obj.ObjectSuffix in [f.value for f in Format]:
-            obj.ObjectFormat = Format(obj.ObjectSuffix)
-            obj.ObjectBaseName = obj.ObjectBaseName[: -len(obj.ObjectSuffix)]
-            obj.ObjectSuffix = Path(obj.ObjectBaseName).suffix
-
-        obj.Prefix = obj.ObjectBaseName.rsplit("/", 1)[0]
-        if obj.Prefix == obj.Bucket:
-            obj.Prefix = ""
-        return obj
-
-    return [extract_ext(extract_pattern(extract_date(obj))) for obj in objects.Contents]
+        return key_pattern
+
+    @staticmethod
+    def extract_ext(key: str, bucket: str) -> Dict[str, Any]:
+        """Split the encryption, compression and format suffixes off a key.
+
+        :param key: The object key.
+        :param bucket: The bucket of the object.
+        :return: The fields ``ObjectBaseName``, ``ObjectSuffix``, ``ObjectEncryption``, ``ObjectCompression``,
+            ``ObjectFormat`` and ``Prefix``.
+        :rtype: Dict[str, Any]
+        """
+        path = _url_path(key)
+        meta: Dict[str, Any] = {"ObjectBaseName": path.lstrip("/"), "ObjectSuffix": _suffix(path)}
+        if not meta["ObjectSuffix"]:
+            return meta
+
+        for field, suffix_type in (
+            ("ObjectEncryption", Encryption),
+            ("ObjectCompression", Compression),
+            ("ObjectFormat", Format),
+        ):
+            if meta["ObjectSuffix"] in _SUFFIXES[suffix_type]:
+                meta[field] = suffix_type(meta["ObjectSuffix"])
+                meta["ObjectBaseName"] = meta["ObjectBaseName"][: -len(meta["ObjectSuffix"])]
+                meta["ObjectSuffix"] = _suffix(meta["ObjectBaseName"])
+
+        meta["Prefix"] = meta["ObjectBaseName"].rsplit("/", 1)[0]
+        if meta["Prefix"] == bucket:
+            meta["Prefix"] = ""
+        return meta
+
+    def extract_meta(self, key: str, bucket: str) -> Dict[str, Any]:
+        """Extract the meta of a key.
+
+        :param key: The object key.
+        :param bucket: The bucket of the object.
+        :return: The extracted fields of the :class:`S3Source` (the ones that are not extracted are omitted).
+        :rtype: Dict[str, Any]
+        """
+        meta = self.extract_date(key) if key and key != "nan" else {}
+        if meta.get("KeyPattern"):
+            meta["KeyPattern"] = self.extract_pattern(meta["KeyPattern"])
+        meta.update(self.extract_ext(key, bucket))
+        return meta
+
+    def extract(self, obj: ListObjectsV2Content, bucket: str) -> S3Source:
+        """Extract the meta of an object.
+
+        :param obj: The listed object.
+        :param bucket: The bucket of the object.
+        :return: The object with the extracted meta.
+        :rtype: S3Source
+        """
+        return S3Source(**{**obj.model_dump(), "Bucket": bucket, **self.extract_meta(str(obj.Key), bucket)})
+
+
+def _combine(patterns: Iterable[str]) -> Optional[re.Pattern]:
+    """Compile patterns into one alternation (None if they cannot be combined, e.g. duplicate group names).
+
+    >>> _combine(["[ ]", "part-[0-9]+"]).pattern
+    '(?:[ ])|(?:part-[0-9]+)'
+    """
+    try:
+        return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+    except re.error:
+        return None
+
+
+_DIGITS_TO_ZERO = str.maketrans("123456789", "000000000")
+# shapes of the numeric strptime directives (their digits replaced by 0, optionally space padded)
+_DIRECTIVE_SHAPES = {"Y": "0{4}", "G": "0{4}", "f": "0{1,6}", "j": " ?0{1,3}", "%": "%"}
+_DIRECTIVE_SHAPES.update({directive: " ?0{1,2}" for directive in "dmyHIMSUWVuw"})
+
+
+@lru_cache(maxsize=None)
+def _format_shape(date_format: str) -> re.Pattern:
+    """Get a regex of the shapes (see :data:`_DIGITS_TO_ZERO`) of the strings a date format may parse.
+
+    Other directives than the numeric ones match anything, so a shape that does not match cannot be parsed.
+
+    >>> _format_shape("%Y-%m-%d").fullmatch("0000-00-00") is not None
+    True
+    >>> _format_shape("%Y-%m-%d").fullmatch("00000000") is None
+    True
+    """
+    pattern = []
+    for literal, directive in re.findall(r"([^%]*)(%.?)?", date_format):
+        # strptime matches a run of whitespace in the format with any whitespace
+        for part in re.split(r"(\s+)", literal.translate(_DIGITS_TO_ZERO)):
+            pattern.append(r"\s+" if part.isspace() else re.escape(part))
+        if directive:
+            pattern.append(_DIRECTIVE_SHAPES.get(directive[1:], ".*"))
+    return re.compile("".join(pattern), re.IGNORECASE | re.DOTALL)
+
+
+_SUFFIXES = {suffix_type: {member.value for member in suffix_type} for suffix_type in (Encryption, Compression, Format)}
+
+
+def _url_path(key: str) -> str:
+    """The path of a key parsed as URL (as ``urlparse(key).path``, without parsing keys that are plain paths).
+
+    >>> _url_path("data/a.csv"), _url_path("data/a?b.csv"), _url_path("s3://bucket/a.csv")
+    ('data/a.csv', 'data/a', '/a.csv')
+    """
+    if key[:1] > " " and not key.startswith("//") and not any(char in key for char in ":;?#\t\r\n"):
+        return key
+    return urlparse(key).path
+
+
+def _suffix(path: str) -> str:
+    """The suffix of the last component of a path (as ``Path(path).suffix``).
+
+    >>> _suffix("data/a.csv.gz"), _suffix("data/.hidden"), _suffix("data/a."), _suffix("data.d/")
+    ('.gz', '', '', '.d')
+    """
+    name = path.rsplit("/", 1)[-1]
+    if name in ("", "."):
+        name = next((part for part in reversed(path.split("/")) if part not in ("", ".")), "")
+    index = name.rfind(".")
+    return name[index:] if 0 < index < len(name) - 1 else ""
+
+
+@lru_cache(maxsize=16)
+def _cached_extractor(date_regex_patterns, extra_regex_patterns, date_formats) -> KeyMetaExtractor:
+    return KeyMetaExtractor(
+        ObjectsPattern.model_construct(
+            date_regex_patterns=date_regex_patterns,
+            extra_regex_patterns={pattern_key: list(patterns) for pattern_key, patterns in extra_regex_patterns},
+            date_formats=date_formats,
+        )
+    )
+
+
+def key_meta_extractor(objects_pattern: ObjectsPattern) -> KeyMetaExtractor:
+    """Get the (shared) extractor of the patterns.
+
+    :param objects_pattern: The patterns to extract the meta (dates, extra fields) from the keys.
+    :return: The extractor, the same for equal patterns.
+    :rtype: KeyMetaExtractor
+    """
+    return _cached_extractor(
+        tuple(objects_pattern.date_regex_patterns),
+        tuple((pattern_key, tuple(patterns)) for pattern_key, patterns in objects_pattern.extra_regex_patterns.items()),
+        tuple(objects_pattern.date_formats),
+    )
+
+
+def extract_file_meta(objects: ListObjectsV2Result, objects_pattern: ObjectsPattern) -> List[S3Source]:
+    """Extract the file date from the key (see :class:`KeyMetaExtractor`)."""
+    logger.debug("Extracting file meta for %s, %s (objects)", objects.Name, len(objects.Contents))
+    extractor = key_meta_extractor(objects_pattern)
+    return [extractor.extract(obj, objects.Name) for obj in objects.Contents]
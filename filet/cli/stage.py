@@ -7,8 +7,18 @@ from prompt_toolkit import prompt
 from rich import print
 from sqlalchemy import create_engine, text
 
-from filet.boto3.fetch_s3_sources import fetch_s3_sources
-from filet.boto3.schema import Encryption, Format, ListBucketsResult, ListObjectsV2Result, S3Source, S3SourceExtra
+from filet.boto3.chunk_cache import CHUNK_CACHE_DIR, ChunkCache
+from filet.boto3.fetch_s3_sources import advance_watermark, iter_s3_sources
+from filet.boto3.listing_cache import listing_cache
+from filet.boto3.schema import (
+    Encryption,
+    Format,
+    ListBucketsResult,
+    ListObjectsV2Content,
+    ListObjectsV2Result,
+    S3Source,
+    S3SourceExtra,
+)
 from filet.boto3.types import S3Client
 from filet.boto3.utils import extract_file_meta
 from filet.cli.global_options import ProcessOptions
@@ -59,12 +69,24 @@ def add(  # noqa: C901
     objects_pattern: ObjectsPattern = ObjectsPattern(),
     trino_dwh_config: TrinoDwhConfig = TrinoDwhConfig(),
     silent: bool = False,
+    refresh: Annotated[
+        bool, typer.Option(..., "--refresh", help="List the objects again (ignore cached pages).")
+    ] = False,
+    chunk_cache_dir: Annotated[
+        Optional[str],
+        typer.Option(
+            ...,
+            "--chunk-cache",
+            help=f"Cache the downloaded byte ranges in this directory (e.g. {CHUNK_CACHE_DIR}).",
+        ),
+    ] = None,
 ):
     """Add new stage."""
     loading_animation = None
     prompt_selection = PromptSelection("dummy")
     try:
         s3_client = init_config(s3cfg, objects_pattern, trino_dwh_config, s3_source)
+        chunk_cache = ChunkCache(chunk_cache_dir) if chunk_cache_dir else None
         if not s3_source.Bucket:
             loading_animation = LoadingAnimation(
                 f"Reading Buckets from [magenta]{s3cfg.endpoint_url}[/magenta]", total_width=5, silent=silent
@@ -103,8 +125,13 @@ def add(  # noqa: C901
                     [prompt_selection.selected_obj in obj for obj in all_prefixes if s3_source.Prefix != obj]
                 ):
                     prefixes = ListObjectsV2Result(
-                        **s3_client.list_objects_v2(
-                            Bucket=s3_source.Bucket, Prefix=s3_source.Prefix, Delimiter="/", MaxKeys=100
+                        **listing_cache.list_objects_v2(
+                            s3_client,
+                            refresh=refresh,
+                            Bucket=s3_source.Bucket,
+                            Prefix=s3_source.Prefix,
+                            Delimiter="/",
+                            MaxKeys=100,
                         )
                     )
                     for prefix in prefixes.CommonPrefixes:
@@ -175,14 +202,14 @@ def add(  # noqa: C901
             logger.debug("Selected JSON Format: %s", json_format)
             if json_format == JsonFormat.txt:
                 loading_animation.start()
-                stage_json(s3_client, s3_source, trino_dwh_config)
+                stage_json(s3_client, s3_source, trino_dwh_config, chunk_cache=chunk_cache)
             if json_format == JsonFormat.flat:
                 loading_animation.start()
-                stage_flat_json(s3_client, s3_source, trino_dwh_config)
+                stage_flat_json(s3_client, s3_source, trino_dwh_config, chunk_cache=chunk_cache)
 
         if s3_source.ObjectFormat == Format.csv:
             loading_animation.start()
-            stage_csv(s3_client, s3_source, trino_dwh_config)
+            stage_csv(s3_client, s3_source, trino_dwh_config, chunk_cache=chunk_cache)
 
         loading_animation.stop()
 
@@ -217,6 +244,25 @@ def ingest(  # noqa: C901
     objects_pattern: ObjectsPattern = ObjectsPattern(),
     s3cfg: Boto3ClientConfig = Boto3ClientConfig(),
     trino_dwh_config: TrinoDwhConfig = TrinoDwhConfig(),
+    incremental: Annotated[
+        bool, typer.Option(..., "--incremental", help="Ingest only the objects added since the last ingest.")
+    ] = False,
+    key_ordered: Annotated[
+        bool,
+        typer.Option(..., "--key-ordered", help="New objects have greater keys (e.g. dates), list only those."),
+    ] = False,
+    use_listing_cache: Annotated[
+        bool,
+        typer.Option(
+            ...,
+            "--listing-cache",
+            help="Reuse the listing pages cached by earlier commands (objects written since are missed).",
+        ),
+    ] = False,
+    inventory_manifest: Annotated[
+        Optional[str],
+        typer.Option(..., "--inventory-manifest", help="Read the objects from this S3 Inventory manifest.json."),
+    ] = None,
     # silent: bool = False,
 ):
     """Add new stage."""
@@ -238,22 +284,29 @@ def ingest(  # noqa: C901
         if not current_stage.s3_source:
             raise ValueError(f"Stage {prompt_selection.selected_obj} has no S3 Source.")
 
-        objects = fetch_s3_sources(
+        trino_engine = create_engine(**trino_dwh_config.client_config.model_dump())
+        trino_connection = trino_engine.connect()
+        logger.debug("Trino Connection: %s", trino_connection)
+        ingested = []  # key and LastModified of the ingested objects, to advance the watermark
+        for objects in iter_s3_sources(
             s3_client,
             current_stage.s3_source.Bucket,
-            max_keys_per_prefix=100,
             prefix=current_stage.s3_source.Prefix,
             objects_pattern=objects_pattern,
-        )
-
-        trino_engine = create_engine(**trino_dwh_config.client_config.model_dump())
-        trino_connection = trino_engine.connect()
-        logger.debug("Trino Connection: %s", trino_connection)
-        for obj in objects:
-            execute_sql = str(current_stage.sql.insert)
-            execute_sql = execute_sql.replace("?", f"'s3a://{obj.Bucket}/{obj.Key}'")
-            logger.debug("Ingest SQL Statement: %s", execute_sql)
-            trino_connection.execute(text(execute_sql))
+            watermark=prompt_selection.selected_obj if incremental else None,
+            key_ordered=key_ordered,
+            listing_cache=listing_cache if use_listing_cache else None,
+            inventory_manifest=inventory_manifest,
+        ):
+            for obj in objects:
+                execute_sql = str(current_stage.sql.insert)
+                execute_sql = execute_sql.replace("?", f"'s3a://{obj.Bucket}/{obj.Key}'")
+                logger.debug("Ingest SQL Statement: %s", execute_sql)
+                trino_connection.execute(text(execute_sql))
+            if incremental:
+                ingested.extend(ListObjectsV2Content(Key=obj.Key, LastModified=obj.LastModified) for obj in objects)
+        if incremental:
+            advance_watermark(prompt_selection.selected_obj, ingested)
 
     except KeyboardInterrupt:
         if loading_animation and isinstance(loading_animation, LoadingAnimation):
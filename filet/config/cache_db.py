@@ -1,6 +1,10 @@
 from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+from sqlitedict import SqliteDict
 
 import filet
 from filet.boto3.schema import S3Source
@@ -11,6 +15,40 @@ from filet.cpputils import CsvEvaluationResult
 DATABASE_URL = str(Path(filet.__file__).parent.resolve() / "config" / "cache.db")
 
 
+class CacheTable:
+    """A table of the cache database next to the :class:`Store`, opened on first use (thread-safe).
+
+    The store is loaded and saved as a whole, so data that is read or written one entry at a time (e.g. per object
+    or per finished part) is kept in a table of its own, where only the entry is written.
+
+    :Example:
+
+    .. code-block:: python
+
+        >>> table = CacheTable("GzipIndexCache")  # xdoctest: +SKIP
+        >>> table.db["bucket/data/file.csv.gz"] = index  # xdoctest: +SKIP
+    """
+
+    def __init__(self, tablename: str, db_path: str = DATABASE_URL):
+        """Initialize the table.
+
+        :param tablename: The name of the table.
+        :param db_path: The SqliteDict database (by default the one of the cache store).
+        """
+        self.tablename = tablename
+        self.db_path = db_path
+        self.__lock = threading.Lock()
+        self.__db: Optional[SqliteDict] = None
+
+    @property
+    def db(self) -> SqliteDict:
+        """The table (opened on first use)."""
+        with self.__lock:
+            if self.__db is None:
+                self.__db = SqliteDict(self.db_path, tablename=self.tablename, autocommit=True)
+            return self.__db
+
+
 @dataclass
 class SQL:
     """SQL queries for the stage"""
@@ -31,12 +69,38 @@ class Stage:
     s3_source: Optional[S3Source] = None
 
 
+@dataclass
+class UploadedPart:
+    """A finished part of a resumable multipart upload"""
+    part_number: int
+    etag: str
+    source_offset: int  # number of source bytes (before compression) uploaded up to the end of this part
+
+
+@dataclass
+class UploadState:
+    """State of a resumable multipart upload (see :class:`~filet.boto3.upload_state_store.UploadStateStore`)"""
+    upload_id: str
+    part_size: int
+    compression: str = ""
+    parts: Dict[int, UploadedPart] = field(default_factory=dict)
+
+
+@dataclass
+class ListingWatermark:
+    """Position of the last successful incremental listing of a stage (see ``fetch_s3_sources``)"""
+    start_after: str = ""  # the greatest key listed so far
+    last_modified: Optional[datetime] = None  # the newest LastModified listed so far
+    keys: List[str] = field(default_factory=list)  # the keys listed with exactly this LastModified
+
+
 class Store(PersistentModel):
     """Persistent storage for global configuration and profile"""
     db_path: str = DATABASE_URL
     default_config: str = default_config(".env")
 
     stages: Dict[str, Stage] = field(default_factory=dict)
+    watermarks: Dict[str, ListingWatermark] = field(default_factory=dict)
 
 
 @dataclass
@@ -1,5 +1,7 @@
 import logging
+from typing import Optional
 
+from filet.boto3.chunk_cache import ChunkCache
 from filet.boto3.chunk_download import ChunkDownload
 from filet.boto3.schema import S3Source
 from filet.boto3.types import S3Client
@@ -10,16 +12,21 @@ from filet.cpputils import eval_csv
 logger = logging.getLogger(__name__)
 
 
-def stage_csv(s3_client: S3Client, s3_source: S3Source, trino_dwh_config: TrinoDwhConfig):
+def stage_csv(
+    s3_client: S3Client,
+    s3_source: S3Source,
+    trino_dwh_config: TrinoDwhConfig,
+    chunk_cache: Optional[ChunkCache] = None,
+):
     """Stage CSV files from S3 to local."""
     logger.debug("Trino DWH Config: %s", trino_dwh_config)
 
-    # first element
-    chunk_download = ChunkDownload(s3_client, s3_source)
-    first_part = chunk_download.get_part()
+    # sample head, middle and tail of the file
+    with ChunkDownload(s3_client, s3_source, chunk_cache=chunk_cache) as chunk_download:
+        csv_sample = b"".join(chunk_download.sample(quotechar=b'"'))
 
-    # evaluate csv file header
-    csv_schema = eval_csv(first_part)
+    # evaluate csv file header and types
+    csv_schema = eval_csv(csv_sample)
 
     return stage_flat_table(csv_schema, s3_source, trino_dwh_config)
 
@@ -89,10 +89,10 @@ def stage_avro_json(s3_client: S3Client, s3_source: S3Source, trino_dwh_config:
     logger.debug("Trino DWH Config: %s", trino_dwh_config)
     schema = s3_source.Bucket.replace("-", "_").lower()
     # first element
-    chunk_download = ChunkDownload(s3_client, s3_source)
-    # chunk_download.estimated_parts = 1
-    # chunk_download.chunk_size = chunk_download.estimated_size
-    first_part = chunk_download.get_part()
+    with ChunkDownload(s3_client, s3_source) as chunk_download:
+        # chunk_download.estimated_parts = 1
+        # chunk_download.chunk_size = chunk_download.estimated_size
+        first_part = chunk_download.get_part()
 
     # evaluate csv file header
     json_schema = eval_json(first_part)
@@ -1,24 +1,36 @@
 import logging
+from typing import Optional
 
+from filet.boto3.chunk_cache import ChunkCache
 from filet.boto3.chunk_download import ChunkDownload
 from filet.boto3.schema import S3Source
 from filet.boto3.types import S3Client
 from filet.config.trino_client import TrinoDwhConfig
+from filet.core.json.utils import is_json_lines
 from filet.core.stage_table import stage_flat_table
 from filet.cpputils import eval_flat_json
 
 logger = logging.getLogger(__name__)
 
 
-def stage_flat_json(s3_client: S3Client, s3_source: S3Source, trino_dwh_config: TrinoDwhConfig):
+def stage_flat_json(
+    s3_client: S3Client,
+    s3_source: S3Source,
+    trino_dwh_config: TrinoDwhConfig,
+    chunk_cache: Optional[ChunkCache] = None,
+):
     """Stage CSV files from S3 to local."""
     logger.debug("Trino DWH Config: %s", trino_dwh_config)
 
-    # first element
-    chunk_download = ChunkDownload(s3_client, s3_source)
-    # chunk_download.estimated_parts = 1
-    # chunk_download.chunk_size = chunk_download.estimated_size
-    total_body = chunk_download.get_part()
+    # sample head, middle and tail of the file
+    with ChunkDownload(s3_client, s3_source, chunk_cache=chunk_cache) as chunk_download:
+        json_sample = chunk_download.sample()
+        # only newline delimited json can be sampled at arbitrary offsets, a json document is evaluated from its start
+        # (a single slice is the head of the object already)
+        if is_json_lines(json_sample[0]) or len(json_sample) == 1:
+            total_body = b"".join(json_sample)
+        else:
+            total_body = chunk_download.get_part()
 
     # fix_handler = JsonFixHandler()
     # total_body = eval_flat_json(total_body)
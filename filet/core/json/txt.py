@@ -1,7 +1,7 @@
 from io import BytesIO
 import json
 import logging
-from typing import Union
+from typing import Optional, Union
 
 import avro
 import avro.datafile
@@ -9,6 +9,7 @@ import avro.schema
 import boto3
 import orjson
 
+from filet.boto3.chunk_cache import ChunkCache
 from filet.boto3.chunk_download import ChunkDownload
 from filet.boto3.schema import S3Source
 from filet.boto3.types import S3Client
@@ -16,7 +17,7 @@ from filet.config.cache_db import SQL, Stage, store
 from filet.config.trino_client import TrinoDwhConfig
 from filet.core.create_schema import create_schema
 from filet.core.json.avro_schema_handler import eval_json
-from filet.core.json.utils import get_type
+from filet.core.json.utils import get_type, is_json_lines
 from filet.core.type_mapping import JsonType, TrinoAvroTypeMapping
 
 logger = logging.getLogger(__name__)
@@ -210,15 +211,24 @@ AND NOT EXISTS (
     return stage
 
 
-def stage_json(s3_client: S3Client, s3_source: S3Source, trino_dwh_config: TrinoDwhConfig):
+def stage_json(
+    s3_client: S3Client,
+    s3_source: S3Source,
+    trino_dwh_config: TrinoDwhConfig,
+    chunk_cache: Optional[ChunkCache] = None,
+):
     """Stage CSV files from S3 to local."""
     logger.debug("Trino DWH Config: %s", trino_dwh_config)
     schema = s3_source.Bucket.replace("-", "_").lower()
-    # first element
-    chunk_download = ChunkDownload(s3_client, s3_source)
-    # chunk_download.estimated_parts = 1
-    # chunk_download.chunk_size = chunk_download.estimated_size
-    first_part = chunk_download.get_part()
+    # sample head, middle and tail of the file
+    with ChunkDownload(s3_client, s3_source, chunk_cache=chunk_cache) as chunk_download:
+        json_sample = chunk_download.sample()
+        # only newline delimited json can be sampled at arbitrary offsets, a json document is evaluated from its start
+        # (a single slice is the head of the object already)
+        if is_json_lines(json_sample[0]) or len(json_sample) == 1:
+            first_part = b"".join(json_sample)
+        else:
+            first_part = chunk_download.get_part()
 
     # evaluate csv file header
     json_schema = eval_json(first_part)
@@ -1,5 +1,7 @@
 from typing import Tuple
 
+import orjson
+
 from filet.core.type_mapping import JsonType
 
 
@@ -28,3 +30,17 @@ def exists_in_items(items, item):
         or (isinstance(item, dict) and isinstance(array_item, dict) and item.get("name") == array_item.get("name"))
         for array_item in items
     )
+
+
+def is_json_lines(data: bytes) -> bool:
+    """Check whether data is newline delimited JSON (one object per line), judged by its first line.
+
+    >>> is_json_lines(b'{"id": 1}\\n{"id": 2}\\n')
+    True
+    >>> is_json_lines(b'[{"id": 1},\\n {"id": 2}]')
+    False
+    """
+    try:
+        return isinstance(orjson.loads(data.split(b"\n", 1)[0]), dict)
+    except orjson.JSONDecodeError:
+        return False
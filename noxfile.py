@@ -176,7 +176,7 @@ def tests(session: Session) -> None:
     session.run("pip", "install", "poetry")
     session.run("pip", "install", "poetry-plugin-export")
     session.run("poetry", "install")
-    session.install("coverage[toml]", "pytest", "pygments")
+    session.install("coverage[toml]", "pytest", "pygments", "moto[s3]")
     try:
         session.run("coverage", "run", "--parallel", "-m", "pytest", *session.posargs, env={"NOX_RUNNING": "True"})
     finally:
@@ -210,7 +210,7 @@ def typeguard(session: Session) -> None:
     session.run("pip", "install", "poetry")
     session.run("pip", "install", "poetry-plugin-export")
     session.run("poetry", "install")
-    session.install("pytest", "typeguard", "pygments")
+    session.install("pytest", "typeguard", "pygments", "moto[s3]")
     session.run("pytest", f"--typeguard-packages={package}", *session.posargs)
 
 
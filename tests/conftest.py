@@ -0,0 +1,61 @@
+"""Shared fixtures of the tests."""
+
+import gc
+import threading
+import time
+import warnings
+
+import boto3
+import pytest
+
+with warnings.catch_warnings():
+    # the async handler replaces the event loop policy on import, which drops the (unclosed) loop of the default
+    # policy; collect it here instead of in whichever test the garbage collector happens to run
+    warnings.simplefilter("ignore", ResourceWarning)
+    import filet.boto3.async_handler  # noqa: F401
+
+    gc.collect()
+
+TEST_BUCKET = "test-bucket"
+
+
+@pytest.fixture
+def s3_client():
+    """A boto3 S3 client of an in-memory S3 (moto) with the bucket ``TEST_BUCKET``."""
+    from moto import mock_aws
+
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=TEST_BUCKET)
+        yield client
+
+
+class ConcurrencyCountingClient:
+    """Wraps an S3 client and counts the calls of one method and the most calls that ran at once."""
+
+    def __init__(self, s3_client, method: str, delay: float = 0.01):
+        self.s3_client = s3_client
+        self.method = method
+        self.delay = delay
+        self.requests = 0
+        self.max_running = 0
+        self.__running = 0
+        self.__lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name != self.method:
+            return getattr(self.s3_client, name)
+
+        def call(**kwargs):
+            with self.__lock:
+                self.requests += 1
+                self.__running += 1
+                self.max_running = max(self.max_running, self.__running)
+            try:
+                time.sleep(self.delay)
+                return getattr(self.s3_client, name)(**kwargs)
+            finally:
+                with self.__lock:
+                    self.__running -= 1
+
+        return call
@@ -0,0 +1,78 @@
+"""Tests for the adaptive range size of ranged downloads."""
+
+import pytest
+
+from filet.boto3.adaptive_chunk_size import AdaptiveChunkSize
+from filet.boto3.chunk_download import ChunkDownload
+from filet.boto3.schema import S3Source
+from tests.conftest import TEST_BUCKET
+
+KIB = 1024
+MIB = 1024 * 1024
+
+
+class SimulatedNetwork(AdaptiveChunkSize):
+    """Records every request with the timing of a network of fixed latency and bandwidth."""
+
+    def __init__(self, latency: float, bandwidth: float, **kwargs):
+        super().__init__(**kwargs)
+        self.network = latency, bandwidth
+        self.sizes = []
+
+    def record(self, size: int, latency: float, transfer_time: float) -> None:
+        self.sizes.append(size)
+        super().record(size, self.network[0], size / self.network[1])
+
+
+def test_grows_with_bandwidth():
+    sizer = AdaptiveChunkSize(chunk_size=MIB, max_size=16 * MIB)
+    sizer.record(MIB, latency=0.05, transfer_time=0.01)  # 100 MiB/s, i.e. a target of 20 MiB
+    assert sizer.chunk_size == 2 * MIB  # at most max_step per measurement
+    for _ in range(10):
+        sizer.record(sizer.chunk_size, latency=0.05, transfer_time=sizer.chunk_size / (100 * MIB))
+    assert sizer.chunk_size == 16 * MIB
+
+
+def test_shrinks_with_latency():
+    sizer = AdaptiveChunkSize(chunk_size=4 * MIB, min_size=256 * KIB, max_step=4.0)
+    sizer.record(4 * MIB, latency=0.05, transfer_time=4.0)  # 1 MiB/s, i.e. a target of 200 KiB
+    assert sizer.chunk_size == MIB
+    sizer.record(MIB, latency=0.05, transfer_time=1.0)
+    assert sizer.chunk_size == 256 * KIB
+
+
+def test_converges_to_target():
+    sizer = AdaptiveChunkSize(chunk_size=64 * KIB, smoothing=1.0, latency_factor=4.0)
+    for _ in range(10):
+        sizer.record(sizer.chunk_size, latency=0.02, transfer_time=sizer.chunk_size / (10 * MIB))
+    assert sizer.chunk_size == int(10 * MIB * 0.02 * 4.0)
+    assert sizer.latency == pytest.approx(0.02) and sizer.bandwidth == pytest.approx(10 * MIB)
+
+
+def test_bounds():
+    assert AdaptiveChunkSize(chunk_size=1, min_size=KIB).chunk_size == KIB
+    assert AdaptiveChunkSize(chunk_size=64 * MIB, max_size=MIB).chunk_size == MIB
+    with pytest.raises(ValueError, match="Invalid chunk size bounds"):
+        AdaptiveChunkSize(min_size=MIB, max_size=KIB)
+    sizer = AdaptiveChunkSize(chunk_size=64 * KIB)
+    sizer.record(0, latency=0.05, transfer_time=0.0)  # without bandwidth there is nothing to adapt
+    assert sizer.chunk_size == 64 * KIB and sizer.bandwidth is None
+
+
+def test_chunk_download_part_sizes(s3_client):
+    data = bytes(range(256)) * 2048  # 512 KiB
+    s3_client.put_object(Bucket=TEST_BUCKET, Key="data/a.bin", Body=data)
+    s3_source = S3Source(Bucket=TEST_BUCKET, Key="data/a.bin", ChunkSize=16 * KIB)
+    sizer = SimulatedNetwork(latency=0.05, bandwidth=100 * MIB, chunk_size=4 * KIB, min_size=KIB)
+    parts = []
+    # one range at a time, so every range is sized by the measurement of the previous one
+    ChunkDownload(
+        s3_client, s3_source, parts.append, adaptive_chunk_size=sizer, limit_concurrency_count=1
+    ).run_until_complete()
+    assert b"".join(parts) == data
+    assert [len(part) for part in parts] == sizer.sizes == [4 * KIB * 2**i for i in range(7)] + [4 * KIB]
+    assert sizer.chunk_size == 1024 * KIB
+
+    # a shared instance carries the learned size over to the next download
+    chunk_download = ChunkDownload(s3_client, s3_source, adaptive_chunk_size=sizer, limit_concurrency_count=1)
+    assert len(chunk_download.get_part()) == len(data)
@@ -0,0 +1,72 @@
+"""Tests for the adaptive (AIMD) concurrency limiter."""
+
+import threading
+import time
+
+from botocore.exceptions import ClientError
+import pytest
+
+from filet.boto3.adaptive_limiter import AdaptiveConcurrencyLimiter
+
+SLOW_DOWN = ClientError({"Error": {"Code": "SlowDown"}, "ResponseMetadata": {"HTTPStatusCode": 503}}, "GetObject")
+
+
+def test_increases_while_latency_is_flat():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4, latency_tolerance=None)
+    for _ in range(100):
+        with limiter.slot():
+            pass
+    assert limiter.limit == 4
+    assert limiter.snapshot()["succeeded"] == 100
+
+
+def test_decreases_once_per_congestion():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, max_limit=8)
+    started = [limiter.acquire() for _ in range(4)]
+    for start in started:
+        limiter.release(start, SLOW_DOWN)
+    assert limiter.limit == 4
+    limiter.release(limiter.acquire(), SLOW_DOWN)
+    assert limiter.limit == 2
+    limiter.release(limiter.acquire(), ValueError("not throttling"))
+    assert limiter.limit == 2
+    assert limiter.snapshot()["throttled"] == 5
+
+
+def test_raises_and_counts_throttling():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+    with pytest.raises(ClientError):
+        with limiter.slot():
+            raise SLOW_DOWN
+    assert limiter.limit == 1 and limiter.snapshot()["in_flight"] == 0
+
+
+def test_latency_up_to_first_byte():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4, latency_tolerance=2.0)
+    for _ in range(3):
+        with limiter.slot() as timing:
+            timing.first_byte()
+    for _ in range(3):
+        with limiter.slot() as timing:
+            timing.first_byte()
+            time.sleep(0.02)  # reading a large body
+        with limiter.slot(latency=False):
+            time.sleep(0.02)  # uploading a large part
+    assert limiter.snapshot()["succeeded"] == 9
+    assert limiter.limit > 2
+
+
+def test_blocks_at_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+    started = limiter.acquire()
+    acquired = threading.Event()
+    threading.Thread(target=lambda: limiter.acquire() and acquired.set(), daemon=True).start()
+    time.sleep(0.05)
+    assert not acquired.is_set()
+    limiter.release(started)
+    assert acquired.wait(1)
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError):
+        AdaptiveConcurrencyLimiter(initial_limit=10, max_limit=5)
@@ -0,0 +1,40 @@
+"""Tests for the part buffer pool."""
+
+import threading
+import time
+
+import pytest
+
+from filet.boto3.buffer_pool import MemoryviewReader, PartBufferPool
+
+
+def test_pool_reuses_and_bounds_buffers():
+    pool = PartBufferPool(part_size=4, max_buffers=2)
+    first, second = pool.acquire(), pool.acquire()
+    assert first is not second and len(first) == len(second) == 4
+    acquired = []
+    thread = threading.Thread(target=lambda: acquired.append(pool.acquire()), daemon=True)
+    thread.start()
+    time.sleep(0.05)
+    assert not acquired
+    pool.release(first)
+    thread.join(1)
+    assert acquired == [first] and acquired[0] is first
+
+
+def test_invalid_pool():
+    with pytest.raises(ValueError):
+        PartBufferPool(part_size=0, max_buffers=1)
+
+
+def test_memoryview_reader():
+    buffer = bytearray(b"0123456789")
+    reader = MemoryviewReader(memoryview(buffer)[2:8])
+    assert len(reader) == 6
+    assert reader.read(4) == b"2345"
+    assert reader.read() == b"67"
+    assert reader.read() == b""
+    assert reader.seek(0, 2) == 6 and reader.tell() == 6
+    reader.seek(1)
+    buffer[3] = ord("x")  # no copy of the buffer
+    assert reader.read() == b"x4567"
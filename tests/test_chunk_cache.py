@@ -0,0 +1,66 @@
+"""Tests for the on-disk chunk cache."""
+
+import os
+
+from filet.boto3.chunk_cache import ChunkCache
+
+
+def test_get_put(tmp_path):
+    cache = ChunkCache(str(tmp_path), block_size=10)
+    assert cache.get("bucket", "key", '"etag"', 0, 9) is None
+    cache.put("bucket", "key", '"etag"', 0, 9, b"0123456789")
+    assert cache.get("bucket", "key", '"etag"', 0, 9) == b"0123456789"
+    assert cache.get("bucket", "key", '"etag"', 2, 5) == b"2345"
+    assert cache.get("bucket", "key", '"other"', 0, 9) is None
+
+    view = memoryview(bytearray(10))
+    assert cache.read_into(view, "bucket", "key", '"etag"', 0, 9)
+    assert bytes(view) == b"0123456789"
+    assert not cache.read_into(memoryview(bytearray(10)), "bucket", "key", '"etag"', 10, 19)
+
+
+def test_ranges_are_served_from_blocks(tmp_path):
+    data = os.urandom(45)
+    cache = ChunkCache(str(tmp_path), block_size=10)
+    assert cache.align(12, 25, size=len(data)) == (10, 29)
+    assert cache.align(31, 44, size=len(data)) == (30, 44)
+    # only the complete blocks of a range are cached: 10-19 and 20-29, not 5-9 and 30-32
+    cache.put("bucket", "key", "v1", 5, 32, data[5:33], size=len(data))
+    assert len(list(tmp_path.glob("??/*"))) == 2
+    assert cache.get("bucket", "key", "v1", 12, 27) == data[12:28]
+    assert cache.get("bucket", "key", "v1", 5, 27) is None
+    # the last block of the object is shorter
+    cache.put("bucket", "key", "v1", 30, 44, data[30:45], size=len(data))
+    assert cache.get("bucket", "key", "v1", 15, 44) == data[15:45]
+    view = memoryview(bytearray(20))
+    assert cache.read_into(view, "bucket", "key", "v1", 25, 44)
+    assert bytes(view) == data[25:45]
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ChunkCache(str(tmp_path), max_size=25, block_size=10)
+    for start in (0, 10):
+        cache.put("bucket", "key", "v1", start, start + 9, os.urandom(10))
+    path = next(tmp_path.glob("??/*"))
+    os.utime(path, (0, 0))  # make the first file the least recently used one
+    cache.put("bucket", "key", "v1", 20, 29, os.urandom(10))
+    assert len(list(tmp_path.glob("??/*"))) == 2
+    assert not path.exists()
+
+
+def test_overwrite_is_counted_once(tmp_path):
+    cache = ChunkCache(str(tmp_path), max_size=25, block_size=10)
+    for _ in range(3):
+        cache.put("bucket", "key", "v1", 0, 9, os.urandom(10))
+    assert cache.size == 10
+    cache.put("bucket", "key", "v1", 10, 19, os.urandom(10))
+    assert cache.size == 20
+    assert len(list(tmp_path.glob("??/*"))) == 2
+
+
+def test_reopen_and_clear(tmp_path):
+    ChunkCache(str(tmp_path)).put("bucket", "key", "v1", 0, 2, b"abc", size=3)
+    cache = ChunkCache(str(tmp_path))
+    assert cache.get("bucket", "key", "v1", 0, 2) == b"abc"
+    cache.clear()
+    assert cache.get("bucket", "key", "v1", 0, 2) is None
@@ -0,0 +1,81 @@
+"""Tests for the parallel ranged download of S3 objects."""
+
+import csv
+import gzip
+import io
+
+import pytest
+
+from filet.boto3.chunk_download import ChunkDownload
+from filet.boto3.schema import S3Source
+from tests.conftest import TEST_BUCKET, ConcurrencyCountingClient
+
+DATA = b"".join(b"%d,some line of text\n" % i for i in range(20000))
+
+
+def upload(s3_client, key: str, data: bytes) -> S3Source:
+    s3_client.put_object(Bucket=TEST_BUCKET, Key=key, Body=data)
+    return S3Source(Bucket=TEST_BUCKET, Key=key, ChunkSize=len(data) // 10 + 1)
+
+
+@pytest.mark.parametrize(
+    ("key", "data"), [("data/a.csv", DATA), ("data/a.csv.gz", gzip.compress(DATA))], ids=["plain", "gzip"]
+)
+def test_run_until_complete_in_order(s3_client, key, data):
+    client = ConcurrencyCountingClient(s3_client, "get_object")
+    parts = []
+    chunk_download = ChunkDownload(client, upload(s3_client, key, data), parts.append, limit_concurrency_count=4)
+    chunk_download.run_until_complete()
+    assert b"".join(parts) == DATA
+    assert client.requests == chunk_download.estimated_parts == 10
+    assert client.max_running > 1
+
+
+def test_iter_parts_and_read_into(s3_client):
+    client = ConcurrencyCountingClient(s3_client, "get_object")
+    s3_source = upload(s3_client, "data/a.csv", DATA)
+    with ChunkDownload(client, s3_source, limit_concurrency_count=4) as chunk_download:
+        first_part = chunk_download.get_part()
+        assert first_part == DATA[: s3_source.ChunkSize]
+        assert first_part + b"".join(chunk_download.iter_parts(prefetch=4)) == DATA
+    assert client.max_running > 1
+    with ChunkDownload(client, s3_source, limit_concurrency_count=4) as chunk_download:
+        assert bytes(chunk_download.read_into(use_mmap=True)) == DATA
+    assert client.requests == 20
+
+
+def test_sample_head_middle_and_tail(s3_client):
+    data = b"id,text\n" + DATA
+    with ChunkDownload(s3_client, upload(s3_client, "data/a.csv", data)) as chunk_download:
+        sample = chunk_download.sample(sample_size=4000, slices=4)
+        assert len(sample) == 4
+        assert sample[0].startswith(b"id,text\n0,some line")
+        assert data.endswith(sample[-1])
+        for slice_ in sample:
+            assert 900 < len(slice_) <= 1000 and slice_.endswith(b"\n")
+            assert b"\n" + slice_ in b"\n" + data  # complete lines
+        assert [len(slice_.splitlines()) for slice_ in chunk_download.sample(sample_size=4000, max_records=8)] == [
+            2,
+            2,
+            2,
+            2,
+        ]
+
+
+def test_sample_quoted_multi_line_csv(s3_client):
+    data = b"id,text\n" + b"".join(b'%d,"first line\n%d,second ""line""\n"\n' % (i, i) for i in range(5000))
+    with ChunkDownload(s3_client, upload(s3_client, "data/a.csv", data)) as chunk_download:
+        sample = chunk_download.sample(sample_size=4000, slices=4, quotechar=b'"')
+        assert sample[0].startswith(b"id,text\n")
+        sample[0] = sample[0][len(b"id,text\n") :]
+        for slice_ in sample:
+            rows = list(csv.reader(io.StringIO(slice_.decode())))
+            assert rows and all(text == f'first line\n{i},second "line"\n' for i, text in rows)
+        trimmed = chunk_download.sample(sample_size=4000, slices=4, quotechar=b'"', max_records=4)
+        assert [slice_.count(b"first line") for slice_ in trimmed] == [0, 1, 1, 1]  # the header is the first record
+
+
+def test_sample_compressed_head(s3_client):
+    with ChunkDownload(s3_client, upload(s3_client, "data/a.csv.gz", gzip.compress(DATA))) as chunk_download:
+        (head,) = chunk_download.sample(sample_size=4000, max_records=100)
+    assert DATA.startswith(head) and head.endswith(b"\n") and len(head.splitlines()) == 100
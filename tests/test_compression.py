@@ -0,0 +1,85 @@
+"""Tests for the streaming codec registry."""
+
+import gzip
+import os
+
+import pytest
+
+from filet.boto3.compression import compression_from_key, get_compressor, get_decompressor
+from filet.boto3.gzip_index import GzipIndexBuilder
+from filet.boto3.parallel_gzip import ParallelGzipCompressor
+from filet.boto3.schema import Compression
+
+CODEC_MODULES = {
+    Compression.gzip: "zlib",
+    Compression.zstd: "zstandard",
+    Compression.lz4: "lz4.frame",
+    Compression.snappy: "snappy",
+}
+
+
+def compress(compression: Compression, parts) -> bytes:
+    compressor = get_compressor(compression)
+    return b"".join(compressor.compress(part) for part in parts) + compressor.flush()
+
+
+def decompress(compression: Compression, data: bytes, chunk_size: int) -> bytes:
+    decompressor = get_decompressor(compression)
+    out = [decompressor.decompress(data[i : i + chunk_size]) for i in range(0, len(data), chunk_size)]
+    return b"".join(out) + decompressor.flush()
+
+
+@pytest.mark.parametrize("compression", list(CODEC_MODULES))
+def test_roundtrip_in_parts(compression):
+    pytest.importorskip(CODEC_MODULES[compression])
+    data = os.urandom(50000) + b"a,b,c\n" * 20000
+    compressed = compress(compression, [data[i : i + 7000] for i in range(0, len(data), 7000)])
+    assert decompress(compression, compressed, 999) == data
+
+
+@pytest.mark.parametrize("compression", [Compression.gzip, Compression.zstd, Compression.lz4])
+def test_concatenated_frames(compression):
+    pytest.importorskip(CODEC_MODULES[compression])
+    compressed = compress(compression, [b"first\n"]) + compress(compression, [b"second\n"])
+    assert decompress(compression, compressed, 5) == b"first\nsecond\n"
+
+
+def test_no_codec_for_uncompressed():
+    assert get_compressor(Compression.none) is None
+    assert get_decompressor(Compression.none) is None
+
+
+@pytest.mark.parametrize(
+    ("key", "compression", "expected"),
+    [
+        ("a/b.csv.gz", Compression.none, Compression.gzip),
+        ("a/b.json.zstd", Compression.none, Compression.zstd),
+        ("a/b.json.zst", Compression.none, Compression.zstd),
+        ("a/b.json.lz4", Compression.none, Compression.lz4),
+        ("a/b.csv", Compression.none, Compression.none),
+        ("a/b.csv", Compression.snappy, Compression.snappy),
+    ],
+)
+def test_compression_from_key(key, compression, expected):
+    assert compression_from_key(key, compression) == expected
+
+
+@pytest.mark.parametrize("multi_member", [False, True])
+@pytest.mark.parametrize("size", [0, 1, 64 * 1024, 300 * 1024 + 7])
+def test_parallel_gzip(multi_member, size):
+    data = b"".join(b"%d,name_%d\n" % (i, i % 13) for i in range(size // 8))[:size]
+    compressor = ParallelGzipCompressor(threads=3, block_size=64 * 1024, multi_member=multi_member)
+    compressed = b"".join(compressor.compress(data[i : i + 10000]) for i in range(0, len(data), 10000))
+    compressed += compressor.flush()
+    assert gzip.decompress(compressed) == data
+    decompressor = get_decompressor(Compression.gzip)
+    assert decompressor.decompress(compressed) + decompressor.flush() == data
+
+
+def test_parallel_gzip_is_indexable():
+    data = b"".join(b"%d,name_%d\n" % (i, i % 13) for i in range(200000))
+    compressor = get_compressor(Compression.gzip, threads=4)
+    compressed = compressor.compress(data) + compressor.flush()
+    builder = GzipIndexBuilder(span=256 * 1024)
+    builder.update(compressed)
+    assert builder.finalize().is_random_access
@@ -0,0 +1,99 @@
+"""Tests for the listing of S3 objects."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from filet.boto3 import fetch_s3_sources as fetch_s3_sources_module
+from filet.boto3.async_handler import AsyncHandler
+from filet.boto3.fetch_s3_sources import advance_watermark, fetch_s3_sources, iter_s3_sources
+from tests.conftest import TEST_BUCKET, ConcurrencyCountingClient
+
+KEYS = sorted(
+    [f"data/{prefix}/{day:02d}/part-{part}.csv" for prefix in "abc" for day in range(1, 4) for part in range(40)]
+    + [f"data/file-{part}.json" for part in range(30)]
+)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """Keep the watermarks of the test in memory instead of the cache store."""
+    store = SimpleNamespace(watermarks={}, save=lambda: None)
+    monkeypatch.setattr(fetch_s3_sources_module, "store", store)
+    return store
+
+
+@pytest.fixture
+def keys(s3_client):
+    for key in KEYS:
+        s3_client.put_object(Bucket=TEST_BUCKET, Key=key, Body=b"x")
+    return KEYS
+
+
+def test_lists_all_pages_concurrently(s3_client, keys):
+    client = ConcurrencyCountingClient(s3_client, "list_objects_v2")
+    s3_sources = fetch_s3_sources(
+        client, TEST_BUCKET, max_keys_per_prefix=7, prefix="data/", async_handler=AsyncHandler(8)
+    )
+    assert [s3_source.Key for s3_source in s3_sources] == keys
+    assert client.requests > len(keys) // 7
+    assert client.max_running > 1
+
+
+def test_iter_s3_sources_yields_pages(s3_client, keys):
+    batches = list(iter_s3_sources(s3_client, TEST_BUCKET, max_keys_per_prefix=7, max_pending_pages=2))
+    assert sorted(s3_source.Key for batch in batches for s3_source in batch) == keys
+    assert max(len(batch) for batch in batches) <= 7
+
+
+@pytest.mark.parametrize("key_ordered", [False, True])
+def test_incremental_listing(s3_client, keys, store, key_ordered):
+    def fetch_new():
+        s3_sources = fetch_s3_sources(s3_client, TEST_BUCKET, watermark="stage", key_ordered=key_ordered)
+        return [s3_source.Key for s3_source in s3_sources]
+
+    assert fetch_new() == keys  # without watermark, everything is new
+    advance_watermark("stage", fetch_s3_sources(s3_client, TEST_BUCKET, prefix="data/a/"))
+    assert store.watermarks["stage"].start_after == "data/a/03/part-9.csv"
+    new_keys = [key for key in keys if not key.startswith("data/a/")]
+    if key_ordered:
+        new_keys = [key for key in new_keys if key > "data/a/03/part-9.csv"]
+    assert fetch_new() == new_keys
+    advance_watermark("stage", fetch_s3_sources(s3_client, TEST_BUCKET))
+    assert fetch_new() == []
+    s3_client.put_object(Bucket=TEST_BUCKET, Key="data/z/01/part-0.csv", Body=b"x")
+    assert fetch_new() == ["data/z/01/part-0.csv"]
+
+
+@pytest.mark.parametrize("shard_alphabet", ["", "abcf"])
+def test_sharded_listing(s3_client, keys, shard_alphabet):
+    client = ConcurrencyCountingClient(s3_client, "list_objects_v2")
+    s3_sources = fetch_s3_sources(
+        client, TEST_BUCKET, prefix="data/", shards=4, shard_alphabet=shard_alphabet, async_handler=AsyncHandler(8)
+    )
+    assert [s3_source.Key for s3_source in s3_sources] == keys
+    assert client.max_running > 1
+    sharded = fetch_s3_sources(s3_client, TEST_BUCKET, prefix="data/b/", shards=3, max_keys_per_prefix=7)
+    assert [s3_source.Key for s3_source in sharded] == [key for key in keys if key.startswith("data/b/")]
+
+
+@pytest.mark.parametrize(
+    ("error", "raised"),
+    [
+        (ValueError("listing failed"), ValueError),
+        pytest.param(
+            SystemExit(),
+            RuntimeError,
+            marks=pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning"),
+        ),
+    ],
+)
+def test_iter_s3_sources_listing_error(s3_client, monkeypatch, error, raised):
+    async def list_objects(*args, on_page, **kwargs):
+        on_page([])
+        raise error
+
+    monkeypatch.setattr(fetch_s3_sources_module, "list_objects", list_objects)
+    # errors are raised again in the consumer, anything else ends the producer thread without hanging the consumer
+    with pytest.raises(raised):
+        list(iter_s3_sources(s3_client, TEST_BUCKET))
@@ -0,0 +1,131 @@
+"""Tests for the streaming GPG decryption of S3 objects."""
+
+import subprocess
+import threading
+
+import gnupg
+import pytest
+
+from filet.boto3 import gpg_stream
+from filet.boto3.chunk_download import ChunkDownload
+from filet.boto3.gpg_stream import GPGStreamDecryptor, import_keyring_once
+from filet.boto3.schema import Encryption, S3Source, S3SourceExtra
+from tests.conftest import TEST_BUCKET
+
+DATA = b"".join(b"%d,some line of text\n" % i for i in range(20000))
+PASSPHRASE = "secret"
+
+
+def kill_agent(gpg_home: str) -> None:
+    subprocess.run(["gpgconf", "--homedir", gpg_home, "--kill", "gpg-agent"], check=False)
+
+
+@pytest.fixture(scope="module")
+def gpg_key(tmp_path_factory):
+    """A GPG home with a throwaway key, the fingerprint and the ciphertext of ``DATA``."""
+    gpg_home = str(tmp_path_factory.mktemp("gnupg"))
+    gpg = gnupg.GPG(gnupghome=gpg_home)
+    key_input = gpg.gen_key_input(
+        key_type="EDDSA",
+        key_curve="ed25519",
+        subkey_type="ECDH",
+        subkey_curve="cv25519",
+        name_email="test@example.com",
+        passphrase=PASSPHRASE,
+    )
+    fingerprint = gpg.gen_key(key_input).fingerprint
+    ciphertext = gpg.encrypt(DATA, fingerprint, armor=False, always_trust=True).data
+    yield gpg_home, fingerprint, ciphertext
+    kill_agent(gpg_home)
+
+
+def upload(s3_client, gpg_home: str, ciphertext: bytes) -> S3Source:
+    s3_client.put_object(Bucket=TEST_BUCKET, Key="data/a.csv.gpg", Body=ciphertext)
+    return S3Source(
+        Bucket=TEST_BUCKET,
+        Key="data/a.csv.gpg",
+        ObjectEncryption=Encryption.gpg,
+        Extra=S3SourceExtra(GPGHome=gpg_home, Passphrase=PASSPHRASE),
+        ChunkSize=len(ciphertext) // 5 + 1,
+    )
+
+
+@pytest.fixture
+def decryptors(monkeypatch):
+    """The streaming decryptors started by the downloads of the test."""
+    decryptors = []
+    new_decrypt_stream = ChunkDownload.new_decrypt_stream
+
+    def record(self):
+        decryptors.append(new_decrypt_stream(self))
+        return decryptors[-1]
+
+    monkeypatch.setattr(ChunkDownload, "new_decrypt_stream", record)
+    return decryptors
+
+
+def threads() -> set:
+    """The running threads, except for the (idle) thread pools of the downloads."""
+    return {thread for thread in threading.enumerate() if not thread.name.startswith(ChunkDownload.__name__)}
+
+
+def assert_released(decryptor: GPGStreamDecryptor) -> None:
+    assert decryptor.process.poll() is not None
+    assert decryptor.process.stdout.closed and decryptor.process.stderr.closed
+
+
+def test_decrypt_parts(s3_client, gpg_key, decryptors):
+    gpg_home, _, ciphertext = gpg_key
+    s3_source = upload(s3_client, gpg_home, ciphertext)
+    with ChunkDownload(s3_client, s3_source, limit_concurrency_count=4) as chunk_download:
+        assert chunk_download.estimated_parts == 5
+        assert b"".join(chunk_download.iter_parts(prefetch=2)) == DATA
+    parts = []
+    ChunkDownload(s3_client, s3_source, parts.append, limit_concurrency_count=4).run_until_complete()
+    assert b"".join(parts) == DATA
+    assert len(decryptors) == 2
+    for decryptor in decryptors:
+        assert_released(decryptor)
+
+
+def test_close_partially_consumed(s3_client, gpg_key, decryptors):
+    gpg_home, _, ciphertext = gpg_key
+    running = threads()
+    with ChunkDownload(s3_client, upload(s3_client, gpg_home, ciphertext), limit_concurrency_count=4) as download:
+        parts = download.iter_parts()
+        next(parts)
+        assert decryptors and decryptors[0].process.poll() is None
+    assert_released(decryptors[0])
+    parts.close()
+
+    decryptor = GPGStreamDecryptor(gpg_home=gpg_home, passphrase=PASSPHRASE)
+    decryptor.update(ciphertext[: len(ciphertext) // 2])
+    decryptor.close()
+    decryptor.close()
+    assert_released(decryptor)
+    assert threads() == running
+
+
+def test_import_keyring_once(tmp_path, gpg_key, monkeypatch):
+    gpg_home, fingerprint, ciphertext = gpg_key
+    keyring = tmp_path / "keyring.asc"
+    keyring.write_text(gnupg.GPG(gnupghome=gpg_home).export_keys(fingerprint, secret=True, passphrase=PASSPHRASE))
+    imports = []
+    import_keys = gnupg.GPG.import_keys
+    monkeypatch.setattr(
+        gnupg.GPG,
+        "import_keys",
+        lambda self, *args, **kwargs: imports.append(args) or import_keys(self, *args, **kwargs),
+    )
+    monkeypatch.setattr(gpg_stream, "_imported_keyrings", set())
+
+    other_home = tmp_path / "gnupg"
+    other_home.mkdir(mode=0o700)
+    try:
+        for _ in range(2):
+            with GPGStreamDecryptor(str(other_home), PASSPHRASE, keyring_file_path=str(keyring)) as decryptor:
+                assert decryptor.update(ciphertext) + decryptor.finalize() == DATA
+        import_keyring_once(str(other_home), "")
+        assert len(imports) == 1
+    finally:
+        kill_agent(str(other_home))
@@ -0,0 +1,86 @@
+"""Tests for the random-access gzip index."""
+
+import gzip
+import zlib
+
+import pytest
+
+from filet.boto3.gzip_index import GzipIndexBuilder, decompress_segment, parse_gzip_header
+
+DATA = b"".join(b"%d,name_%d,%d.5\n" % (i, i % 97, i * 3) for i in range(200000))
+SPAN = 256 * 1024
+
+
+def build_index(compressed: bytes, part_size: int = 10000):
+    builder = GzipIndexBuilder(span=SPAN)
+    for i in range(0, len(compressed), part_size):
+        builder.update(compressed[i : i + part_size])
+    return builder.finalize()
+
+
+def decompress_indexed(compressed: bytes, index) -> bytes:
+    return b"".join(
+        decompress_segment(compressed[checkpoint.compressed_offset : end], checkpoint)
+        for checkpoint, end, _ in index.segments()
+    )
+
+
+def sync_flushed_gzip(data: bytes, block_size: int = 64 * 1024) -> bytes:
+    compress_obj = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    blocks = []
+    for i in range(0, len(data), block_size):
+        blocks.append(compress_obj.compress(data[i : i + block_size]))
+        blocks.append(compress_obj.flush(zlib.Z_SYNC_FLUSH))
+    return b"".join(blocks) + compress_obj.flush()
+
+
+def test_single_member_without_flush_points():
+    compressed = gzip.compress(DATA)
+    index = build_index(compressed)
+    assert index.members == 1
+    assert not index.is_random_access
+    assert decompress_indexed(compressed, index) == DATA
+
+
+def test_multi_member():
+    compressed = b"".join(gzip.compress(DATA[i : i + SPAN]) for i in range(0, len(DATA), SPAN))
+    index = build_index(compressed)
+    assert index.members > 1
+    assert index.is_random_access
+    assert all(checkpoint.member_start for checkpoint in index.checkpoints)
+    assert decompress_indexed(compressed, index) == DATA
+
+
+@pytest.mark.parametrize("part_size", [3, 1000, 100000])
+def test_sync_flush_points(part_size):
+    compressed = sync_flushed_gzip(DATA)
+    index = build_index(compressed, part_size)
+    assert index.members == 1
+    assert index.is_random_access
+    assert not index.checkpoints[-1].member_start
+    assert index.uncompressed_size == len(DATA)
+    assert decompress_indexed(compressed, index) == DATA
+
+
+def test_start_at_offset():
+    compressed = sync_flushed_gzip(DATA)
+    index = build_index(compressed)
+    offset = len(DATA) // 2
+    position = index.find(offset)
+    checkpoint, end, uncompressed_end = index.segments()[position]
+    assert checkpoint.uncompressed_offset <= offset < uncompressed_end
+    segment = decompress_segment(compressed[checkpoint.compressed_offset : end], checkpoint)
+    assert segment[offset - checkpoint.uncompressed_offset :] == DATA[offset:uncompressed_end]
+
+
+def test_truncated_stream():
+    with pytest.raises(ValueError, match="Truncated"):
+        build_index(gzip.compress(DATA)[:-100])
+
+
+def test_parse_bgzf_header():
+    header = b"\x1f\x8b\x08\x04" + b"\x00" * 6 + b"\x06\x00BC\x02\x00\x1b\x00"
+    assert parse_gzip_header(header) == (18, True)
+    assert parse_gzip_header(header[:12]) is None
+    with pytest.raises(ValueError):
+        parse_gzip_header(b"not a gzip member")
@@ -0,0 +1,14 @@
+"""Tests for the persistent gzip index cache."""
+
+from filet.boto3.gzip_index import GzipCheckpoint, GzipIndex
+from filet.boto3.gzip_index_cache import GzipIndexCache
+
+
+def test_index_is_cached_per_etag(tmp_path):
+    cache = GzipIndexCache(str(tmp_path / "cache.db"))
+    index = GzipIndex(etag='"1"', checkpoints=[GzipCheckpoint(0, 0), GzipCheckpoint(10, 100, False, b"w" * 10)])
+    assert cache.get("bucket", "data/a.csv.gz", '"1"') is None
+    cache.put("bucket", "data/a.csv.gz", index)
+    assert GzipIndexCache(str(tmp_path / "cache.db")).get("bucket", "data/a.csv.gz", '"1"') == index
+    assert cache.get("bucket", "data/a.csv.gz", '"2"') is None
+    assert cache.get("bucket", "data/b.csv.gz", '"1"') is None
@@ -0,0 +1,96 @@
+"""Tests for reading S3 Inventory reports."""
+
+import gzip
+import hashlib
+import json
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from filet.boto3.inventory import InventoryReader
+
+CSV_SCHEMA = "Bucket, Key, Size, LastModifiedDate, ETag, StorageClass, IsDeleteMarker"
+
+
+def write_report(tmp_path, file_format, files, **manifest):
+    """Write an inventory report like S3 delivers it (``<bucket>/<config>/<date>/manifest.json`` and ``data/``)."""
+    config = tmp_path / "bucket" / "config"
+    (config / "data").mkdir(parents=True)
+    entries = []
+    for name, content in files.items():
+        (config / "data" / name).write_bytes(content)
+        entries.append(
+            {"key": f"bucket/config/data/{name}", "size": len(content), "MD5checksum": hashlib.md5(content).hexdigest()}
+        )
+    (config / "2024-01-02T01-00Z").mkdir()
+    manifest_path = config / "2024-01-02T01-00Z" / "manifest.json"
+    manifest_path.write_text(
+        json.dumps(
+            {
+                "sourceBucket": "bucket",
+                "destinationBucket": "arn:aws:s3:::inventory",
+                "fileFormat": file_format,
+                "fileSchema": CSV_SCHEMA,
+                "files": entries,
+                **manifest,
+            }
+        )
+    )
+    return str(manifest_path)
+
+
+def csv_file(*rows):
+    return gzip.compress("".join(",".join(f'"{value}"' for value in row) + "\n" for row in rows).encode())
+
+
+def test_csv_report(tmp_path):
+    manifest = write_report(
+        tmp_path,
+        "CSV",
+        {
+            "1.csv.gz": csv_file(
+                ("bucket", "data/2024-01-01%2Fa+b.csv", "10", "2024-01-01T00:00:00.000Z", "e1", "STANDARD", "false"),
+                ("bucket", "data/deleted.csv", "", "2024-01-01T00:00:00.000Z", "", "", "true"),
+            ),
+            "2.csv.gz": csv_file(
+                ("bucket", "other/b.csv", "20", "2024-01-01T00:00:00.000Z", "e2", "STANDARD", "false"),
+            ),
+            "3.csv.gz": csv_file(),
+        },
+    )
+    batches = list(InventoryReader(manifest, max_workers=2).iter_objects(prefix="data/"))
+    assert [[obj.Key for obj in batch] for batch in batches] == [["data/2024-01-01/a b.csv"], [], []]
+    obj = batches[0][0]
+    assert (obj.Size, obj.ETag, obj.StorageClass, obj.LastModified.year) == (10, '"e1"', "STANDARD", 2024)
+
+
+def test_parquet_report(tmp_path):
+    table = pa.table(
+        {
+            "bucket": ["bucket", "bucket"],
+            "key": ["data/a b.parquet", "data/b.parquet"],
+            "size": [1, 2],
+            "last_modified_date": pa.array([1704067200000, 1704067200000], pa.timestamp("ms", tz="UTC")),
+            "e_tag": ["e1", "e2"],
+            "storage_class": ["STANDARD", None],
+        }
+    )
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink)
+    manifest = write_report(tmp_path, "Parquet", {"1.parquet": sink.getvalue().to_pybytes()})
+    (objects,) = InventoryReader(manifest).iter_objects()
+    assert [(obj.Key, obj.Size, obj.ETag, obj.StorageClass) for obj in objects] == [
+        ("data/a b.parquet", 1, '"e1"', "STANDARD"),
+        ("data/b.parquet", 2, '"e2"', ""),
+    ]
+
+
+def test_checksum_mismatch(tmp_path):
+    manifest = write_report(tmp_path, "CSV", {"1.csv.gz": csv_file()})
+    data = json.loads(Path(manifest).read_text())
+    data["files"][0]["MD5checksum"] = "0" * 32
+    Path(manifest).write_text(json.dumps(data))
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        list(InventoryReader(manifest).iter_objects())
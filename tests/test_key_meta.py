@@ -0,0 +1,56 @@
+"""Tests for the extraction of the key meta."""
+
+from datetime import datetime
+
+import pytest
+
+from filet.boto3.schema import Compression, Encryption, Format, ListObjectsV2Content, ListObjectsV2Result
+from filet.boto3.utils import KeyMetaExtractor, extract_file_meta, validate_date
+from filet.config.objects_pattern import ObjectsPattern
+
+
+def test_extract_file_meta():
+    objects = ListObjectsV2Result(
+        Name="bucket",
+        Contents=[
+            ListObjectsV2Content(Key="data/2024-01-02_03:04:05/part-00001 (1).csv.gz.gpg"),
+            ListObjectsV2Content(Key="data/20241350/file.json"),
+            ListObjectsV2Content(Key="data/file"),
+        ],
+    )
+    dated, invalid_date, plain = extract_file_meta(objects, ObjectsPattern())
+    assert (dated.DateStr, dated.DateFormat, dated.FileDate) == (
+        "2024-01-02_03:04:05",
+        "%Y-%m-%d_%H:%M:%S",
+        datetime(2024, 1, 2, 3, 4, 5),
+    )
+    assert dated.KeyPattern == "data/<Y-m-d_H:M:S>/<part><space><o_bracket>1<c_bracket>.csv.gz.gpg"
+    assert (dated.ObjectEncryption, dated.ObjectCompression, dated.ObjectFormat) == (
+        Encryption.gpg,
+        Compression.gzip,
+        Format.csv,
+    )
+    assert dated.ObjectBaseName == "data/2024-01-02_03:04:05/part-00001 (1)"
+    assert dated.Prefix == "data/2024-01-02_03:04:05"
+    assert (invalid_date.DateStr, invalid_date.KeyPattern, invalid_date.ObjectFormat) == ("", "", Format.json)
+    assert (plain.KeyPattern, plain.ObjectSuffix, plain.Prefix) == ("data/file", "", "")
+
+
+def first_matching_format(date_str, date_formats):
+    """The date of the first format that parses the date string (without memo)."""
+    for date_format in date_formats:
+        if file_date := validate_date(date_str, date_format):
+            return file_date, date_format
+    return None
+
+
+@pytest.mark.parametrize("date_formats", [("%d%m%Y", "%Y%m%d"), ("%Y%m%d", "%d%m%Y"), ObjectsPattern().date_formats])
+def test_memoized_date_format(date_formats):
+    date_strs = ["20240102", "20121010", "20240103", "02012024", "99999999", "2024-01-02", "20240102_101010"]
+    for order in (date_strs, date_strs[::-1]):
+        extractor = KeyMetaExtractor(ObjectsPattern(date_formats=date_formats))
+        for date_str in order:
+            assert extractor.parse_date(date_str) == first_matching_format(date_str, date_formats), date_str
+    extractor = KeyMetaExtractor(ObjectsPattern(date_formats=("%d%m%Y", "%Y%m%d")))
+    assert extractor.parse_date("20240102") == (datetime(2024, 1, 2), "%Y%m%d")
+    assert extractor.parse_date("20121010") == (datetime(1010, 12, 20), "%d%m%Y")
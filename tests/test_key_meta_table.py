@@ -0,0 +1,61 @@
+"""Tests for the bulk extraction of the key meta."""
+
+import pandas as pd
+import pyarrow as pa
+
+from filet.boto3.key_meta_table import extract_file_meta_bulk
+from filet.boto3.schema import Compression, ListObjectsV2Content, ListObjectsV2Result
+from filet.boto3.utils import extract_file_meta
+from filet.config.objects_pattern import ObjectsPattern
+
+KEYS = [
+    "data/2024-01-02_03:04:05/part-00001 (1).csv.gz.gpg",
+    "data/2024-01-02_25:00:00/2024-01-03.json",
+    "data/20241350/file.parquet",
+    "data/part-1/part-2.csv",
+    "data/file",
+    "data/a?b.csv",
+    "data/é/2024-01-02.csv",
+    "bucket/file.gz",
+    "file.gpg",
+    "data/",
+    "nan",
+    "",
+]
+
+
+def assert_same_meta(keys, objects_pattern):
+    objects = ListObjectsV2Result(Name="bucket", Contents=[ListObjectsV2Content(Key=key) for key in keys])
+    expected = extract_file_meta(objects, objects_pattern)
+    s3_sources = extract_file_meta_bulk(pa.array(keys), objects_pattern, bucket="bucket")
+    assert len(s3_sources) == len(keys)
+    for expected_source, s3_source in zip(expected, s3_sources):
+        exclude = {"LastModified"} if expected_source.DateFormat else {"LastModified", "FileDate"}
+        assert s3_source.model_dump(exclude=exclude) == expected_source.model_dump(exclude=exclude)
+
+
+def test_same_meta_as_extract_file_meta():
+    assert_same_meta(KEYS, ObjectsPattern())
+
+
+def test_dot_components_and_date_formats():
+    # the last component of these keys ends as "." once the suffix is split off, the per key fallback handles them
+    keys = ["x.csv/..gpg", ".json.json/..zstd", "%.zst.gz/..gz", "a/..", "data/20240102/a.csv", "data/20121010/a.csv"]
+    assert_same_meta(keys, ObjectsPattern())
+    assert_same_meta(keys, ObjectsPattern(date_formats=("%d%m%Y", "%Y%m%d")))
+
+
+def test_patterns_without_kernel_support():
+    # lookbehind (not supported by RE2) and capture groups are extracted per key
+    assert_same_meta(KEYS, ObjectsPattern(date_regex_patterns=(r"(?<=/)\d{4}-\d{2}-\d{2}",)))
+    assert_same_meta(KEYS, ObjectsPattern(extra_regex_patterns={"part": [r"part-(\d+)"]}))
+
+
+def test_frame():
+    objects = pd.DataFrame({"Key": ["data/2024-01-02.csv.gz", "data/b.csv"], "Size": [1, 2]})
+    s3_sources = extract_file_meta_bulk(objects, bucket="bucket")
+    assert s3_sources.table.column("KeyPattern").to_pylist() == ["data/<Y-m-d>.csv.gz", "data/b.csv"]
+    assert s3_sources[0].ObjectCompression == Compression.gzip
+    assert (s3_sources[-1].Key, s3_sources[-1].Size, s3_sources[-1].Bucket) == ("data/b.csv", 2, "bucket")
+    assert [s3_source.Key for s3_source in s3_sources[1:]] == ["data/b.csv"]
+    assert list(s3_sources.to_pandas()["Size"]) == [1, 2]
@@ -0,0 +1,58 @@
+"""Tests for the persistent listing cache."""
+
+from filet.boto3.listing_cache import ListingCache
+
+
+class CountingClient:
+    def __init__(self, contents):
+        self.contents = contents
+        self.calls = 0
+
+    def list_objects_v2(self, **kwargs):
+        self.calls += 1
+        return {"Contents": self.contents, "ResponseMetadata": {"HTTPStatusCode": 200}}
+
+
+def test_list_objects_v2_is_cached(tmp_path):
+    cache = ListingCache(str(tmp_path / "cache.db"))
+    client = CountingClient([{"Key": "data/a.csv", "ETag": '"1"'}])
+    page = cache.list_objects_v2(client, Bucket="bucket", Prefix="data/", Delimiter="/")
+    assert cache.list_objects_v2(client, Bucket="bucket", Prefix="data/", Delimiter="/") == page
+    assert client.calls == 1
+    assert "ResponseMetadata" not in page
+    cache.list_objects_v2(client, refresh=True, Bucket="bucket", Prefix="data/", Delimiter="/")
+    cache.list_objects_v2(client, Bucket="bucket", Prefix="data/", Delimiter="/", StartAfter="data/a.csv")
+    assert client.calls == 3
+
+
+def test_expired_pages(tmp_path):
+    cache = ListingCache(str(tmp_path / "cache.db"), ttl=-1)
+    cache.put({"Contents": []}, Bucket="bucket", Prefix="data/")
+    assert cache.get(Bucket="bucket", Prefix="data/") is None
+    cache.put({"Contents": []}, Bucket="bucket", Prefix="data/")
+    assert cache.prune() == 1
+
+
+def test_invalidate(tmp_path):
+    cache = ListingCache(str(tmp_path / "cache.db"))
+    cache.put({"Contents": [{"Key": "data/a.csv", "ETag": '"1"'}]}, Bucket="bucket", Prefix="data/")
+    cache.put({"Contents": []}, Bucket="bucket", Prefix="other/")
+    assert cache.invalidate("bucket", "data/a.csv", etag='"1"') == 0
+    assert cache.invalidate("bucket", "data/a.csv", etag='"2"') == 1
+    assert cache.get(Bucket="bucket", Prefix="data/") is None
+    assert cache.get(Bucket="bucket", Prefix="other/") == {"Contents": []}
+    assert cache.invalidate("bucket") == 1
+
+
+def test_invalidate_uses_the_index(tmp_path):
+    cache = ListingCache(str(tmp_path / "cache.db"))
+    for prefix in ("", "da", "data/", "data/x/", "other/"):
+        cache.put({"Contents": []}, Bucket="bucket", Prefix=prefix)
+        cache.put({"Contents": []}, Bucket="bucket", Prefix=prefix, StartAfter=f"{prefix}a")
+    cache.put({"Contents": []}, Bucket="other", Prefix="data/")
+    assert cache.invalidate("bucket", "data/a.csv") == 6
+    assert cache.index["bucket"] == {"data/x/", "other/"}
+    assert cache.invalidate("bucket", "data/a.csv") == 0
+    assert cache.invalidate("bucket") == 4
+    assert "bucket" not in cache.index
+    assert cache.get(Bucket="other", Prefix="data/") == {"Contents": []}
@@ -0,0 +1,149 @@
+"""Tests for the multipart upload of S3 objects."""
+
+import gzip
+import random
+
+import pytest
+
+from filet.boto3 import multipart_upload
+from filet.boto3.listing_cache import ListingCache
+from filet.boto3.multipart_upload import MultipartUpload
+from filet.boto3.schema import Compression, S3Source
+from filet.boto3.upload_state_store import UploadStateStore
+from tests.conftest import TEST_BUCKET, ConcurrencyCountingClient
+
+PART_SIZE = 5 * 1024 * 1024
+DATA = b"".join(b"%d,some line of text\n" % i for i in range(800000))  # about 3.5 parts
+
+
+@pytest.fixture(autouse=True)
+def listing_cache(tmp_path, monkeypatch):
+    """Invalidate a listing cache of the test instead of the one of the cache database."""
+    cache = ListingCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(multipart_upload, "listing_cache", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def upload_states(tmp_path, monkeypatch):
+    """Persist the upload states of the test instead of the ones of the cache database."""
+    upload_states = UploadStateStore(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(multipart_upload, "upload_states", upload_states)
+    return upload_states
+
+
+def write(uploader: MultipartUpload, data: bytes, write_size: int = 1024 * 1024) -> None:
+    for start in range(0, len(data), write_size):
+        uploader.upload_part(data[start : start + write_size])
+    uploader.complete()
+
+
+def read(s3_client, key: str) -> bytes:
+    return s3_client.get_object(Bucket=TEST_BUCKET, Key=key)["Body"].read()
+
+
+@pytest.mark.parametrize("max_in_flight_parts", [0, 2])
+def test_parts_in_flight_are_bounded(s3_client, max_in_flight_parts):
+    client = ConcurrencyCountingClient(s3_client, "upload_part", delay=0.05)
+    uploader = MultipartUpload(
+        client,
+        S3Source(Bucket=TEST_BUCKET, Key="data/a.csv"),
+        chunk_size=PART_SIZE,
+        max_in_flight_parts=max_in_flight_parts,
+    )
+    write(uploader, DATA)
+    assert read(s3_client, "data/a.csv") == DATA
+    assert client.requests == uploader.part_counter == len(DATA) // PART_SIZE + 1
+    assert client.max_running == max(1, max_in_flight_parts)
+
+
+def test_compressed_parts_in_flight(s3_client):
+    data = random.Random(0).randbytes(3 * PART_SIZE)  # incompressible, i.e. about three compressed parts
+    client = ConcurrencyCountingClient(s3_client, "upload_part")
+    uploader = MultipartUpload(
+        client, S3Source(Bucket=TEST_BUCKET, Key="data/a.bin.gz"), chunk_size=PART_SIZE, max_in_flight_parts=2
+    )
+    write(uploader, data)
+    assert gzip.decompress(read(s3_client, "data/a.bin.gz")) == data
+    assert client.requests == uploader.part_counter >= 3
+    assert not s3_client.list_multipart_uploads(Bucket=TEST_BUCKET).get("Uploads")
+
+
+@pytest.mark.parametrize(
+    ("key", "compression", "expected"),
+    [
+        ("out/a.csv", Compression.none, "out/a.csv"),
+        ("out/a.csv", Compression.zstd, "out/a.csv.zstd"),
+        ("out/a.csv.zst", Compression.none, "out/a.csv.zst"),
+        ("out/a.csv.zst", Compression.zstd, "out/a.csv.zst"),
+        ("out/a.csv.zstd", Compression.zstd, "out/a.csv.zstd"),
+    ],
+)
+def test_compression_suffix(s3_client, key, compression, expected):
+    pytest.importorskip("zstandard")
+    uploader = MultipartUpload(s3_client, S3Source(Bucket=TEST_BUCKET, Key=key, ObjectCompression=compression))
+    write(uploader, b"some line of text\n")
+    assert uploader.Key == expected
+    assert [obj["Key"] for obj in s3_client.list_objects_v2(Bucket=TEST_BUCKET)["Contents"]] == [expected]
+
+
+class InterruptedClient:
+    """Wraps an S3 client whose part uploads fail (not retryable) from the given part on."""
+
+    def __init__(self, s3_client, fail_from: int):
+        self.s3_client = s3_client
+        self.fail_from = fail_from
+
+    def __getattr__(self, name):
+        return getattr(self.s3_client, name)
+
+    def upload_part(self, **kwargs):
+        if kwargs["PartNumber"] >= self.fail_from:
+            raise ValueError("interrupted")
+        return self.s3_client.upload_part(**kwargs)
+
+
+@pytest.mark.parametrize("key", ["data/a.csv", "data/a.csv.gz"])
+def test_resume_interrupted_upload(s3_client, upload_states, key):
+    s3_source = S3Source(Bucket=TEST_BUCKET, Key=key)
+    uploader = MultipartUpload(InterruptedClient(s3_client, 3), s3_source, chunk_size=PART_SIZE, resumable=True)
+    data = random.Random(0).randbytes(4 * PART_SIZE)
+    with pytest.raises(ValueError, match="interrupted"):
+        write(uploader, data)
+    assert sorted(upload_states.get(uploader.state_key).parts) == [1, 2]
+
+    resumed = MultipartUpload(s3_client, S3Source(Bucket=TEST_BUCKET, Key=key), chunk_size=PART_SIZE, resumable=True)
+    assert resumed.part_counter == 2
+    assert resumed.resume_offset == upload_states.get(uploader.state_key).parts[2].source_offset > 0
+    write(resumed, data[resumed.resume_offset :])
+    content = read(s3_client, uploader.Key)
+    assert (gzip.decompress(content) if key.endswith(".gz") else content) == data
+    assert upload_states.get(uploader.state_key) is None
+    assert not s3_client.list_multipart_uploads(Bucket=TEST_BUCKET).get("Uploads")
+
+
+def test_copy_parts(s3_client):
+    sources = {"a.bin": random.Random(1).randbytes(PART_SIZE + 100), "b.bin": b"short", "c.bin": b"x" * PART_SIZE}
+    for key, content in sources.items():
+        s3_client.put_object(Bucket=TEST_BUCKET, Key=f"in/{key}", Body=content)
+    client = ConcurrencyCountingClient(s3_client, "upload_part_copy", delay=0)
+
+    uploader = MultipartUpload(client, S3Source(Bucket=TEST_BUCKET, Key="out/copy.bin"), chunk_size=PART_SIZE)
+    uploader.copy_part(S3Source(Bucket=TEST_BUCKET, Key="in/a.bin"))
+    uploader.complete()  # a single whole object is copied with copy_object
+    assert read(s3_client, "out/copy.bin") == sources["a.bin"] and client.requests == 0
+
+    uploader = MultipartUpload(client, S3Source(Bucket=TEST_BUCKET, Key="out/concat.bin"), chunk_size=PART_SIZE)
+    for key in ("a.bin", "c.bin", "b.bin"):
+        uploader.copy_part(S3Source(Bucket=TEST_BUCKET, Key=f"in/{key}"))
+    uploader.copy_part(S3Source(Bucket=TEST_BUCKET, Key="in/c.bin"), start=10, end=20)
+    uploader.complete()  # a and c are copied server-side, b and the range are downloaded into the last part
+    assert read(s3_client, "out/concat.bin") == sources["a.bin"] + sources["c.bin"] + b"short" + b"x" * 10
+    assert client.requests == 2
+
+    uploader = MultipartUpload(client, S3Source(Bucket=TEST_BUCKET, Key="out/header.bin"), chunk_size=PART_SIZE)
+    uploader.upload_part(b"header,")
+    uploader.copy_part(S3Source(Bucket=TEST_BUCKET, Key="in/a.bin"))
+    uploader.complete()  # the buffered header is filled up to a part with the start of a
+    assert read(s3_client, "out/header.bin") == b"header," + sources["a.bin"]
+    assert not s3_client.list_multipart_uploads(Bucket=TEST_BUCKET).get("Uploads")
@@ -0,0 +1,84 @@
+"""Tests for the record boundary aware splitters."""
+
+import csv
+import io
+import json
+
+import orjson
+import pytest
+
+from filet.boto3.record_splitter import CsvRecordSplitter, JsonRecordSplitter
+
+ROWS = [["id", "text", "value"]] + [
+    [str(i), f'line {i}\nwith "quotes", commas and \\ backslashes' if i % 3 else f"plain {i}", f"{i}.5"]
+    for i in range(300)
+]
+DOCUMENTS = [{"id": i, "text": 'a "quoted" ] } \\ value\n' * (i % 3), "items": [[i], {"n": None}]} for i in range(300)]
+
+
+def to_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def parts_of(data: bytes, part_size: int):
+    return [data[i : i + part_size] for i in range(0, len(data), part_size)]
+
+
+@pytest.mark.parametrize("part_size", [1, 7, 64, 1000, 100000])
+def test_csv_chunks_are_complete(part_size):
+    chunks = list(CsvRecordSplitter().iter_split(parts_of(to_csv(ROWS), part_size)))
+    assert [row for chunk in chunks for row in csv.reader(io.StringIO(chunk.decode()))] == ROWS
+
+
+@pytest.mark.parametrize("part_size", [1, 13, 1000])
+def test_csv_header_is_prepended(part_size):
+    chunks = list(CsvRecordSplitter(header=True).iter_split(parts_of(to_csv(ROWS), part_size)))
+    rows = []
+    for chunk in chunks:
+        header, *chunk_rows = csv.reader(io.StringIO(chunk.decode()))
+        assert header == ROWS[0]
+        rows.extend(chunk_rows)
+    assert rows == ROWS[1:]
+
+
+def test_csv_header_only():
+    assert list(CsvRecordSplitter(header=True).iter_split([b"id,te", b"xt"])) == [b"id,text"]
+
+
+@pytest.mark.parametrize("offset", [0, 5, 17, 40, 333, 1000])
+def test_csv_align_slice(offset):
+    data = to_csv(ROWS)
+    aligned = CsvRecordSplitter().align(data[offset : offset + 1500], skip_first=offset > 0, skip_last=True)
+    assert aligned
+    rows = list(csv.reader(io.StringIO(aligned.decode())))
+    assert all(len(row) == 3 for row in rows)
+    start = ROWS.index(rows[0])
+    assert rows == ROWS[start : start + len(rows)]
+    assert len(list(csv.reader(io.StringIO(CsvRecordSplitter().align(data, max_records=5).decode())))) == 5
+
+
+@pytest.mark.parametrize("part_size", [1, 11, 500, 100000])
+@pytest.mark.parametrize("separator", [b"\n", b"", b"\n\n"])
+def test_json_documents(part_size, separator):
+    data = separator.join(orjson.dumps(document) for document in DOCUMENTS) + separator
+    chunks = list(JsonRecordSplitter().iter_split(parts_of(data, part_size)))
+    decoder = json.JSONDecoder()
+    documents = []
+    for chunk in chunks:
+        text, position = chunk.decode(), 0
+        while text[position:].strip():
+            position += len(text[position:]) - len(text[position:].lstrip())
+            document, position = decoder.raw_decode(text, position)
+            documents.append(document)
+    assert documents == DOCUMENTS
+
+
+@pytest.mark.parametrize("part_size", [1, 11, 500, 100000])
+def test_json_array_elements(part_size):
+    data = json.dumps(DOCUMENTS, indent=2).encode() + b"\n"
+    chunks = list(JsonRecordSplitter().iter_split(parts_of(data, part_size)))
+    assert [element for chunk in chunks for element in orjson.loads(chunk)] == DOCUMENTS
+    if part_size < 1000:
+        assert len(chunks) > 1
@@ -0,0 +1,82 @@
+"""Tests for the retry policy of idempotent requests."""
+
+import threading
+import time
+
+from botocore.exceptions import ClientError
+import pytest
+
+from filet.boto3.retry import RetryPolicy
+
+SLOW_DOWN = ClientError({"Error": {"Code": "SlowDown"}, "ResponseMetadata": {"HTTPStatusCode": 503}}, "GetObject")
+NO_SUCH_KEY = ClientError({"Error": {"Code": "NoSuchKey"}, "ResponseMetadata": {"HTTPStatusCode": 404}}, "GetObject")
+
+
+class Attempts:
+    """Callable whose attempts behave as given (an exception, a delay in seconds or a result)."""
+
+    def __init__(self, *behaviours):
+        self.behaviours = list(behaviours)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            behaviour = self.behaviours[min(self.count, len(self.behaviours) - 1)]
+            self.count += 1
+        if isinstance(behaviour, Exception):
+            raise behaviour
+        if isinstance(behaviour, float):
+            time.sleep(behaviour)
+            return "slow"
+        return behaviour
+
+
+@pytest.mark.parametrize("timeout", [None, 5.0])
+def test_retries_transient_errors(timeout):
+    attempts = Attempts(SLOW_DOWN, OSError("short read"), "ok")
+    assert RetryPolicy(backoff=0.001, timeout=timeout).call(attempts) == "ok"
+    assert attempts.count == 3
+
+
+@pytest.mark.parametrize("timeout", [None, 5.0])
+def test_raises_permanent_and_last_errors(timeout):
+    with pytest.raises(ClientError, match="NoSuchKey"):
+        RetryPolicy(backoff=0.001, timeout=timeout).call(Attempts(NO_SUCH_KEY))
+    attempts = Attempts(SLOW_DOWN)
+    with pytest.raises(ClientError, match="SlowDown"):
+        RetryPolicy(max_attempts=3, backoff=0.001, timeout=timeout).call(attempts)
+    assert attempts.count == 3
+
+
+def test_timeout_retries_stuck_attempt():
+    started = time.perf_counter()
+    assert RetryPolicy(timeout=0.05).call(Attempts(1.0, "ok")) == "ok"
+    assert time.perf_counter() - started < 0.5
+    with pytest.raises(TimeoutError):
+        RetryPolicy(max_attempts=2, timeout=0.05).call(Attempts(1.0))
+    with pytest.raises(TimeoutError):
+        RetryPolicy(deadline=0.05).call(Attempts(1.0))
+
+
+def test_hedges_slow_attempts():
+    policy = RetryPolicy(hedge_percentile=0.9, hedge_min_samples=5)
+    for _ in range(5):
+        assert policy.call(Attempts("ok")) == "ok"
+    assert policy.hedge_after() < 0.25  # far below the slow attempt, also on a loaded machine
+    started = time.perf_counter()
+    attempts = Attempts(1.0, "hedged")
+    assert policy.call(attempts) == "hedged"
+    assert attempts.count == 2 and time.perf_counter() - started < 0.5
+
+
+@pytest.mark.parametrize("timeout", [None, 0.05])
+def test_on_settled_waits_for_abandoned_attempts(timeout):
+    settled = threading.Event()
+    started = time.perf_counter()
+    assert RetryPolicy(timeout=timeout).call(Attempts(0.3, "ok"), on_settled=settled.set) in ("ok", "slow")
+    if timeout:
+        # the call returned the retried attempt, while the abandoned one is still running
+        assert time.perf_counter() - started < 0.25 and not settled.is_set()
+    assert settled.wait(1.0)
+    assert time.perf_counter() - started >= 0.3
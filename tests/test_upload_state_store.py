@@ -0,0 +1,28 @@
+"""Tests for the persistent state of resumable multipart uploads."""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from filet.boto3.upload_state_store import UploadStateStore
+from filet.config.cache_db import UploadedPart, UploadState
+
+
+def test_states_are_persisted_per_upload(tmp_path):
+    upload_states = UploadStateStore(str(tmp_path / "cache.db"))
+    state = UploadState(upload_id="1", part_size=5 * 1024 * 1024, compression="gzip")
+    upload_states.put("bucket/a.csv.gz", state)
+    upload_states.put("bucket/b.csv.gz", UploadState(upload_id="2", part_size=5 * 1024 * 1024))
+
+    lock = threading.Lock()
+
+    def save_part(part_number: int) -> None:
+        with lock:  # like MultipartUpload, which updates its state under a lock
+            state.parts[part_number] = UploadedPart(part_number, f'"{part_number}"', part_number * 100)
+            upload_states.put("bucket/a.csv.gz", state)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(save_part, range(1, 9)))
+    assert UploadStateStore(str(tmp_path / "cache.db")).get("bucket/a.csv.gz") == state
+    assert upload_states.pop("bucket/a.csv.gz") == state
+    assert upload_states.get("bucket/a.csv.gz") is None
+    assert upload_states.get("bucket/b.csv.gz").upload_id == "2"